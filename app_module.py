@@ -1,17 +1,36 @@
 import tkinter as tk
 from PIL import Image, ImageTk
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from gif_animator import GIFAnimator
 from tkextrafont import Font
 import os
-import sys
 import tkinter.messagebox
+import tkinter.simpledialog
 import sqlite3
-from collections import defaultdict
 from computer_animator import ComputerAnimator
+from concurrent.futures import Future, ThreadPoolExecutor
+from db_executor import DatabaseExecutor
+import session_store
+from session_stats import StatsCache
+from sprite_cache import SpriteCache
+from frame_scheduler import FrameScheduler
+from tk_dispatch import TkDispatcher
+from summary_list import VirtualSummaryList
+from daily_totals import DailyTotals
+from heatmap_view import HeatmapView
+from canvas_state import CanvasState
+from callback_monitor import MonitorOverlay
+from startup_profiler import record_phase, startup_phase
+import time
 
 class TimeTrackerApp:
-    def __init__(self, master):
+    ANIMATION_FPS = 50
+    SUMMARY_WEEKS = 8  # Week rows visible at once on the summary page
+    HEATMAP_WEEKS = 26
+    SUMMARY_ROW_HEIGHT = 25
+    DEFAULT_PROJECT_NAME = "General"  # Shown for sessions without a project
+
+    def __init__(self, master, db_path=None, sprite_cache_dir=None, progressive_startup=True, effects_backend="canvas"):
         self.master = master
         master.title("Kawaii Time Tracker")
         master.geometry("400x500")
@@ -19,72 +38,71 @@ class TimeTrackerApp:
         master.configure(bg="#FFB6C1")
         master.wm_attributes('-topmost', True)
 
-        self.clock_in_time = None
+        # Running timers by project id (None = no project); the selected project is the one the buttons act on
+        self.open_timers = {}
+        self.projects = []  # [(project id, name)] from the database
+        self.selected_project_id = None
+        self._timer_sync_generation = 0  # Bumped by local clock-ins/outs so older database reads are ignored
+        self._active_session_timer_id = None
+        self.monitor_overlay = None  # Set by enable_instrumentation
+        self.control_server = None  # Set by start_control_server
         self.total_hours_worked = 0.0
+        # Progressive startup shows text-fallback controls right away and swaps
+        # decoded assets in as a worker pool finishes them
+        self.progressive_startup = progressive_startup
+        self.asset_pool = None
+        self.asset_dispatcher = None
 
         script_dir = os.path.dirname(os.path.abspath(__file__))
         self.script_dir = script_dir
 
-        self.db_file_path = os.path.join(script_dir, "study_sessions.db")
-        self._init_database()
-        self._load_data()
+        self.db_file_path = db_path or os.path.join(script_dir, "study_sessions.db")
+        with startup_phase("_init_database"):
+            self._init_database()
+        with startup_phase("_load_data"):
+            self._load_data()
+
+        # Pre-resized sprites are reused across launches so warm starts skip PIL resampling
+        self.sprite_cache = SpriteCache(sprite_cache_dir)
+        # One shared clock drives the GIF, shake, hearts and stars
+        self.animation_scheduler = FrameScheduler(master, fps=self.ANIMATION_FPS)
+
+        if self.progressive_startup:
+            self.asset_pool = ThreadPoolExecutor(max_workers=3, thread_name_prefix="asset-loader")
+            self.asset_dispatcher = TkDispatcher(master)
 
         # --- Load and Register Custom Fonts ---
         self.minecraft_font_path = os.path.join(script_dir, "assets", "fonts", "Minecraft.ttf")
         self.pixel_font_path = os.path.join(script_dir, "assets", "fonts", "pixel.ttf")
-
-        # Attempt to load fonts using tkextrafont
-        try:
-            Font(file=self.minecraft_font_path, family="Minecraft")
-            Font(file=self.pixel_font_path, family="Pixelify Sans Regular")
-        except Exception as e:
-            print(f"Font registration error: {e}")
-
-        # Fallback defaults
-        self.minecraft_font_family_name = "Minecraft"
-        self.pixel_font_family_name = "Pixelify Sans Regular"
-
-        # Set font styles with fallbacks if font is not registered
-        available_fonts = self.master.tk.call("font", "families")
-
-        if self.minecraft_font_family_name in available_fonts:
-            self.title_font = (self.minecraft_font_family_name, 24, "bold")
-            self.main_text_font = (self.minecraft_font_family_name, 16)
-            self.button_text_font = (self.minecraft_font_family_name, 16, "bold")
-            self.small_button_font = (self.minecraft_font_family_name, 12)
+        if self.progressive_startup:
+            # Font registration needs the Tk thread; do it once the window is up
+            self._use_fallback_fonts()
         else:
-            print("Warning: Minecraft font not registered. Falling back to Arial.")
-            self.title_font = ("Arial", 24, "bold")
-            self.main_text_font = ("Arial", 16)
-            self.button_text_font = ("Arial", 16, "bold")
-            self.small_button_font = ("Arial", 12)
+            self._register_fonts()
 
-        if self.pixel_font_family_name in available_fonts:
-            self.star_font = (self.pixel_font_family_name, 12)
-        else:
-            print("Warning: Pixel font not registered. Falling back to Arial.")
-            self.star_font = ("Arial", 12)
-                              
         # --- Load and prepare background image ---
         self.background_image_path = os.path.join(script_dir, "assets", "images", "pink_background.jpg")
         self.background_photo = None
 
         app_width = 400
         app_height = 500
-        self.canvas = tk.Canvas(master, width=app_width, height=app_height, highlightthickness=0, bg="#FFB6C1")
+        # Item updates go through CanvasState, which drops no-op itemconfig/coords calls and batches the rest per frame
+        self.canvas = CanvasState(tk.Canvas(master, width=app_width, height=app_height, highlightthickness=0, bg="#FFB6C1"))
         self.canvas.pack(fill="both", expand=True)
+        self.background_item_id = self.canvas.create_image(0, 0, anchor="nw")
 
-        try:
-            original_bg_img = Image.open(self.background_image_path)
-            self.background_photo = ImageTk.PhotoImage(original_bg_img)
-            self.canvas.create_image(0, 0, image=self.background_photo, anchor="nw")
-
-        except FileNotFoundError:
-            print(f"Background image not found: {self.background_image_path}. Using solid background color for canvas.")
-            self.canvas.config(bg="#FFB6C1")
-        except Exception as e:
-            print(f"Error loading or processing background image: {e}. Using solid background color for canvas.")
-            self.canvas.config(bg="#FFB6C1")
+        if self.progressive_startup:
+            self._load_in_background("background image", self._read_background_image, self._install_background_image)
+        else:
+            try:
+                with startup_phase("background image"):
+                    self._install_background_image(self._read_background_image())
+            except FileNotFoundError:
+                print(f"Background image not found: {self.background_image_path}. Using solid background color for canvas.")
+                self.canvas.config(bg="#FFB6C1")
+            except Exception as e:
+                print(f"Error loading or processing background image: {e}. Using solid background color for canvas.")
+                self.canvas.config(bg="#FFB6C1")
 
         # --- UI Elements as Canvas Items ---
         self.title_text_id = self.canvas.create_text(200, 30, text="LOCK IN CLOCK IN", font=self.title_font, fill="#80084A", anchor="n")
@@ -93,38 +111,36 @@ class TimeTrackerApp:
         gif_display_height = 220
         self.animated_gif_item_id = self.canvas.create_image(200, 60, anchor="n") # Create placeholder for GIF
 
-        self.gif_animator = GIFAnimator(self.master, self.canvas, self.animated_gif_item_id,
-                                        os.path.join("assets", "images", "pink_computer.gif"), gif_display_width, gif_display_height)
+        with startup_phase("GIFAnimator setup"):
+            self.gif_animator = GIFAnimator(self.master, self.canvas, self.animated_gif_item_id,
+                                            os.path.join("assets", "images", "pink_computer.gif"), gif_display_width, gif_display_height,
+                                            sprite_cache=self.sprite_cache, scheduler=self.animation_scheduler)
 
 
         # --- Load button images ---
         self.use_image_buttons = False
-        try:
-            main_button_size = (150, 70)
-            side_button_size = (80, 30)
-
-            self.img_clock_in_normal = ImageTk.PhotoImage(Image.open(os.path.join(script_dir, "assets", "images", "clock_in_normal.png")).resize(main_button_size, Image.Resampling.LANCZOS))
-            self.img_clock_in_active = ImageTk.PhotoImage(Image.open(os.path.join(script_dir, "assets", "images", "clock_in_active.png")).resize(main_button_size, Image.Resampling.LANCZOS))
-
-            self.img_clock_out_normal = ImageTk.PhotoImage(Image.open(os.path.join(script_dir, "assets", "images", "clock_out_normal.png")).resize(main_button_size, Image.Resampling.LANCZOS))
-            self.img_clock_out_active = ImageTk.PhotoImage(Image.open(os.path.join(script_dir, "assets", "images", "clock_out_active.png")).resize(main_button_size, Image.Resampling.LANCZOS))
-
-            self.img_reset_normal = ImageTk.PhotoImage(Image.open(os.path.join(script_dir, "assets", "images", "reset_normal.png")).resize(side_button_size, Image.Resampling.LANCZOS))
-            self.img_reset_active = ImageTk.PhotoImage(Image.open(os.path.join(script_dir, "assets", "images", "reset_active.png")).resize(side_button_size, Image.Resampling.LANCZOS))
-
-            self.img_summary_normal = ImageTk.PhotoImage(Image.open(os.path.join(script_dir, "assets", "images", "summary_normal.png")).resize(side_button_size, Image.Resampling.LANCZOS))
-            self.img_summary_active = ImageTk.PhotoImage(Image.open(os.path.join(script_dir, "assets", "images", "summary_active.png")).resize(side_button_size, Image.Resampling.LANCZOS))
-
-            self.img_back_normal = ImageTk.PhotoImage(Image.open(os.path.join(script_dir, "assets", "images", "back_normal.png")).resize(side_button_size, Image.Resampling.LANCZOS))
-            self.img_back_active = ImageTk.PhotoImage(Image.open(os.path.join(script_dir, "assets", "images", "back_active.png")).resize(side_button_size, Image.Resampling.LANCZOS))
-
-            self.use_image_buttons = True
-        except FileNotFoundError as e:
-            print(f"Image Error: Missing button image file: {e.filename}. Using text fallback for buttons.")
-            self.use_image_buttons = False
-        except Exception as e:
-            print(f"Image Error: Could not load or resize button image: {e}. Using text fallback for buttons.")
-            self.use_image_buttons = False
+        main_button_size = (150, 70)
+        side_button_size = (80, 30)
+        self.main_button_size = main_button_size
+        self.side_button_size = side_button_size
+        self.img_clock_in_normal = self.img_clock_in_active = None
+        self.img_clock_out_normal = self.img_clock_out_active = None
+        self.img_reset_normal = self.img_reset_active = None
+        self.img_summary_normal = self.img_summary_active = None
+        self.img_back_normal = self.img_back_active = None
+
+        if self.progressive_startup:
+            # Text buttons work immediately; images replace them once decoded
+            self._load_in_background("button images", self._read_button_images, self._install_button_images)
+        else:
+            try:
+                self._install_button_images(self._read_button_images(), swap=False)
+            except FileNotFoundError as e:
+                print(f"Image Error: Missing button image file: {e.filename}. Using text fallback for buttons.")
+                self.use_image_buttons = False
+            except Exception as e:
+                print(f"Image Error: Could not load or resize button image: {e}. Using text fallback for buttons.")
+                self.use_image_buttons = False
 
         # --- Create Buttons ---
         # Clock In Button
@@ -199,19 +215,27 @@ class TimeTrackerApp:
                 # Pass the actual initial coordinates of the GIF item to ComputerAnimator
                 # (Assuming GIFAnimator sets the initial image, so coords should be valid)
                 gif_initial_coords = self.canvas.coords(self.animated_gif_item_id)
-                self.computer_animator = ComputerAnimator(
-                    self.master,
-                    self.canvas,
-                    self.animated_gif_item_id,
-                    [
-                        os.path.join("assets", "images", "heart.png"),
-                        os.path.join("assets", "images", "filled_heart.png"),
-                        os.path.join("assets", "images", "stars.png"),
-                        os.path.join("assets", "images", "clover.png")
-                    ],
-                    self.gif_animator,
-                    gif_initial_coords
-                )
+                with startup_phase("ComputerAnimator setup"):
+                    self.computer_animator = ComputerAnimator(
+                        self.master,
+                        self.canvas,
+                        self.animated_gif_item_id,
+                        [
+                            os.path.join("assets", "images", "heart.png"),
+                            os.path.join("assets", "images", "filled_heart.png"),
+                            os.path.join("assets", "images", "stars.png"),
+                            os.path.join("assets", "images", "clover.png")
+                        ],
+                        self.gif_animator,
+                        gif_initial_coords,
+                        sprite_cache=self.sprite_cache,
+                        scheduler=self.animation_scheduler,
+                        load_images=not self.progressive_startup,
+                        backend=effects_backend
+                    )
+                if self.progressive_startup:
+                    self._load_in_background("effect sprites", self.computer_animator.read_sprite_images,
+                                             self.computer_animator.install_sprite_images)
                 self.canvas.tag_bind(self.animated_gif_item_id, "<Button-1>", self.computer_animator._handle_computer_click)
 
             except Exception as e:
@@ -224,105 +248,374 @@ class TimeTrackerApp:
             self.animated_gif_item_id = None # Invalidate ID if GIF not loaded
 
 
+        # Project selector: click the name to cycle through projects, "+" to add one
+        self.project_text_id = self.canvas.create_text(200, 281, text="", font=self.small_button_font, fill="#80084A", anchor="n")
+        self.add_project_text_id = self.canvas.create_text(300, 281, text="+", font=self.small_button_font, fill="#80084A", anchor="n")
+        self.canvas.tag_bind(self.project_text_id, "<ButtonRelease-1>", self._on_project_click)
+        self.canvas.tag_bind(self.add_project_text_id, "<ButtonRelease-1>", self._on_add_project)
+        self._refresh_project_selector()
         self.status_text_id = self.canvas.create_text(200, 300, text="Not Clocked In", font=self.main_text_font, fill="#990000", anchor="n")
         self.active_session_text_id = self.canvas.create_text(200, 330, text="", font=self.main_text_font, fill="#277445", anchor="n")
         self.hours_display_text_id = self.canvas.create_text(200, 360, text=f"Total Hours: {self.hours_to_h_m_format(self.total_hours_worked)}", font=self.main_text_font, fill="#80084A", anchor="n")
 
         # Summary page elements (initially hidden)
         self.summary_title_id = self.canvas.create_text(200, 50, text="Weekly Summary", font=self.title_font, fill="#80084A", anchor="n", state="hidden")
-        self.summary_text_display_id = self.canvas.create_text(200, 100, text="", font=self.main_text_font, fill="#277445", anchor="n", justify="left", state="hidden")
+        # Daily-activity heatmap with O(1) range totals underneath; the week list fills the rest
+        self.daily_totals = None
+        self.daily_totals_stale = True
+        self.heatmap = HeatmapView(self.canvas, 200 - self.HEATMAP_WEEKS * 11 // 2, 85, weeks=self.HEATMAP_WEEKS,
+                                   on_select=self._on_heatmap_select)
+        self.summary_range_text_id = self.canvas.create_text(200, 168, text="", font=self.small_button_font, fill="#80084A", anchor="n", state="hidden")
+        self.summary_text_display_id = self.canvas.create_text(200, 195, text="", font=self.main_text_font, fill="#277445", anchor="n", justify="left", state="hidden")
+        # Weeks are listed newest first; only the visible rows exist as canvas items
+        self.summary_newest_week = None
+        self.summary_stale = True  # Set when sessions change, so toggling back re-queries
+        self.summary_list = VirtualSummaryList(self.canvas, 200, 195, self.SUMMARY_ROW_HEIGHT, self.SUMMARY_WEEKS,
+                                               self.main_text_font, "#277445", self._fetch_summary_page, self._format_summary_row)
+        self.canvas.bind("<MouseWheel>", self._on_summary_scroll)
+        self.canvas.bind("<Button-4>", self._on_summary_scroll)
+        self.canvas.bind("<Button-5>", self._on_summary_scroll)
+        for key in ("<Up>", "<Down>", "<Prior>", "<Next>"):
+            master.bind(key, self._on_summary_scroll)
 
         self.summary_mode = False
         self._update_button_visuals() # Initial call to set correct button states
+        # Pick up clock-ins/outs made from the CLI while the window was in the background
+        master.bind("<FocusIn>", self._on_focus_in)
+
+        if self.progressive_startup:
+            self.master.after_idle(self._register_fonts_progressively)
+
+
+    # --- Fonts ---
+    def _use_fallback_fonts(self):
+        self.title_font = ("Arial", 24, "bold")
+        self.main_text_font = ("Arial", 16)
+        self.button_text_font = ("Arial", 16, "bold")
+        self.small_button_font = ("Arial", 12)
+        self.star_font = ("Arial", 12)
+
+    def _register_fonts(self):
+        # Attempt to load fonts using tkextrafont
+        try:
+            with startup_phase("font registration"):
+                Font(file=self.minecraft_font_path, family="Minecraft")
+                Font(file=self.pixel_font_path, family="Pixelify Sans Regular")
+        except Exception as e:
+            print(f"Font registration error: {e}")
+
+        # Fallback defaults
+        self.minecraft_font_family_name = "Minecraft"
+        self.pixel_font_family_name = "Pixelify Sans Regular"
 
+        # Set font styles with fallbacks if font is not registered
+        with startup_phase("font families enumeration"):
+            available_fonts = self.master.tk.call("font", "families")
+
+        if self.minecraft_font_family_name in available_fonts:
+            self.title_font = (self.minecraft_font_family_name, 24, "bold")
+            self.main_text_font = (self.minecraft_font_family_name, 16)
+            self.button_text_font = (self.minecraft_font_family_name, 16, "bold")
+            self.small_button_font = (self.minecraft_font_family_name, 12)
+        else:
+            print("Warning: Minecraft font not registered. Falling back to Arial.")
+            self.title_font = ("Arial", 24, "bold")
+            self.main_text_font = ("Arial", 16)
+            self.button_text_font = ("Arial", 16, "bold")
+            self.small_button_font = ("Arial", 12)
+
+        if self.pixel_font_family_name in available_fonts:
+            self.star_font = (self.pixel_font_family_name, 12)
+        else:
+            print("Warning: Pixel font not registered. Falling back to Arial.")
+            self.star_font = ("Arial", 12)
+
+    def _register_fonts_progressively(self):
+        """Registers the custom fonts after the first paint and restyles existing text."""
+        self._register_fonts()
+        for item_id in (self.title_text_id, self.summary_title_id):
+            self.canvas.itemconfig(item_id, font=self.title_font)
+        for item_id in (self.status_text_id, self.active_session_text_id, self.hours_display_text_id, self.summary_text_display_id):
+            self.canvas.itemconfig(item_id, font=self.main_text_font)
+        self.summary_list.set_font(self.main_text_font)
+        for item_id in (self.clock_in_text_item, self.clock_out_text_item):
+            if item_id:
+                self.canvas.itemconfig(item_id, font=self.button_text_font)
+        for item_id in (self.reset_text_item, self.summary_button_text_item, self.summary_range_text_id,
+                        self.project_text_id, self.add_project_text_id):
+            if item_id:
+                self.canvas.itemconfig(item_id, font=self.small_button_font)
+
+    # --- Asset loading ---
+    def _load_in_background(self, name, read, install):
+        """Runs `read()` on the asset pool, then `install(result)` on the Tk thread."""
+        submitted = time.perf_counter()
+
+        def on_ready(future):
+            try:
+                result = future.result()
+            except FileNotFoundError as e:
+                print(f"Image Error: Missing {name} file: {e.filename}. Keeping fallback.")
+                return
+            except Exception as e:
+                print(f"Image Error: Could not load {name}: {e}. Keeping fallback.")
+                return
+            install(result)
+            record_phase(f"{name} (background load)", submitted, time.perf_counter())
+
+        self.asset_dispatcher.then(self.asset_pool.submit(read), on_ready)
+
+    def _read_background_image(self):
+        with Image.open(self.background_image_path) as original_bg_img:
+            original_bg_img.load()
+            return original_bg_img.copy()
+
+    def _install_background_image(self, image):
+        self.background_photo = ImageTk.PhotoImage(image)
+        self.canvas.itemconfig(self.background_item_id, image=self.background_photo)
+
+    BUTTON_IMAGE_FILES = (
+        ("img_clock_in_normal", "clock_in_normal.png", "main"),
+        ("img_clock_in_active", "clock_in_active.png", "main"),
+        ("img_clock_out_normal", "clock_out_normal.png", "main"),
+        ("img_clock_out_active", "clock_out_active.png", "main"),
+        ("img_reset_normal", "reset_normal.png", "side"),
+        ("img_reset_active", "reset_active.png", "side"),
+        ("img_summary_normal", "summary_normal.png", "side"),
+        ("img_summary_active", "summary_active.png", "side"),
+        ("img_back_normal", "back_normal.png", "side"),
+        ("img_back_active", "back_active.png", "side"),
+    )
+
+    def _read_button_images(self):
+        """Loads every resized button image as a PIL image. Safe to call off the Tk thread."""
+        images = {}
+        for attribute, filename, kind in self.BUTTON_IMAGE_FILES:
+            size = self.main_button_size if kind == "main" else self.side_button_size
+            path = os.path.join(self.script_dir, "assets", "images", filename)
+            with startup_phase(f"button image {filename}"):
+                images[attribute] = self.sprite_cache.load_resized(path, size, Image.Resampling.LANCZOS)
+        return images
+
+    def _install_button_images(self, images, swap=True):
+        for attribute, image in images.items():
+            setattr(self, attribute, ImageTk.PhotoImage(image))
+        self.use_image_buttons = True
+        if not swap:
+            return
+
+        # Replace the text fallback buttons that were shown while loading
+        for attribute in ("clock_in_text_item", "clock_out_text_item", "reset_text_item", "summary_button_text_item"):
+            item_id = getattr(self, attribute)
+            if item_id:
+                self.canvas.delete(item_id)
+                setattr(self, attribute, None)
+        main_state = "hidden" if self.summary_mode else "normal"
+        self.canvas.itemconfig(self.clock_in_item, state=main_state)
+        self.canvas.itemconfig(self.clock_out_item, state=main_state)
+        self.canvas.itemconfig(self.reset_item, state="normal" if self.summary_mode else "hidden")
+        self._update_button_visuals()
 
     def _init_database(self):
+        # All SQLite work runs on the executor's worker thread; results come back via futures
+        # Streaks and distributions are kept between requests and only reloaded as far as sessions change
+        self.stats_cache = StatsCache()
         try:
-            self.conn = sqlite3.connect(self.db_file_path)
-            self.cursor = self.conn.cursor()
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS sessions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    clock_in TEXT NOT NULL,
-                    clock_out TEXT NOT NULL,
-                    duration_minutes INTEGER NOT NULL,
-                    notes TEXT
-                )
-            ''')
-            self.conn.commit()
-            print(f"Database initialized at {self.db_file_path}")
+            self.db = DatabaseExecutor(self.db_file_path)
+            self.db.attach(self.master)
         except sqlite3.Error as e:
             print(f"Database error during initialization: {e}")
-            self.conn = None
-            self.cursor = None
+            self.db = None
+            return
+
+        def on_initialized(future):
+            if future.exception() is None:
+                print(f"Database initialized at {self.db_file_path}")
+            else:
+                print(f"Database error during initialization: {future.exception()}")
+
+        # Migrations commit in chunks themselves, so run them as an exclusive operation: any pending
+        # write batch commits first and nothing else runs inside their transactions.
+        # The worker runs operations in order, so nothing needs to wait for this to finish.
+        self.db.then(self.db.exclusive(session_store.init_schema), on_initialized)
 
     def _load_data(self):
         self.total_hours_worked = 0.0
-        if self.conn:
+        if not self.db:
+            return
+
+        submitted = time.perf_counter()
+
+        def on_loaded(future):
+            record_phase("_load_data result (async)", submitted, time.perf_counter())
             try:
-                self.cursor.execute("SELECT SUM(duration_minutes) FROM sessions")
-                total_minutes = self.cursor.fetchone()[0]
-                self.total_hours_worked = (total_minutes / 60.0) if total_minutes is not None else 0.0
+                total_seconds = future.result()
             except sqlite3.Error as e:
                 print(f"Error loading total hours from database: {e}")
-                self.total_hours_worked = 0.0
-        else:
-            self.total_hours_worked = 0.0
+                return
+            self.total_hours_worked = total_seconds / 3600.0
+            self._refresh_total_hours_display()
+
+        self.db.then(self.db.read(session_store.load_total_seconds), on_loaded)
+        self._sync_open_timers()
+
+    def _on_focus_in(self, event):
+        # Sessions may have been recorded or imported from the CLI meanwhile
+        self.summary_stale = True
+        self.daily_totals_stale = True
+        self.stats_cache.mark_stale()
+        self._sync_open_timers()
+
+    @property
+    def clock_in_time(self):
+        """When the selected project's timer started, or None."""
+        return self.open_timers.get(self.selected_project_id)
+
+    def _sync_open_timers(self):
+        """Adopts the projects and running timers stored in the database, which the CLI may have changed."""
+        if not self.db:
+            return
+        generation = self._timer_sync_generation
 
-    def record_session(self, clock_in_iso, clock_out_iso, duration_minutes, notes):
-        if self.conn:
-            try:
-                self.cursor.execute("INSERT INTO sessions (clock_in, clock_out, duration_minutes, notes) VALUES (?, ?, ?, ?)",
-                                    (clock_in_iso, clock_out_iso, duration_minutes, notes))
-                self.conn.commit()
-                print(f"Session recorded: {clock_in_iso} to {clock_out_iso}, {duration_minutes} minutes.")
-                return True
-            except sqlite3.Error as e:
-                print(f"Error recording session to database: {e}")
-                return False
-        return False
+        def read_timer_state(conn):
+            return session_store.get_projects(conn), session_store.get_open_timers(conn)
 
-    def clear_all_sessions(self):
-        if self.conn:
+        def on_timer_state(future):
             try:
-                self.cursor.execute("DELETE FROM sessions")
-                self.conn.commit()
-                print("All sessions deleted from database.")
-                return True
+                projects, timers = future.result()
             except sqlite3.Error as e:
-                print(f"Error deleting sessions from database: {e}")
-                return False
-        return False
+                print(f"Error reading open timers from database: {e}")
+                return
+            self.projects = projects
+            self._refresh_project_selector()
+            if generation != self._timer_sync_generation:
+                return  # A clock-in/out happened since this was read
+            stored = {project_id: datetime.fromtimestamp(clock_in) for project_id, _, clock_in, _ in timers}
+            if stored == self.open_timers:
+                return
+            # Timers stopped elsewhere are already in the totals
+            stopped_elsewhere = self.open_timers.keys() - stored.keys()
+            self.open_timers = stored
+            if stopped_elsewhere:
+                # Their sessions were recorded elsewhere, so the summary list and heatmap are out of date too
+                self.summary_stale = True
+                self.daily_totals_stale = True
+            self._notify_control_server()
+            if self.selected_project_id in stopped_elsewhere:
+                self.canvas.itemconfig(self.status_text_id, text="Clocked Out")
+            else:
+                self._refresh_status_text()
+            self._update_active_session_display()
+            self._update_button_visuals()
+            self._update_timer_animation()
+            if stopped_elsewhere:
+                self.stats_cache.mark_stale()
+                self._load_data()
+
+        self.db.then(self.db.read(read_timer_state), on_timer_state)
+
+    # --- Projects ---
+    def _project_name(self, project_id):
+        if project_id is None:
+            return self.DEFAULT_PROJECT_NAME
+        return next((name for pid, name in self.projects if pid == project_id), "?")
+
+    def _refresh_project_selector(self):
+        if hasattr(self, "project_text_id"):
+            self.canvas.itemconfig(self.project_text_id, text=f"◂ {self._project_name(self.selected_project_id)} ▸")
+
+    def _refresh_status_text(self):
+        clock_in_time = self.clock_in_time
+        if clock_in_time is None:
+            self.canvas.itemconfig(self.status_text_id, text="Not Clocked In")
+        else:
+            self.canvas.itemconfig(self.status_text_id, text=f"Clocked In at: {clock_in_time.strftime('%I:%M %p')}")
 
-    def get_all_sessions_for_summary(self):
-        if self.conn:
-            try:
-                self.cursor.execute("SELECT clock_in, duration_minutes FROM sessions ORDER BY clock_in ASC")
-                return self.cursor.fetchall()
-            except sqlite3.Error as e:
-                print(f"Error querying sessions from database for summary: {e}")
-                return []
-        return []
+    def select_project(self, project_id):
+        self.selected_project_id = project_id
+        self._refresh_project_selector()
+        self._refresh_status_text()
+        self._update_button_visuals()
 
-    def get_weekly_hours_summary(self):
-        sessions = self.get_all_sessions_for_summary()
-        weekly_hours = defaultdict(float)
+    def _on_project_click(self, event):
+        choices = [None] + [project_id for project_id, _ in self.projects]
+        index = choices.index(self.selected_project_id) if self.selected_project_id in choices else 0
+        self.select_project(choices[(index + 1) % len(choices)])
 
-        for clock_in_iso, duration_minutes in sessions:
-            clock_in_dt = datetime.fromisoformat(clock_in_iso)
-            week_key = clock_in_dt.strftime("%G-W%V")
-            weekly_hours[week_key] += duration_minutes / 60.0
+    def _on_add_project(self, event=None):
+        name = tkinter.simpledialog.askstring("New Project", "Project name:", parent=self.master)
+        if not name or not name.strip() or not self.db:
+            return
 
-        return dict(sorted(weekly_hours.items()))
+        def on_created(future):
+            if future.exception() is not None:
+                print(f"Error saving project to database: {future.exception()}")
+                return
+            self.projects = sorted(set(self.projects) | {(future.result(), name.strip())}, key=lambda p: p[1].lower())
+            self.select_project(future.result())
+
+        self.db.then(self.db.write(session_store.get_or_create_project, name), on_created)
+
+    def close_db_connection(self):
+        if self.db:
+            self.db.close()
+            self.db = None
+
+    def _failed_future(self, message):
+        future = Future()
+        future.set_exception(sqlite3.OperationalError(message))
+        return future
+
+    def record_session(self, clock_in, clock_out, notes=""):
+        """Queues the insert; the returned future resolves once it has been committed."""
+        if not self.db:
+            return self._failed_future("No database connection")
+        future = self.db.write(session_store.record_session, clock_in, clock_out, notes)
+        future.add_done_callback(lambda f: self.stats_cache.mark_stale())
+        future.add_done_callback(lambda f: print(
+            f"Session recorded: {clock_in} to {clock_out}." if not f.exception()
+            else f"Error recording session to database: {f.exception()}"))
+        return future
+
+    def close_open_session(self, clock_out, notes="", clock_in=None, project_id=None):
+        """Future for (session id, duration seconds, ...); see session_store.close_open_session."""
+        if not self.db:
+            return self._failed_future("No database connection")
+        future = self.db.write(session_store.close_open_session, clock_out, notes, clock_in, project_id)
+        future.add_done_callback(lambda f: self.stats_cache.mark_stale())
+        return future
+
+    def clear_all_sessions(self):
+        """Moves every live session to the archive (see session_archive), in constant time."""
+        if not self.db:
+            return self._failed_future("No database connection")
+        future = self.db.write(session_store.clear_all_sessions)
+        future.add_done_callback(lambda f: self.stats_cache.invalidate())
+        return future
+
+    def get_session_stats(self):
+        """Future for the session_stats metrics, from the cache kept for this database."""
+        if not self.db:
+            return self._failed_future("No database connection")
+        return self.db.read(self.stats_cache.get)
+
+    def get_all_sessions_for_summary(self):
+        if not self.db:
+            return self._failed_future("No database connection")
+        return self.db.read(session_store.get_all_sessions_for_summary)
+
+    def get_weekly_hours_summary(self, start=None, end=None):
+        """Future for {"YYYY-Www": hours}; see session_store.get_weekly_hours_summary."""
+        if not self.db:
+            return self._failed_future("No database connection")
+        return self.db.read(session_store.get_weekly_hours_summary, start, end)
 
     def hours_to_h_m_format(self, total_hours):
-        total_minutes = int(total_hours * 60)
-        hours = total_minutes // 60
-        minutes = total_minutes % 60
-        parts = []
-        if hours > 0: parts.append(f"{hours} hour{'s' if hours > 1 else ''}")
-        if minutes > 0 or (hours == 0 and minutes == 0): parts.append(f"{minutes} minute{'s' if minutes > 1 else ''}")
-        return " ".join(parts) if parts else "0 minutes"
+        return session_store.hours_to_h_m_format(total_hours)
+
+    def _refresh_total_hours_display(self):
+        if hasattr(self, "hours_display_text_id"):
+            self.canvas.itemconfig(self.hours_display_text_id, text=f"Total Hours: {self.hours_to_h_m_format(self.total_hours_worked)}")
 
     # item_id_to_highlight is the actual canvas item ID that should change its image
     def _on_canvas_button_press(self, event, item_id_to_highlight, active_image):
@@ -341,8 +634,6 @@ class TimeTrackerApp:
         elif action_name == "toggle_summary":
             self.toggle_summary_display()
 
-        self._update_button_visuals()
-        
         self._update_button_visuals() # Ensure all buttons reflect the overall app state
 
     def clock_in(self, *args):
@@ -350,43 +641,78 @@ class TimeTrackerApp:
             self.canvas.itemconfig(self.status_text_id, text="You are already clocked in!")
             return
 
-        self.clock_in_time = datetime.now()
-        self.canvas.itemconfig(self.status_text_id, text=f"Clocked In at: {self.clock_in_time.strftime('%I:%M %p')}")
+        project_id = self.selected_project_id
+        self.open_timers[project_id] = datetime.now()
+        self._timer_sync_generation += 1
+        if self.db:
+            def on_opened(future):
+                if future.exception() is not None:
+                    print(f"Error saving open session to database: {future.exception()}")
+                elif not future.result():
+                    # Already clocked in from the CLI: show that session instead
+                    self._timer_sync_generation += 1
+                    self.open_timers.pop(project_id, None)
+                    self._sync_open_timers()
+
+            future = self.db.write(session_store.open_session, self.open_timers[project_id], project_id)
+            self.db.then(future, on_opened)
+            self._notify_control_server(future)
+        self._refresh_status_text()
         self._update_active_session_display()
         self._update_button_visuals()
-
-        if self.gif_animator.is_loadable():
-            self.gif_animator.start_animation()
+        self._update_timer_animation()
 
     def clock_out(self, *args):
         if self.clock_in_time is None:
             self.canvas.itemconfig(self.status_text_id, text="You need to clock in first!")
             return
 
-        clock_out_time = datetime.now()
-        time_worked = clock_out_time - self.clock_in_time
-        hours_worked = time_worked.total_seconds() / 3600
-        duration_minutes = round(hours_worked * 60)
+        project_id = self.selected_project_id
+        clock_in_time, clock_out_time = self.clock_in_time, datetime.now()
+
+        def on_recorded(future):
+            if future.exception() is None:
+                if future.result():
+                    print(f"Session recorded: {clock_in_time} to {clock_out_time}.")
+                    self.summary_stale = True
+                    if self.daily_totals is not None:
+                        _, duration, clock_in_epoch, clock_in_offset = future.result()
+                        self.daily_totals.add_session(clock_in_epoch, clock_in_offset, duration)
+                    self.total_hours_worked += future.result()[1] / 3600
+                    self._refresh_total_hours_display()
+            else:
+                print(f"Error recording session to database: {future.exception()}")
+                self.canvas.itemconfig(self.status_text_id, text="Error saving session!")
 
-        if self.record_session(self.clock_in_time.isoformat(), clock_out_time.isoformat(), duration_minutes, ""):
-            self.total_hours_worked += hours_worked
+        future = self.close_open_session(clock_out_time, "", clock_in=clock_in_time, project_id=project_id)
+        if self.db:
+            self.db.then(future, on_recorded)
+            self._notify_control_server(future)
+        else:
+            on_recorded(future)
 
         self.canvas.itemconfig(self.status_text_id, text="Clocked Out")
-        self.canvas.itemconfig(self.hours_display_text_id, text=f"Total Hours: {self.hours_to_h_m_format(self.total_hours_worked)}")
-        self.clock_in_time = None
+        del self.open_timers[project_id]
+        self._timer_sync_generation += 1
         self._update_active_session_display()
         self._update_button_visuals()
-
-        if self.gif_animator.is_loadable():
-            self.gif_animator.stop_animation()
+        self._update_timer_animation()
 
     def reset_hours(self, *args):
-        if tkinter.messagebox.askyesno("Confirm Reset", "Are you sure you want to reset all hours? This cannot be undone."):
-            if self.clear_all_sessions():
+        if tkinter.messagebox.askyesno("Confirm Reset", "Are you sure you want to reset all hours? They are moved to the archive; "
+                                                      "`python main.py archive restore YEAR` brings a year back."):
+            def on_cleared(future):
+                if future.exception() is not None:
+                    print(f"Error archiving sessions in database: {future.exception()}")
+                    self.canvas.itemconfig(self.status_text_id, text="Error resetting hours!")
+                    return
+                print("All sessions moved to the archive.")
                 self.canvas.itemconfig(self.status_text_id, text="All hours reset!")
                 self.total_hours_worked = 0.0
-                self.canvas.itemconfig(self.hours_display_text_id, text=f"Total Hours: {self.hours_to_h_m_format(self.total_hours_worked)}")
-                self.clock_in_time = None
+                self._refresh_total_hours_display()
+                self.open_timers.clear()
+                self._timer_sync_generation += 1
+                self._notify_control_server()
                 self._update_active_session_display()
                 self._update_button_visuals()
 
@@ -394,15 +720,50 @@ class TimeTrackerApp:
                     self.gif_animator.stop_animation()
                 if self.computer_animator:
                     self.computer_animator.clear_hearts()
+                if self.daily_totals is not None:
+                    self.daily_totals.clear()
+                if self.summary_mode:
+                    self.display_weekly_summary()
+                    self._refresh_activity()
+
+            future = self.clear_all_sessions()
+            if self.db:
+                self.db.then(future, on_cleared)
             else:
-                self.canvas.itemconfig(self.status_text_id, text="Error resetting hours!")
+                on_cleared(future)
 
     def _update_active_session_display(self):
-        if self.clock_in_time:
-            self.canvas.itemconfig(self.active_session_text_id, text=f"Active Session: {self.hours_to_h_m_format((datetime.now() - self.clock_in_time).total_seconds() / 3600)}")
-            self.master.after(1000, self._update_active_session_display)
+        """Redraws the elapsed time of every running timer. One after() chain serves all of them."""
+        if self._active_session_timer_id is not None:
+            self.master.after_cancel(self._active_session_timer_id)
+            self._active_session_timer_id = None
+        if not self.open_timers:
+            self.canvas.itemconfig(self.active_session_text_id, text="", font=self.main_text_font)
+            return
+
+        now = datetime.now()
+        elapsed = {project_id: (now - clock_in_time).total_seconds() for project_id, clock_in_time in self.open_timers.items()}
+        if len(elapsed) == 1 and self.selected_project_id in elapsed:
+            seconds = elapsed[self.selected_project_id]
+            self.canvas.itemconfig(self.active_session_text_id, text=f"Active Session: {self.hours_to_h_m_format(seconds / 3600)}",
+                                   font=self.main_text_font)
         else:
-            self.canvas.itemconfig(self.active_session_text_id, text="")
+            # Several timers (or one for another project): compact "Name 1h 5m" list, oldest first
+            parts = [f"{self._project_name(project_id)} {session_store.hours_to_short_format(seconds / 3600)}"
+                     for project_id, seconds in sorted(elapsed.items(), key=lambda item: -item[1])]
+            self.canvas.itemconfig(self.active_session_text_id, text=" · ".join(parts), font=self.small_button_font)
+        # The text only shows whole minutes, so wake up when the next timer reaches one
+        delay_ms = int(min(60 - seconds % 60 for seconds in elapsed.values()) * 1000) + 1
+        self._active_session_timer_id = self.master.after(delay_ms, self._update_active_session_display)
+
+    def _update_timer_animation(self):
+        """The GIF plays on the main page while any timer runs."""
+        if not self.gif_animator.is_loadable():
+            return
+        if self.open_timers and not self.summary_mode:
+            self.gif_animator.start_animation()
+        else:
+            self.gif_animator.stop_animation()
 
     def _update_button_visuals(self):
             """Updates all button visuals based on app state."""
@@ -435,6 +796,8 @@ class TimeTrackerApp:
         self.canvas.itemconfig(self.title_text_id, state="hidden")
         if self.animated_gif_item_id is not None:
             self.canvas.itemconfig(self.animated_gif_item_id, state="hidden")
+        self.canvas.itemconfig(self.project_text_id, state="hidden")
+        self.canvas.itemconfig(self.add_project_text_id, state="hidden")
         self.canvas.itemconfig(self.status_text_id, state="hidden")
         self.canvas.itemconfig(self.active_session_text_id, state="hidden")
         self.canvas.itemconfig(self.hours_display_text_id, state="hidden")
@@ -460,6 +823,8 @@ class TimeTrackerApp:
         self.canvas.itemconfig(self.title_text_id, state="normal")
         if self.animated_gif_item_id is not None:
             self.canvas.itemconfig(self.animated_gif_item_id, state="normal")
+        self.canvas.itemconfig(self.project_text_id, state="normal")
+        self.canvas.itemconfig(self.add_project_text_id, state="normal")
         self.canvas.itemconfig(self.status_text_id, state="normal")
         self.canvas.itemconfig(self.active_session_text_id, state="normal")
         self.canvas.itemconfig(self.hours_display_text_id, state="normal")
@@ -472,7 +837,7 @@ class TimeTrackerApp:
             if self.clock_out_text_item: self.canvas.itemconfig(self.clock_out_text_item, state="normal")
             # Reset button text is handled by _hide_summary_elements (as it's on summary page)
 
-        if self.clock_in_time and self.gif_animator.is_loadable():
+        if self.open_timers and self.gif_animator.is_loadable():
             self.gif_animator.start_animation()
 
 
@@ -480,6 +845,9 @@ class TimeTrackerApp:
         """Shows the weekly summary UI elements."""
         self.canvas.itemconfig(self.summary_title_id, state="normal")
         self.canvas.itemconfig(self.summary_text_display_id, state="normal")
+        self.canvas.itemconfig(self.summary_range_text_id, state="normal")
+        self.summary_list.show()
+        self.heatmap.show()
 
         # Position and show Reset button on summary page
         side_button_size = (80, 30)
@@ -496,31 +864,107 @@ class TimeTrackerApp:
         """Hides the weekly summary UI elements."""
         self.canvas.itemconfig(self.summary_title_id, state="hidden")
         self.canvas.itemconfig(self.summary_text_display_id, state="hidden")
+        self.canvas.itemconfig(self.summary_range_text_id, state="hidden")
+        self.summary_list.hide()
+        self.heatmap.hide()
+        self.heatmap.clear_selection()
         self.canvas.itemconfig(self.reset_item, state="hidden") # Hide Reset button
         if not self.use_image_buttons and self.reset_text_item:
             self.canvas.itemconfig(self.reset_text_item, state="hidden")
 
 
     def display_weekly_summary(self):
-        def week_range_from_iso(iso_year_week: str):
-            year, week = map(int, iso_year_week.split('-W'))
-            start = datetime.strptime(f'{year}-W{week}-1', "%Y-W%W-%w")
-            end = start + timedelta(days=6)
-            return start, end
+        """Re-reads the range of recorded weeks and reloads the summary list from the top."""
+        self.summary_stale = False
 
-        weekly_summary = self.get_weekly_hours_summary()
-        summary_text = ""
+        def on_span(future):
+            try:
+                span = future.result()
+            except sqlite3.Error as e:
+                print(f"Error querying weekly summary from database: {e}")
+                span = None
+            if span is None:
+                self.summary_newest_week = None
+                self.summary_list.reset(0)
+                self.canvas.itemconfig(self.summary_text_display_id, text="Nothing's here...")
+                return
+            oldest, newest = span
+            self.summary_newest_week = newest
+            self.canvas.itemconfig(self.summary_text_display_id, text="")
+            self.summary_list.reset((newest - oldest).days // 7 + 1)
+
+        if not self.db:
+            on_span(self._failed_future("No database connection"))
+            return
+        self.db.then(self.db.read(session_store.get_week_span), on_span)
 
-        if not weekly_summary:
-            summary_text = "Nothing's here..."
-        else:
-            for week_key in sorted(weekly_summary.keys()):
-                start, end = week_range_from_iso(week_key)
-                date_range = f"{start.month}/{start.day}/{start.strftime('%y')}-{end.month}/{end.day}/{end.strftime('%y')}"
-                hours = self.hours_to_h_m_format(weekly_summary[week_key])
-                summary_text += f"{date_range}: {hours}\n"
+    # --- Activity heatmap ---
+    def _refresh_activity(self):
+        """Redraws the heatmap and range totals, reloading the per-day totals only if they may be out of date."""
+        if self.daily_totals is not None and not self.daily_totals_stale:
+            self._draw_activity()
+            return
+        if not self.db:
+            return
+        self.daily_totals_stale = False
 
-        self.canvas.itemconfig(self.summary_text_display_id, text=summary_text)
+        def on_loaded(future):
+            try:
+                self.daily_totals = future.result()
+            except sqlite3.Error as e:
+                print(f"Error loading daily totals from database: {e}")
+                return
+            self._draw_activity()
+
+        self.db.then(self.db.read(DailyTotals.load), on_loaded)
+
+    def _draw_activity(self):
+        self.heatmap.update(self.daily_totals)
+        if self.heatmap.selection:
+            self._on_heatmap_select(*self.heatmap.selected_days())
+            return
+        today = date.today()
+        last_7 = self.daily_totals.total_seconds(today - timedelta(days=6), today) / 3600
+        last_30 = self.daily_totals.total_seconds(today - timedelta(days=29), today) / 3600
+        self.canvas.itemconfig(self.summary_range_text_id, text=f"Last 7 days: {session_store.hours_to_short_format(last_7)}"
+                                                                f" · Last 30 days: {session_store.hours_to_short_format(last_30)}")
+
+    def _on_heatmap_select(self, start, end):
+        if self.daily_totals is None:
+            return
+        hours = self.daily_totals.total_seconds(start, end) / 3600
+        label = f"{start.month}/{start.day}/{start.strftime('%y')}"
+        if end != start:
+            label += f"-{end.month}/{end.day}/{end.strftime('%y')}"
+        self.canvas.itemconfig(self.summary_range_text_id, text=f"{label}: {self.hours_to_h_m_format(hours)}")
+
+    def _fetch_summary_page(self, first_row, row_count, callback):
+        if not self.db:
+            callback(None)
+            return
+
+        def on_page(future):
+            try:
+                callback(future.result())
+            except sqlite3.Error as e:
+                print(f"Error querying weekly summary from database: {e}")
+                callback(None)
+
+        self.db.then(self.db.read(session_store.get_weekly_hours_page, self.summary_newest_week, first_row, row_count), on_page)
+
+    def _format_summary_row(self, row):
+        week_key, hours = row
+        return f"{session_store.format_week_range(week_key)}: {self.hours_to_h_m_format(hours)}"
+
+    def _on_summary_scroll(self, event):
+        if not self.summary_mode:
+            return
+        if event.keysym in ("Prior", "Next"):
+            self.summary_list.scroll_pages(-1 if event.keysym == "Prior" else 1)
+        elif event.keysym == "Up" or getattr(event, "num", None) == 4 or getattr(event, "delta", 0) > 0:
+            self.summary_list.scroll(-1)
+        else:
+            self.summary_list.scroll(1)
 
 
     def toggle_summary_display(self, *args):
@@ -529,7 +973,9 @@ class TimeTrackerApp:
         if self.summary_mode:
             self._show_summary_elements()
             self._hide_main_page_elements()
-            self.display_weekly_summary()
+            if self.summary_stale:
+                self.display_weekly_summary()
+            self._refresh_activity()
             if self.gif_animator.is_loadable():
                 self.gif_animator.stop_animation()
             if self.computer_animator:
@@ -537,10 +983,7 @@ class TimeTrackerApp:
         else:
             self._hide_summary_elements()
             self._show_main_page_elements()
-            if self.clock_in_time and self.gif_animator.is_loadable():
-                self.gif_animator.start_animation()
-            elif self.gif_animator.is_loadable():
-                self.gif_animator.stop_animation()
+            self._update_timer_animation()
 
         self._update_button_visuals()
 
@@ -553,7 +996,54 @@ class TimeTrackerApp:
             self.computer_animator.clear_hearts()
 
 
+    # --- Instrumentation (main.py --instrument) ---
+    def enable_instrumentation(self, monitor):
+        """Adds the app's gauges to `monitor` and binds F12 (overlay) and Shift+F12 (write the JSON stats)."""
+        monitor.add_gauge("canvas items", lambda: len(self.canvas.find_all()))
+        monitor.add_gauge("frame tasks", self.animation_scheduler.active_count)
+        monitor.add_gauge("late ticks", lambda: self.animation_scheduler.late_ticks)
+        monitor.add_gauge("canvas calls skipped", lambda: self.canvas.skipped)
+        if self.db:
+            monitor.add_gauge("db results pending", self.db.pending_count)
+        self.monitor_overlay = MonitorOverlay(self.canvas, monitor)
+        self.master.bind("<F12>", self.monitor_overlay.toggle)
+        self.master.bind("<Shift-F12>", lambda event: monitor.dump())
+
+    def start_control_server(self, path=None):
+        """Serves status, totals and clock-in/out to local clients over a Unix socket; see control_server."""
+        if not self.db:
+            print("Control server not started: no database connection")
+            return None
+        import control_server  # asyncio is only needed with --control-socket
+        path = path or control_server.default_socket_path(self.db_file_path)
+        try:
+            self.control_server = control_server.ControlServer(self.db, path, self.master, self._sync_open_timers,
+                                                               stats_cache=self.stats_cache)
+        except OSError as e:
+            print(f"Control server not started on {path}: {e}")
+            return None
+        print(f"Control server listening on {path}")
+        return self.control_server
+
+    def _notify_control_server(self, future=None):
+        if self.control_server:
+            self.control_server.notify_changed(future)
+
     def on_close(self):
+        if self.monitor_overlay:
+            self.monitor_overlay.cancel()
+        if self.control_server:
+            # Before the database closes, so requests in flight still get their answers
+            self.control_server.stop()
+            self.control_server = None
         self.stop_all_animations()
+        self.gif_animator.close()
+        if self.asset_pool:
+            self.asset_pool.shutdown(wait=False, cancel_futures=True)
+            self.asset_dispatcher.close()
+        self.animation_scheduler.stop()
+        self.summary_list.cancel_fetch()
+        if self._active_session_timer_id is not None:
+            self.master.after_cancel(self._active_session_timer_id)
         self.close_db_connection()
         self.master.destroy()
\ No newline at end of file
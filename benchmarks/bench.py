@@ -0,0 +1,428 @@
+"""Reproducible benchmarks for startup, animation and database hot paths.
+
+GUI benchmarks run in child processes (so every cold start really is cold)
+against a throwaway database and sprite cache, under a private Xvfb server
+when no display is available. Database benchmarks run against generated
+databases of the requested sizes, cached between runs in --work-dir under a
+name that includes the schema version, so a schema change regenerates them.
+
+    python benchmarks/bench.py                       # run everything, write results JSON
+    python benchmarks/bench.py --only db --sizes 1000,100000
+    python benchmarks/bench.py --save-baseline       # store results as the new baseline
+
+Results are compared against benchmarks/baseline.json; any metric that got
+worse by more than --threshold exits with status 1. Timings only compare on
+the same machine, so no baseline is committed: record one with
+--save-baseline before the change under test, then run again after it.
+A baseline taken on another schema version is reported and not compared.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_ROOT)
+
+import schema_migrations
+import session_partitions
+import session_store
+from db_executor import DatabaseExecutor
+
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+DEFAULT_SIZES = (1_000, 100_000, 1_000_000)
+
+
+# --- Helpers ---
+def summarize(samples, unit, higher_is_better=False):
+    ordered = sorted(samples)
+    p95_index = min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))
+    return {
+        "median": statistics.median(ordered),
+        "p95": ordered[p95_index],
+        "min": ordered[0],
+        "max": ordered[-1],
+        "samples": len(ordered),
+        "unit": unit,
+        "higher_is_better": higher_is_better,
+    }
+
+
+class VirtualDisplay:
+    """Starts a private Xvfb server unless a display is already available."""
+
+    def __init__(self, force=False):
+        self.force = force
+        self.process = None
+        self.previous_display = os.environ.get("DISPLAY")
+
+    def __enter__(self):
+        if self.previous_display and not self.force:
+            return self
+        xvfb = shutil.which("Xvfb")
+        if xvfb is None:
+            raise RuntimeError("No DISPLAY and Xvfb is not installed; GUI benchmarks need one of them")
+        for display_number in range(99, 200):
+            if not os.path.exists(f"/tmp/.X{display_number}-lock"):
+                break
+        display = f":{display_number}"
+        self.process = subprocess.Popen([xvfb, display, "-screen", "0", "1024x768x24", "-nolisten", "tcp"],
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        socket_path = f"/tmp/.X11-unix/X{display_number}"
+        deadline = time.monotonic() + 10
+        while not os.path.exists(socket_path):
+            if self.process.poll() is not None or time.monotonic() > deadline:
+                raise RuntimeError("Xvfb failed to start")
+            time.sleep(0.05)
+        os.environ["DISPLAY"] = display
+        return self
+
+    def __exit__(self, *exc):
+        if self.process is not None:
+            self.process.terminate()
+            self.process.wait(timeout=5)
+            if self.previous_display is None:
+                os.environ.pop("DISPLAY", None)
+            else:
+                os.environ["DISPLAY"] = self.previous_display
+
+
+def run_child(mode, *args):
+    """Runs one GUI measurement in a fresh interpreter and returns its JSON payload."""
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", mode, *args],
+                            cwd=REPO_ROOT, capture_output=True, text=True, check=True).stdout
+    # The app prints status lines; the payload is the last line
+    return json.loads(output.strip().splitlines()[-1])
+
+
+# --- GUI children (run inside the subprocess) ---
+def _make_app(db_path, cache_dir, **options):
+    import tkinter as tk
+    from app_module import TimeTrackerApp
+
+    root = tk.Tk()
+    start = time.perf_counter()
+    app = TimeTrackerApp(root, db_path=db_path, sprite_cache_dir=cache_dir, **options)
+    init_seconds = time.perf_counter() - start
+    return root, app, init_seconds
+
+
+def _pump(root, seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        root.update()
+        time.sleep(0.001)
+
+
+def child_startup(db_path, cache_dir):
+    root, app, init_seconds = _make_app(db_path, cache_dir)
+    # Time until the first GIF frame is on screen (streaming decode)
+    start = time.perf_counter()
+    while not app.gif_animator.has_first_frame() and time.perf_counter() - start < 10:
+        root.update()
+    first_frame_seconds = init_seconds + (time.perf_counter() - start)
+    app.on_close()
+    return {"init_ms": init_seconds * 1000, "first_frame_ms": first_frame_seconds * 1000}
+
+
+def child_gif_jitter(db_path, cache_dir, seconds):
+    root, app, _ = _make_app(db_path, cache_dir)
+    gif = app.gif_animator
+    while not gif.decode_finished:
+        root.update()
+
+    shown = []  # (monotonic time, frame index) whenever a new frame hits the canvas
+    original = gif._animate_gif
+
+    def timed_animate(now):
+        before = gif.frame_index
+        keep = original(now)
+        if gif.frame_index != before or not shown:
+            shown.append((time.monotonic(), before))
+        return keep
+
+    gif._animate_gif = timed_animate
+    gif.start_animation()
+    _pump(root, seconds)
+    app.on_close()
+
+    jitter = []
+    for (t0, index), (t1, _) in zip(shown, shown[1:]):
+        jitter.append(abs((t1 - t0) - gif._frame_duration(index)) * 1000)
+    return {"jitter_ms": jitter}
+
+
+def child_click_storm(db_path, cache_dir, seconds, clicks_per_tick, effects_backend):
+    root, app, _ = _make_app(db_path, cache_dir, effects_backend=effects_backend)
+    while not app.gif_animator.has_first_frame():
+        root.update()
+    app.clock_in()
+
+    scheduler = app.animation_scheduler
+    frame_times = []
+    original_tick = scheduler._tick
+
+    def timed_tick():
+        start = time.perf_counter()
+        original_tick()
+        frame_times.append((time.perf_counter() - start) * 1000)
+
+    scheduler._tick = timed_tick
+    rng = random.Random(1234)
+    update_times = []  # Whole event-loop passes, including idle flushes and Tk's redraw
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        for _ in range(clicks_per_tick):
+            app.computer_animator._handle_computer_click(SimpleNamespace(x=rng.randint(110, 290), y=rng.randint(80, 260)))
+        start = time.perf_counter()
+        root.update()
+        update_times.append((time.perf_counter() - start) * 1000)
+        time.sleep(scheduler.frame_interval)
+    canvas_stats = app.canvas.stats()
+    canvas_items = len(app.canvas.find_all())
+    app.on_close()
+    return {"frame_ms": frame_times, "update_ms": update_times, "canvas": canvas_stats, "canvas_items": canvas_items}
+
+
+# --- GUI benchmarks (parent side) ---
+def bench_startup(work_dir, repeats):
+    results = {}
+    cold, warm, cold_first, warm_first = [], [], [], []
+    for i in range(repeats):
+        cache_dir = tempfile.mkdtemp(prefix="sprites-", dir=work_dir)
+        db_path = os.path.join(work_dir, f"startup-{i}.db")
+        first = run_child("startup", db_path, cache_dir)
+        second = run_child("startup", db_path, cache_dir)
+        cold.append(first["init_ms"])
+        cold_first.append(first["first_frame_ms"])
+        warm.append(second["init_ms"])
+        warm_first.append(second["first_frame_ms"])
+    results["startup.cold_init"] = summarize(cold, "ms")
+    results["startup.cold_first_frame"] = summarize(cold_first, "ms")
+    results["startup.warm_init"] = summarize(warm, "ms")
+    results["startup.warm_first_frame"] = summarize(warm_first, "ms")
+    return results
+
+
+def bench_gif_jitter(work_dir, seconds):
+    cache_dir = tempfile.mkdtemp(prefix="sprites-", dir=work_dir)
+    payload = run_child("gif_jitter", os.path.join(work_dir, "gif.db"), cache_dir, str(seconds))
+    return {"gif.frame_jitter": summarize(payload["jitter_ms"] or [0.0], "ms")}
+
+
+def bench_click_storm(work_dir, seconds, clicks_per_tick, effects_backend="canvas"):
+    cache_dir = tempfile.mkdtemp(prefix="sprites-", dir=work_dir)
+    payload = run_child("click_storm", os.path.join(work_dir, f"storm-{effects_backend}.db"), cache_dir,
+                        str(seconds), str(clicks_per_tick), effects_backend)
+    canvas = payload["canvas"]
+    requested = canvas["sent"] + canvas["skipped"] + canvas["coalesced"]
+    # The canvas backend keeps the original metric names so existing baselines still compare
+    suffix = f"x{clicks_per_tick}" if effects_backend == "canvas" else f"x{clicks_per_tick}.{effects_backend}"
+    return {
+        f"click_storm.frame_time_{suffix}": summarize(payload["frame_ms"] or [0.0], "ms"),
+        f"click_storm.update_time_{suffix}": summarize(payload["update_ms"] or [0.0], "ms"),
+        f"click_storm.canvas_items_{suffix}": summarize([payload["canvas_items"]], "items"),
+        # Share of itemconfig/coords calls that never reached Tk
+        f"click_storm.canvas_calls_saved_{suffix}": summarize(
+            [100.0 * (canvas["skipped"] + canvas["coalesced"]) / max(requested, 1)], "%", higher_is_better=True),
+    }
+
+
+# --- Database benchmarks ---
+def generate_database(path, session_count, seed=42):
+    """Creates a current-schema database with `session_count` sessions spread back from today."""
+    if os.path.exists(path):
+        return path
+    tmp_path = path + ".partial"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path, isolation_level=None)
+    schema_migrations.migrate(conn)
+    rng = random.Random(seed)
+    # Roughly six sessions a day, ending now
+    t = int(time.time()) - session_count * 4 * 3600
+    offset = datetime.now().astimezone().utcoffset().total_seconds()
+
+    def rows():
+        nonlocal t
+        for _ in range(session_count):
+            t += rng.randint(600, 8 * 3600)
+            duration = rng.randint(60, 3 * 3600)
+            yield t, int(offset), t + duration, int(offset), duration, ""
+
+    conn.execute("BEGIN")
+    conn.execute("CREATE TEMP TABLE generated (clock_in, clock_in_offset, clock_out, clock_out_offset, duration_seconds, notes)")
+    conn.executemany("INSERT INTO generated VALUES (?, ?, ?, ?, ?, ?)", rows())
+    session_partitions.insert_sessions(conn, "SELECT NULL, *, NULL FROM generated ORDER BY rowid")
+    conn.execute("COMMIT")
+    conn.close()
+    os.replace(tmp_path, path)
+    return path
+
+
+def bench_database(work_dir, sizes, repeats, writes):
+    results = {}
+    for size in sizes:
+        source = generate_database(
+            os.path.join(work_dir, f"sessions-{size}-v{schema_migrations.SCHEMA_VERSION}.db"), size)
+
+        conn = sqlite3.connect(source, isolation_level=None)
+        full, recent = [], []
+        recent_start = datetime.now() - timedelta(weeks=12)
+        for _ in range(repeats):
+            start = time.perf_counter()
+            session_store.get_weekly_hours_summary(conn)
+            full.append((time.perf_counter() - start) * 1000)
+            start = time.perf_counter()
+            session_store.get_weekly_hours_summary(conn, start=recent_start)
+            recent.append((time.perf_counter() - start) * 1000)
+        conn.close()
+        results[f"db.weekly_summary_all.{size}"] = summarize(full, "ms")
+        results[f"db.weekly_summary_12w.{size}"] = summarize(recent, "ms")
+
+        # Writes go to a scratch copy so the generated database stays reusable
+        scratch = os.path.join(work_dir, f"scratch-{size}.db")
+        shutil.copyfile(source, scratch)
+        throughput = []
+        for _ in range(repeats):
+            executor = DatabaseExecutor(scratch)
+            now = datetime.now()
+            start = time.perf_counter()
+            futures = [executor.write(session_store.record_session, now, now + timedelta(minutes=5), "")
+                       for _ in range(writes)]
+            for future in futures:
+                future.result()
+            throughput.append(writes / (time.perf_counter() - start))
+            executor.close()
+        os.remove(scratch)
+        for suffix in ("-wal", "-shm"):
+            if os.path.exists(scratch + suffix):
+                os.remove(scratch + suffix)
+        results[f"db.record_session_per_s.{size}"] = summarize(throughput, "ops/s", higher_is_better=True)
+    return results
+
+
+# --- Baseline comparison ---
+def compare(results, baseline, threshold):
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous:
+            continue
+        before, after = previous["median"], current["median"]
+        if before <= 0:
+            continue
+        change = (after - before) / before
+        if current.get("higher_is_better"):
+            change = -change
+        status = "REGRESSION" if change > threshold else "ok"
+        print(f"  {status:<10} {name:<40} {before:>12.3f} -> {after:>12.3f} {current['unit']} ({change:+.1%})")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", choices=("startup", "gif", "clicks", "db"), action="append",
+                        help="Run only these groups (repeatable); default runs all")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="Comma-separated session counts for the database benchmarks")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--writes", type=int, default=2000, help="record_session calls per throughput sample")
+    parser.add_argument("--gif-seconds", type=float, default=5.0)
+    parser.add_argument("--storm-seconds", type=float, default=5.0)
+    parser.add_argument("--clicks-per-tick", type=int, default=10)
+    parser.add_argument("--effects", choices=("canvas", "composite"), action="append",
+                        help="Effects backend(s) for the click storm (repeatable); default runs both")
+    parser.add_argument("--work-dir", default=os.path.join(tempfile.gettempdir(), "kawaii-bench"),
+                        help="Where generated databases are cached between runs")
+    parser.add_argument("--output", default=os.path.join(BENCH_DIR, "results.json"))
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--threshold", type=float, default=0.15, help="Allowed slowdown before failing (0.15 = 15%%)")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--xvfb", action="store_true", help="Use a private Xvfb server even if DISPLAY is set")
+    parser.add_argument("--child", nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        mode, *rest = args.child
+        if mode == "startup":
+            payload = child_startup(*rest)
+        elif mode == "gif_jitter":
+            payload = child_gif_jitter(rest[0], rest[1], float(rest[2]))
+        else:
+            payload = child_click_storm(rest[0], rest[1], float(rest[2]), int(rest[3]), rest[4])
+        print(json.dumps(payload))
+        return 0
+
+    groups = set(args.only or ("startup", "gif", "clicks", "db"))
+    os.makedirs(args.work_dir, exist_ok=True)
+    gui_dir = tempfile.mkdtemp(prefix="gui-", dir=args.work_dir)
+    results = {}
+    try:
+        if groups & {"startup", "gif", "clicks"}:
+            with VirtualDisplay(force=args.xvfb):
+                if "startup" in groups:
+                    results.update(bench_startup(gui_dir, args.repeats))
+                if "gif" in groups:
+                    results.update(bench_gif_jitter(gui_dir, args.gif_seconds))
+                if "clicks" in groups:
+                    for effects_backend in args.effects or ("canvas", "composite"):
+                        results.update(bench_click_storm(gui_dir, args.storm_seconds, args.clicks_per_tick, effects_backend))
+        if "db" in groups:
+            sizes = [int(size) for size in args.sizes.split(",") if size]
+            results.update(bench_database(args.work_dir, sizes, args.repeats, args.writes))
+    finally:
+        shutil.rmtree(gui_dir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sqlite": sqlite3.sqlite_version,
+            "schema_version": schema_migrations.SCHEMA_VERSION,
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(results)} results to {args.output}")
+
+    if args.save_baseline:
+        shutil.copyfile(args.output, args.baseline)
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to record one on this machine")
+        return 0
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    baseline_schema = baseline.get("meta", {}).get("schema_version")
+    if baseline_schema != schema_migrations.SCHEMA_VERSION:
+        print(f"Baseline {args.baseline} was recorded on schema v{baseline_schema}, not v{schema_migrations.SCHEMA_VERSION}; "
+              "not comparing. Record a new one with --save-baseline")
+        return 0
+    print(f"Comparing against {args.baseline} (threshold {args.threshold:.0%}):")
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,286 @@
+"""Event-loop instrumentation for `main.py --instrument`.
+
+`enable()` wraps every `after`/`after_idle` timer and every `bind`,
+`bind_all` and `tag_bind` handler registered from then on, by patching the
+tkinter base classes. Each call is timed into a per-callback histogram, and
+timers also record how late they fired compared with when they were due.
+FrameScheduler tasks and TkDispatcher deliveries go through `wrap()`, so
+each animation and each database result handler shows up under its own name
+instead of inside one "tick". Unless a monitor is enabled `wrap()` returns
+the callback unchanged and tkinter is left alone, so normal runs pay
+nothing.
+
+In the window, F12 toggles an overlay with the live numbers and Shift+F12
+writes them to the JSON file given to --instrument (also written on exit).
+"""
+import bisect
+import json
+import os
+import sys
+import time
+import tkinter as tk
+
+_active = None
+
+# Upper bounds (ms) of the histogram buckets; one more bucket holds everything slower
+BUCKET_BOUNDS_MS = (0.125, 0.25, 0.5, 1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+def callback_name(func):
+    func = getattr(func, "func", func)  # functools.partial
+    name = getattr(func, "__qualname__", None) or type(func).__name__
+    return name.replace(".<locals>", "")
+
+
+class Histogram:
+    __slots__ = ("buckets", "count", "total_ms", "max_ms")
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms):
+        self.buckets[bisect.bisect_left(BUCKET_BOUNDS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of samples (the max for the last bucket)."""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for bound, count in zip(BUCKET_BOUNDS_MS, self.buckets):
+            seen += count
+            if seen >= target:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def to_dict(self):
+        labels = [f"<={bound}" for bound in BUCKET_BOUNDS_MS] + [f">{BUCKET_BOUNDS_MS[-1]}"]
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_ms, 3),
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "max_ms": round(self.max_ms, 3),
+            "buckets_ms": {label: count for label, count in zip(labels, self.buckets) if count},
+        }
+
+
+class CallbackStats:
+    __slots__ = ("kind", "duration", "lateness", "errors")
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.duration = Histogram()
+        self.lateness = Histogram() if kind == "timer" else None
+        self.errors = 0
+
+
+class CallbackMonitor:
+    def __init__(self, dump_path=None):
+        self.origin = time.perf_counter()
+        self.dump_path = dump_path
+        self.stats = {}    # (kind, name) -> CallbackStats
+        self.pending = {}  # after id -> callback name, for timers that haven't fired yet
+        self.gauges = {}   # name -> zero-argument function, sampled for the overlay and the dump
+        self._originals = {}
+
+    def _stats(self, kind, name):
+        stats = self.stats.get((kind, name))
+        if stats is None:
+            stats = self.stats[(kind, name)] = CallbackStats(kind)
+        return stats
+
+    def call(self, kind, name, func, args, due=None):
+        """Runs `func(*args)`, recording its duration (and, given `due`, how late it started)."""
+        stats = self._stats(kind, name)
+        start = time.perf_counter()
+        if due is not None:
+            stats.lateness.add(max(start - due, 0.0) * 1000)
+        try:
+            return func(*args)
+        except Exception:
+            stats.errors += 1
+            raise
+        finally:
+            stats.duration.add((time.perf_counter() - start) * 1000)
+
+    def wrap(self, kind, func, name=None):
+        name = name or callback_name(func)
+        return lambda *args: self.call(kind, name, func, args)
+
+    def add_gauge(self, name, read):
+        self.gauges[name] = read
+
+    # --- tkinter patching ---
+    def install(self):
+        """Patches tkinter so every timer and event handler registered from now on is measured."""
+        monitor = self
+        after = self._originals["after"] = tk.Misc.after
+        after_cancel = self._originals["after_cancel"] = tk.Misc.after_cancel
+        bind = self._originals["bind"] = tk.Misc.bind
+        bind_all = self._originals["bind_all"] = tk.Misc.bind_all
+        tag_bind = self._originals["tag_bind"] = tk.Canvas.tag_bind
+
+        # after_idle is after("idle", ...), so this covers both
+        def patched_after(widget, ms, func=None, *args):
+            if func is None:
+                return after(widget, ms)  # The blocking sleep form
+            name = callback_name(func)
+            due = time.perf_counter() + (0 if ms == "idle" else ms / 1000)
+            after_id = None
+
+            def fire():
+                monitor.pending.pop(after_id, None)
+                return monitor.call("timer", name, func, args, due)
+            after_id = after(widget, ms, fire)
+            monitor.pending[after_id] = name
+            return after_id
+
+        def patched_after_cancel(widget, after_id):
+            monitor.pending.pop(after_id, None)
+            return after_cancel(widget, after_id)
+
+        def patched_bind(widget, sequence=None, func=None, add=None):
+            if func is None or isinstance(func, str):
+                return bind(widget, sequence, func, add)
+            return bind(widget, sequence, monitor.wrap("event", func, f"{sequence} {callback_name(func)}"), add)
+
+        def patched_bind_all(widget, sequence=None, func=None, add=None):
+            if func is None or isinstance(func, str):
+                return bind_all(widget, sequence, func, add)
+            return bind_all(widget, sequence, monitor.wrap("event", func, f"{sequence} {callback_name(func)}"), add)
+
+        def patched_tag_bind(canvas, tag_or_id, sequence=None, func=None, add=None):
+            if func is None or isinstance(func, str):
+                return tag_bind(canvas, tag_or_id, sequence, func, add)
+            return tag_bind(canvas, tag_or_id, sequence, monitor.wrap("event", func, f"{sequence} {callback_name(func)}"), add)
+
+        tk.Misc.after = patched_after
+        tk.Misc.after_cancel = patched_after_cancel
+        tk.Misc.bind = patched_bind
+        tk.Misc.bind_all = patched_bind_all
+        tk.Canvas.tag_bind = patched_tag_bind
+
+    def uninstall(self):
+        for name in ("after", "after_cancel", "bind", "bind_all"):
+            if name in self._originals:
+                setattr(tk.Misc, name, self._originals.pop(name))
+        if "tag_bind" in self._originals:
+            tk.Canvas.tag_bind = self._originals.pop("tag_bind")
+
+    # --- Reporting ---
+    def sample_gauges(self):
+        values = {"pending timers": len(self.pending)}
+        for name, read in self.gauges.items():
+            try:
+                values[name] = read()
+            except (tk.TclError, AttributeError):
+                values[name] = None  # The widget is gone (e.g. during shutdown)
+        return values
+
+    def snapshot(self):
+        callbacks = []
+        for (kind, name), stats in self.stats.items():
+            entry = {"kind": kind, "name": name, "errors": stats.errors, "duration": stats.duration.to_dict()}
+            if stats.lateness is not None:
+                entry["lateness"] = stats.lateness.to_dict()
+            callbacks.append(entry)
+        callbacks.sort(key=lambda entry: entry["duration"]["total_ms"], reverse=True)
+        return {
+            "uptime_s": round(time.perf_counter() - self.origin, 3),
+            "gauges": self.sample_gauges(),
+            "pending_timers": sorted(self.pending.values()),
+            "callbacks": callbacks,
+        }
+
+    def summary_lines(self, limit=8):
+        """Short text for the overlay: the gauges, then the callbacks with the most total time."""
+        gauges = self.sample_gauges()
+        lines = [" · ".join(f"{name} {value}" for name, value in gauges.items()),
+                 f"{'callback':<24}{'n':>6}{'p95':>6}{'max':>7}{'late':>6}"]
+        top = sorted(self.stats.items(), key=lambda item: item[1].duration.total_ms, reverse=True)[:limit]
+        for (kind, name), stats in top:
+            late = f"{stats.lateness.percentile(0.95):.0f}" if stats.lateness is not None else "-"
+            short = name if len(name) <= 23 else "…" + name[-22:]  # The method name is the useful end
+            lines.append(f"{short:<24}{stats.duration.count:>6}{stats.duration.percentile(0.95):>6.1f}"
+                         f"{stats.duration.max_ms:>7.1f}{late:>6}")
+        return lines
+
+    def dump(self, path=None):
+        path = path or self.dump_path
+        partial_path = path + ".part"
+        with open(partial_path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(partial_path, path)
+        print(f"Callback stats written to {path}", file=sys.stderr)
+        return path
+
+
+class MonitorOverlay:
+    """A toggleable text panel over the canvas with the monitor's live numbers."""
+
+    REFRESH_MS = 500
+
+    def __init__(self, canvas, monitor, x=4, y=4, font=("Courier", 8)):
+        self.canvas = canvas
+        self.monitor = monitor
+        self.visible = False
+        self._refresh_id = None
+        self.background_id = canvas.create_rectangle(x, y, x, y, fill="#FFFFFF", outline="#80084A", state="hidden")
+        self.text_id = canvas.create_text(x + 4, y + 4, text="", font=font, fill="#80084A", anchor="nw", state="hidden")
+
+    def toggle(self, event=None):
+        self.visible = not self.visible
+        if self.visible:
+            self.canvas.itemconfig(self.background_id, state="normal")
+            self.canvas.itemconfig(self.text_id, state="normal")
+            self.refresh()
+        else:
+            self.cancel()
+            self.canvas.itemconfig(self.background_id, state="hidden")
+            self.canvas.itemconfig(self.text_id, state="hidden")
+
+    def refresh(self):
+        self._refresh_id = None
+        self.canvas.itemconfig(self.text_id, text="\n".join(self.monitor.summary_lines()))
+        self.canvas.tag_raise(self.background_id)
+        self.canvas.tag_raise(self.text_id)
+        x1, y1, x2, y2 = self.canvas.bbox(self.text_id)
+        self.canvas.coords(self.background_id, x1 - 4, y1 - 4, x2 + 4, y2 + 4)
+        self._refresh_id = self.canvas.after(self.REFRESH_MS, self.refresh)
+
+    def cancel(self):
+        if self._refresh_id is not None:
+            self.canvas.after_cancel(self._refresh_id)
+            self._refresh_id = None
+
+
+def enable(dump_path):
+    global _active
+    _active = CallbackMonitor(dump_path)
+    _active.install()
+    return _active
+
+
+def disable():
+    global _active
+    monitor, _active = _active, None
+    if monitor:
+        monitor.uninstall()
+    return monitor
+
+
+def active():
+    return _active
+
+
+def wrap(kind, func):
+    """Returns `func` measured by the active monitor, or `func` itself when instrumentation is off."""
+    return _active.wrap(kind, func) if _active else func
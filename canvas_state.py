@@ -0,0 +1,117 @@
+import tkinter as tk
+
+_COORDS = "__coords__"  # Key under which an item's coordinates are cached
+
+
+class CanvasState:
+    """Retained-state front for a tk.Canvas that only sends real changes to Tk.
+
+    `itemconfig` and `coords` on integer item ids are compared with the last
+    value set for that option (including the options the item was created
+    with). Unchanged values are dropped and counted in `skipped`. Changes are
+    buffered per item and sent in one call per item from an idle callback,
+    so several updates to the same item within a frame become one Tcl call
+    (counted in `coalesced`). Any other canvas method flushes the buffer
+    first, so reads and deletions always see the latest state.
+
+    Everything else is passed straight through to the wrapped canvas, so it
+    can be handed to code that expects a tk.Canvas.
+    """
+
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self._state = {}    # item id -> {option: last value set}
+        self._pending = {}  # item id -> {option: value not yet sent to Tk}
+        self._flush_id = None
+        self.sent = 0       # itemconfig/coords calls actually made
+        self.skipped = 0    # calls dropped because nothing changed
+        self.coalesced = 0  # calls merged into an update already waiting for the flush
+
+    def __getattr__(self, name):
+        attr = getattr(self.canvas, name)
+        if name.startswith("create_"):
+            return lambda *args, **options: self._create(attr, args, options)
+        if not callable(attr) or name.startswith("after"):
+            return attr
+
+        def passthrough(*args, **kwargs):
+            self.flush()
+            return attr(*args, **kwargs)
+        return passthrough
+
+    def _create(self, create, args, options):
+        self.flush()
+        item_id = create(*args, **options)
+        coords = args[0] if len(args) == 1 and isinstance(args[0], (list, tuple)) else args
+        state = dict(options)
+        state[_COORDS] = tuple(float(value) for value in coords)
+        self._state[item_id] = state
+        return item_id
+
+    # --- Buffered writes ---
+    def _set(self, item_id, changes):
+        state = self._state.setdefault(item_id, {})
+        changed = {key: value for key, value in changes.items() if key not in state or state[key] != value}
+        if not changed:
+            self.skipped += 1
+            return
+        state.update(changed)
+        pending = self._pending.get(item_id)
+        if pending is None:
+            self._pending[item_id] = changed
+        else:
+            pending.update(changed)
+            self.coalesced += 1
+        if self._flush_id is None:
+            self._flush_id = self.canvas.after_idle(self.flush)
+
+    def itemconfig(self, item_id, cnf=None, **options):
+        if not isinstance(item_id, int) or cnf is not None or not options:
+            # Tags, queries and dict-style calls go straight to Tk; tag writes may touch any item
+            self.flush()
+            if options or cnf:
+                self._state.clear()
+            return self.canvas.itemconfig(item_id, cnf, **options)
+        self._set(item_id, options)
+
+    itemconfigure = itemconfig
+
+    def coords(self, item_id, *args):
+        if not isinstance(item_id, int) or not args:
+            self.flush()
+            if args:
+                self._state.clear()
+            return self.canvas.coords(item_id, *args)
+        values = args[0] if len(args) == 1 and isinstance(args[0], (list, tuple)) else args
+        self._set(item_id, {_COORDS: tuple(float(value) for value in values)})
+
+    def flush(self):
+        """Sends every buffered change to Tk now."""
+        if self._flush_id is not None:
+            self.canvas.after_cancel(self._flush_id)
+            self._flush_id = None
+        pending, self._pending = self._pending, {}
+        for item_id, options in pending.items():
+            try:
+                coords = options.pop(_COORDS, None)
+                if coords is not None:
+                    self.canvas.coords(item_id, *coords)
+                    self.sent += 1
+                if options:
+                    self.canvas.itemconfig(item_id, **options)
+                    self.sent += 1
+            except tk.TclError:
+                # Deleted behind our back (e.g. through the raw canvas)
+                self._state.pop(item_id, None)
+
+    def delete(self, *items):
+        self.flush()
+        for item_id in items:
+            if isinstance(item_id, int):
+                self._state.pop(item_id, None)
+            else:
+                self._state.clear()
+        return self.canvas.delete(*items)
+
+    def stats(self):
+        return {"sent": self.sent, "skipped": self.skipped, "coalesced": self.coalesced}
@@ -0,0 +1,351 @@
+"""Headless clock-in/out for scripts and launchers.
+
+    python main.py clock-in [--project NAME]
+    python main.py clock-out [--project NAME] --notes "chapter 3"
+    python main.py status | total | weekly [--weeks N] [--project NAME] | monthly | yearly  (add --archived to include the archive)
+    python main.py projects
+    python main.py stats
+    python main.py rollups verify | rebuild
+    python main.py import history.csv [--format csv|jsonl]
+    python main.py export sessions.csv [--format csv|jsonl|kses] [--from DATE] [--to DATE]
+    python main.py merge other/study_sessions.db [--full] [--reset-identity]
+    python main.py archive list | move [YEAR ...] | restore YEAR ... | drop YEAR ...
+
+Only the standard library and sqlite3 are imported (never tkinter or PIL), so
+a command finishes in a few tens of milliseconds; `stats` imports NumPy
+when it runs. Running timers are stored
+in the database, so the window picks up changes made here and vice versa.
+Each project has its own timer; without --project the untagged one is used.
+"""
+import argparse
+import os
+import sqlite3
+import sys
+from contextlib import closing
+from datetime import date, datetime, timedelta
+
+import rollups
+import schema_migrations
+import session_export
+import session_archive
+import session_partitions
+import session_import
+import session_merge
+import session_store
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "study_sessions.db")
+
+
+def connect(db_path):
+    conn = sqlite3.connect(db_path, isolation_level=None, timeout=5.0)
+    session_store.init_schema(conn)
+    return conn
+
+
+def _format_clock_in(epoch):
+    return datetime.fromtimestamp(epoch).strftime('%I:%M %p')
+
+
+def _active_hours(epoch):
+    return max(datetime.now().timestamp() - epoch, 0) / 3600
+
+
+def _project_label(name):
+    return f" [{name}]" if name else ""
+
+
+def clock_in(conn, args):
+    with schema_migrations.transaction(conn):
+        project_id = session_store.get_or_create_project(conn, args.project) if args.project else None
+        opened = session_store.open_session(conn, datetime.now(), project_id)
+        stored = session_store.get_open_session(conn, project_id)
+    if not opened:
+        print(f"You are already clocked in!{_project_label(args.project)} (since {_format_clock_in(stored[0])})")
+        return 1
+    print(f"Clocked In at: {_format_clock_in(stored[0])}{_project_label(args.project)}")
+    return 0
+
+
+def clock_out(conn, args):
+    with schema_migrations.transaction(conn):
+        project_id = session_store.find_project(conn, args.project) if args.project else None
+        result = None
+        if project_id is not None or not args.project:
+            result = session_store.close_open_session(conn, datetime.now(), args.notes, project_id=project_id)
+    if result is None:
+        print(f"You need to clock in first!{_project_label(args.project)}")
+        return 1
+    print(f"Clocked Out after {session_store.hours_to_h_m_format(result[1] / 3600)}{_project_label(args.project)}")
+    return 0
+
+
+def status(conn, args):
+    timers = session_store.get_open_timers(conn)
+    if not timers:
+        print("Clocked Out")
+    for _, name, clock_in_epoch, _ in timers:
+        print(f"Clocked In at: {_format_clock_in(clock_in_epoch)}{_project_label(name)}")
+        print(f"Active Session: {session_store.hours_to_h_m_format(_active_hours(clock_in_epoch))}")
+    return 0
+
+
+def projects(conn, args):
+    totals = session_store.get_project_totals(conn)
+    if not totals:
+        print("Nothing's here...")
+    for project_id, name, session_count, seconds in totals:
+        label = name if project_id is not None else "(no project)"
+        print(f"{label}: {session_store.hours_to_h_m_format(seconds / 3600)} in {session_count} session{'s' if session_count != 1 else ''}")
+    return 0
+
+
+def total(conn, args):
+    total_hours = session_store.load_total_seconds(conn, include_archived=args.archived) / 3600.0
+    print(f"Total Hours: {session_store.hours_to_h_m_format(total_hours)}")
+    return 0
+
+
+def weekly(conn, args):
+    this_monday = date.today() - timedelta(days=date.today().weekday())
+    range_start = this_monday - timedelta(weeks=args.weeks - 1)
+    project_id = session_store.find_project(conn, args.project) if args.project else None
+    if args.project and project_id is None:
+        print(f"No project called {args.project!r}")
+        return 1
+
+    def project_summary(db, start, end, include_archived):
+        return session_store.get_project_weekly_hours(db, project_id, start, end, include_archived)
+
+    summary_fn = project_summary if args.project else session_store.get_weekly_hours_summary
+    weekly_summary = _summary(conn, args, summary_fn, range_start)
+    if not weekly_summary:
+        print("Nothing's here...")
+    for week_key in sorted(weekly_summary):
+        print(f"{session_store.format_week_range(week_key)}: {session_store.hours_to_h_m_format(weekly_summary[week_key])}")
+    return 0
+
+
+def _summary(conn, args, summary, start=None, end=None):
+    return summary(conn, start, end, include_archived=args.archived)
+
+
+def monthly(conn, args):
+    monthly_summary = _summary(conn, args, session_store.get_monthly_hours_summary)
+    if not monthly_summary:
+        print("Nothing's here...")
+    for month in sorted(monthly_summary):
+        month_start = datetime.strptime(month, "%Y-%m")
+        print(f"{month_start.strftime('%B %Y')}: {session_store.hours_to_h_m_format(monthly_summary[month])}")
+    return 0
+
+
+def yearly(conn, args):
+    yearly_summary = _summary(conn, args, lambda db, start, end, include_archived: session_store.get_yearly_hours_summary(db, include_archived))
+    if not yearly_summary:
+        print("Nothing's here...")
+    for year in sorted(yearly_summary):
+        print(f"{year}: {session_store.hours_to_h_m_format(yearly_summary[year])}")
+    return 0
+
+
+def stats(conn, args):
+    import session_stats  # NumPy is only worth importing for this command
+    result = session_stats.compute(session_stats.load_columns(conn))
+    if not result["session_count"]:
+        print("Nothing's here...")
+        return 0
+    short = session_store.hours_to_short_format
+    print(f"Sessions: {result['session_count']:,} ({session_store.hours_to_h_m_format(result['total_seconds'] / 3600)})")
+    print(f"Session length: mean {short(result['mean_seconds'] / 3600)}, median {short(result['median_seconds'] / 3600)}")
+    print("Percentiles: " + " · ".join(f"p{p} {short(seconds / 3600)}" for p, seconds in result["percentiles"].items()))
+    print(f"Streak: {result['current_streak_days']} day(s) now, longest {result['longest_streak_days']} "
+          f"({result['active_days']:,} active days)")
+    print("Daily average: " + " · ".join(f"last {window} days {short(result[f'average_{window}d_seconds'] / 3600)}"
+                                           for window in session_stats.ROLLING_WINDOWS))
+    by_weekday = result["by_weekday"]["seconds"]
+    print("By weekday: " + " · ".join(f"{name} {short(seconds / 3600)}" for name, seconds in zip(session_stats.WEEKDAYS, by_weekday)))
+    by_hour = result["by_hour"]["seconds"]
+    busiest = max(by_hour)
+    print("By clock-in hour:")
+    for hour, seconds in enumerate(by_hour):
+        if seconds:
+            print(f"  {hour:02d}:00 {'█' * max(1, round(20 * seconds / busiest)):<20} {short(seconds / 3600)}")
+    return 0
+
+
+def check_rollups(conn, args):
+    if args.action == "rebuild":
+        with schema_migrations.transaction(conn):
+            rollups.rebuild(conn, session_partitions.partition_tables(conn))
+        print("Rollups rebuilt from the session partitions")
+        return 0
+    problems = rollups.verify(conn, session_partitions.partition_tables(conn))
+    for table, partition_id, bucket, stored, actual in problems[:20]:
+        print(f"{table} partition {partition_id} {bucket}: stored (sessions, seconds) {stored}, actual {actual}")
+    if problems:
+        print(f"{len(problems)} drifted bucket(s); run `main.py rollups rebuild` to repair")
+        return 1
+    print("Rollups match the session partitions")
+    return 0
+
+
+def import_file(conn, args):
+    def report(counts):
+        print(f"\rImported {counts['read']:,} records: {counts['inserted']:,} new, "
+              f"{counts['duplicates']:,} duplicates, {counts['invalid']:,} invalid", end="", file=sys.stderr)
+
+    try:
+        counts = session_import.import_sessions(conn, args.path, args.format, args.batch_size, progress=report)
+    except (OSError, UnicodeDecodeError, ValueError) as e:
+        print(f"Import failed: {e}", file=sys.stderr)
+        return 1
+    if counts["already_imported"]:
+        print(f"{args.path} was already imported")
+        return 0
+    print(file=sys.stderr)
+    if counts["resumed_at"]:
+        print(f"Resumed after record {counts['resumed_at']:,}")
+    for number, reason in counts["errors"]:
+        print(f"Skipped record {number}: {reason}")
+    print(f"Imported {counts['inserted']:,} sessions ({counts['duplicates']:,} duplicates, {counts['invalid']:,} invalid)")
+    return 0
+
+
+def export_file(conn, args):
+    def report(written):
+        print(f"\rExported {written:,} sessions", end="", file=sys.stderr)
+
+    fmt = args.format
+    try:
+        if args.path == "-":
+            if (fmt or "csv") == "kses":
+                raise ValueError("the kses format can't be written to stdout")
+            written = session_export.export_sessions(conn, sys.stdout, fmt or "csv", args.start, args.end)
+        else:
+            written = session_export.export_to_path(conn, args.path, fmt, args.start, args.end, progress=report)
+            print(file=sys.stderr)
+    except (OSError, ValueError) as e:
+        print(f"Export failed: {e}", file=sys.stderr)
+        return 1
+    if args.path != "-":
+        print(f"Exported {written:,} sessions to {args.path}")
+    return 0
+
+
+def merge_file(conn, args):
+    try:
+        counts = session_merge.merge_database(conn, args.path, full=args.full, new_identity=args.reset_identity)
+    except (OSError, ValueError) as e:
+        print(f"Merge failed: {e}", file=sys.stderr)
+        return 1
+    print(f"Merged {counts['inserted']:,} new sessions from {args.path} "
+          f"({counts['scanned']:,} checked, {counts['duplicates']:,} already here)")
+    if counts["without_uuid"]:
+        print(f"Skipped {counts['without_uuid']:,} sessions stored without a uuid (written outside the tracker). "
+              "A merge run on that machine assigns them; then merge again with --full")
+    return 0
+
+
+def archive(conn, args):
+    try:
+        if args.action == "list":
+            partitions = session_archive.partition_totals(conn)
+            if not partitions:
+                print("Nothing's archived")
+            for year, session_count, seconds in partitions:
+                print(f"{year}: {session_store.hours_to_h_m_format(seconds / 3600)} in {session_count:,} sessions")
+            return 0
+        if args.action == "move":
+            # By default everything but the current year
+            years = args.years or [year for year in session_archive.live_years(conn) if year < date.today().year]
+            for year, moved in session_archive.archive_years(conn, years).items():
+                print(f"{year}: archived {moved:,} sessions" if moved else f"{year}: nothing live to archive")
+            return 0
+        if not args.years:
+            print(f"Name the year(s) to {args.action}", file=sys.stderr)
+            return 2
+        if args.action == "restore":
+            for year, restored in session_archive.restore_years(conn, args.years).items():
+                print(f"{year}: restored {restored:,} sessions")
+        else:
+            dropped = session_archive.drop_years(conn, args.years)
+            print(f"Deleted the archive for {', '.join(map(str, dropped))}" if dropped else "Nothing to delete")
+    except ValueError as e:
+        print(f"Archive failed: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def _local_datetime(text):
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected an ISO date or datetime, got {text!r}") from None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="main.py", description="Kawaii Time Tracker (headless)")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, metavar="PATH", help="Database file (default: %(default)s)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    clock_in_parser = commands.add_parser("clock-in", help="Start a session now")
+    clock_in_parser.add_argument("--project", help="Project to track (created if new)")
+    clock_in_parser.set_defaults(handler=clock_in)
+    clock_out_parser = commands.add_parser("clock-out", help="End the open session and record it")
+    clock_out_parser.add_argument("--project", help="Project whose timer to stop")
+    clock_out_parser.add_argument("--notes", default="", help="Notes stored with the session")
+    clock_out_parser.set_defaults(handler=clock_out)
+    commands.add_parser("status", help="Show the running timers").set_defaults(handler=status)
+    commands.add_parser("projects", help="Show hours per project").set_defaults(handler=projects)
+    commands.add_parser("stats", help="Show streaks, session lengths and when you work").set_defaults(handler=stats)
+    total_parser = commands.add_parser("total", help="Show total hours worked")
+    total_parser.set_defaults(handler=total)
+    weekly_parser = commands.add_parser("weekly", help="Show hours per week")
+    weekly_parser.add_argument("--weeks", type=int, default=12, help="How many recent weeks to show (default: %(default)s)")
+    weekly_parser.add_argument("--project", help="Only this project's sessions")
+    weekly_parser.set_defaults(handler=weekly)
+    monthly_parser = commands.add_parser("monthly", help="Show hours per month")
+    monthly_parser.set_defaults(handler=monthly)
+    yearly_parser = commands.add_parser("yearly", help="Show hours per year")
+    yearly_parser.set_defaults(handler=yearly)
+    for summary_parser in (total_parser, weekly_parser, monthly_parser, yearly_parser):
+        summary_parser.add_argument("--archived", action="store_true", help="Include archived years")
+    rollups_parser = commands.add_parser("rollups", help="Check or repair the precomputed totals")
+    rollups_parser.add_argument("action", choices=("verify", "rebuild"))
+    rollups_parser.set_defaults(handler=check_rollups)
+    import_parser = commands.add_parser("import", help="Bulk-import sessions from a CSV or JSON Lines file")
+    import_parser.add_argument("path", help="File with clock_in, clock_out and optional notes fields")
+    import_parser.add_argument("--format", choices=session_import.FORMATS, help="Input format (default: from the file extension)")
+    import_parser.add_argument("--batch-size", type=int, default=50000, help="Records per transaction (default: %(default)s)")
+    import_parser.set_defaults(handler=import_file)
+    export_parser = commands.add_parser("export", help="Stream sessions to CSV, JSON Lines or the compact kses format")
+    export_parser.add_argument("path", help="Output file, or - for stdout (csv/jsonl)")
+    export_parser.add_argument("--format", choices=session_export.FORMATS, help="Output format (default: from the file extension)")
+    export_parser.add_argument("--from", dest="start", type=_local_datetime, metavar="DATE", help="Only sessions clocked in at or after DATE")
+    export_parser.add_argument("--to", dest="end", type=_local_datetime, metavar="DATE", help="Only sessions clocked in before DATE")
+    export_parser.set_defaults(handler=export_file)
+    merge_parser = commands.add_parser("merge", help="Pull in the sessions added to another tracker database since the last merge")
+    merge_parser.add_argument("path", help="The other study_sessions.db")
+    merge_parser.add_argument("--full", action="store_true", help="Recheck every session, not just those added since the last merge")
+    merge_parser.add_argument("--reset-identity", action="store_true",
+                              help="Give this database a new identity first (when it started as a copy of the other file)")
+    merge_parser.set_defaults(handler=merge_file)
+    archive_parser = commands.add_parser("archive", help="Move whole years out of the live totals, or back")
+    archive_parser.add_argument("action", choices=("list", "move", "restore", "drop"))
+    archive_parser.add_argument("years", nargs="*", type=int, metavar="YEAR",
+                                help="Years to act on (move defaults to every year before this one)")
+    archive_parser.set_defaults(handler=archive)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        with closing(connect(args.db)) as conn:
+            return args.handler(conn, args)
+    except sqlite3.Error as e:
+        print(f"Database error: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
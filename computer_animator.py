@@ -1,46 +1,91 @@
-import tkinter as tk
 from PIL import Image, ImageTk
+from sprite_cache import SpriteCache
+from particle_engine import ParticleEngine
+from star_atlas import StarAtlas
+from effect_surface import EffectSurface
 import os
 import random
 import math
 import time
 
 class ComputerAnimator:
-    def __init__(self, master, canvas, item_id, heart_image_path_list, gif_animator_instance, gif_coords):
+    STAR_ANGLE_STEPS = 24
+    # "canvas": one canvas item per heart/star; "composite": all of them drawn into one EffectSurface image
+    EFFECT_BACKENDS = ("canvas", "composite")
+
+    def __init__(self, master, canvas, item_id, heart_image_path_list, gif_animator_instance, gif_coords, sprite_cache=None, scheduler=None,
+                 max_particles=200, load_images=True, backend="canvas"):
         self.master = master
         self.canvas = canvas
         self.item_id = item_id
         self.gif_animator = gif_animator_instance
         self.original_x, self.original_y = gif_coords
+        self.sprite_cache = sprite_cache or SpriteCache()
+        # Shares the GIF's clock so hearts, stars and shake all tick in one batch
+        self.scheduler = scheduler or gif_animator_instance.scheduler
+        if backend not in self.EFFECT_BACKENDS:
+            raise ValueError(f"Unknown effects backend {backend!r}; expected one of {', '.join(self.EFFECT_BACKENDS)}")
+        self.backend = backend
+        self.surface = None
+        if backend == "composite":
+            self.surface = EffectSurface(canvas, int(canvas.cget("width")), int(canvas.cget("height")))
+        self.particles = ParticleEngine(canvas, self.scheduler, max_particles=max_particles, surface=self.surface)
 
         self.img_heart = None
         self.img_filled_heart = None
         self.img_clover = None
-        self.star_images = []  # To keep references to PhotoImages
         self.star_base_images = []  # Store multiple star base images
-        self._load_heart_images(heart_image_path_list)
+        self.star_atlas = None  # Quantized rotations of star_base_images
+        # With load_images=False the caller loads sprites in the background and calls install_sprite_images
+        if load_images:
+            self._load_heart_images(heart_image_path_list)
 
         self.canvas.tag_bind(self.item_id, "<Button-1>", self._handle_computer_click)
 
         self.shake_animation_active = False
         self.shake_id = None
+        self.shake_step_interval = 0.05
 
     def _load_heart_images(self, image_paths):
-        script_dir = os.path.dirname(__file__)
-        heart_size = (40, 40)
-        star_size = (60, 60)
         try:
-            self.img_heart = ImageTk.PhotoImage(Image.open(os.path.join(script_dir, "assets", "images", "heart.png")).resize(heart_size, Image.Resampling.LANCZOS))
-            self.img_filled_heart = ImageTk.PhotoImage(Image.open(os.path.join(script_dir, "assets", "images", "filled_heart.png")).resize(heart_size, Image.Resampling.LANCZOS))
-            self.img_clover = ImageTk.PhotoImage(Image.open(os.path.join(script_dir, "assets", "images", "clover.png")).resize((40, 40), Image.Resampling.LANCZOS))
-            star_filenames = ["stars.png", "stars1.png", "stars2.png", "stars3.png"]
-            for filename in star_filenames:
-                image = Image.open(os.path.join(script_dir, "assets", "images", filename)).resize(star_size, Image.Resampling.LANCZOS)
-                self.star_base_images.append(image)
-            self.star_size = star_size
+            self.install_sprite_images(self.read_sprite_images())
         except Exception as e:
             print(f"Error loading heart/stars images: {e}")
 
+    def read_sprite_images(self):
+        """Loads the resized heart/clover/star sprites as PIL images. Safe to call off the Tk thread."""
+        script_dir = os.path.dirname(__file__)
+        heart_size = (40, 40)
+        star_size = (60, 60)
+        cache = self.sprite_cache
+        images = {
+            "heart": cache.load_resized(os.path.join(script_dir, "assets", "images", "heart.png"), heart_size, Image.Resampling.LANCZOS),
+            "filled_heart": cache.load_resized(os.path.join(script_dir, "assets", "images", "filled_heart.png"), heart_size, Image.Resampling.LANCZOS),
+            "clover": cache.load_resized(os.path.join(script_dir, "assets", "images", "clover.png"), (40, 40), Image.Resampling.LANCZOS),
+            "stars": [],
+        }
+        star_filenames = ["stars.png", "stars1.png", "stars2.png", "stars3.png"]
+        for filename in star_filenames:
+            images["stars"].append(cache.load_resized(os.path.join(script_dir, "assets", "images", filename), star_size, Image.Resampling.LANCZOS))
+        self.star_size = star_size
+        return images
+
+    def install_sprite_images(self, images):
+        """Turns images from read_sprite_images into PhotoImages (Tk thread only).
+
+        The composite backend draws the PIL images itself, so it keeps them as RGBA instead.
+        """
+        if self.surface is not None:
+            self.img_heart = images["heart"].convert("RGBA")
+            self.img_filled_heart = images["filled_heart"].convert("RGBA")
+            self.img_clover = images["clover"].convert("RGBA")
+        else:
+            self.img_heart = ImageTk.PhotoImage(images["heart"])
+            self.img_filled_heart = ImageTk.PhotoImage(images["filled_heart"])
+            self.img_clover = ImageTk.PhotoImage(images["clover"])
+        self.star_base_images = list(images["stars"])
+        self.star_atlas = StarAtlas(self.star_base_images, angle_steps=self.STAR_ANGLE_STEPS)
+
     def _handle_computer_click(self, event):
         if self.gif_animator.is_playing:
             if not self.shake_animation_active:
@@ -52,28 +97,39 @@ class ComputerAnimator:
 
     def _start_shake(self):
         self.shake_animation_active = True
-        self._shake_computer()
+        self._shake_count = 0
+        self._next_shake_step = 0.0
+        self.shake_id = self.scheduler.register(self._shake_computer)
 
     def stop_shake(self):
         if self.shake_id:
-            self.master.after_cancel(self.shake_id)
+            self.scheduler.unregister(self.shake_id)
+            self.shake_id = None
         self.shake_animation_active = False
         self.canvas.coords(self.item_id, self.original_x, self.original_y)
 
-    def _shake_computer(self, count=0):
+    def _shake_computer(self, now):
         if not self.shake_animation_active:
             self.canvas.coords(self.item_id, self.original_x, self.original_y)
-            return
-        if count < 5:
+            self.shake_id = None
+            return False
+        if now < self._next_shake_step:
+            return True
+        if self._shake_count < 5:
             x_offset = random.randint(-10, 10)
             y_offset = random.randint(-5, 5)
             self.canvas.coords(self.item_id, self.original_x + x_offset, self.original_y + y_offset)
-            self.shake_id = self.master.after(50, self._shake_computer, count + 1)
-        else:
-            self.shake_animation_active = False
-            self.canvas.coords(self.item_id, self.original_x, self.original_y)
+            self._shake_count += 1
+            self._next_shake_step = now + self.shake_step_interval
+            return True
+        self.shake_animation_active = False
+        self.shake_id = None
+        self.canvas.coords(self.item_id, self.original_x, self.original_y)
+        return False
 
     def _create_hearts(self, center_x, center_y, num_hearts=random.randint(1, 3)):
+        if not self.img_heart:
+            return  # Sprites are still loading
         start_y = center_y + 20
         for _ in range(num_hearts):
             offset_x = random.uniform(-10, 10)
@@ -85,57 +141,37 @@ class ComputerAnimator:
             else:
                 heart_img = random.choice([self.img_heart, self.img_filled_heart])
 
-            heart_id = self.canvas.create_image(center_x + offset_x, start_y + offset_y, image=heart_img)
-            self._animate_heart(heart_id)
+            self._launch_heart(center_x + offset_x, start_y + offset_y, heart_img)
 
-    def _animate_heart(self, heart_id, speed=2, gravity=0.4):
+    def _launch_heart(self, x, y, heart_img, speed=2):
         angle = random.uniform(-math.pi / 2 - math.pi / 8, -math.pi / 2 + math.pi / 4)
         velocity_x = speed * math.cos(angle) * random.uniform(0.8, 2)
         velocity_y = speed * math.sin(angle) * random.uniform(0.8, 2)
-        fade_start = time.time()
-        floor_y = self.canvas.winfo_height() - 10
-
-        def update():
-            nonlocal velocity_y, velocity_x
-            coords = self.canvas.coords(heart_id)
-            if not coords:
-                return
-            x, y = coords
-            velocity_y += gravity
-            new_x = x + velocity_x
-            new_y = y + velocity_y
-            if new_y >= floor_y:
-                new_y = floor_y
-                velocity_y *= -0.6
-                velocity_x *= 0.8
-            self.canvas.coords(heart_id, new_x, new_y)
-            if time.time() - fade_start >= 20:
-                self.canvas.delete(heart_id)
-            else:
-                self.master.after(20, update)
-
-        update()
+        self.particles.spawn(x, y, velocity_x, velocity_y, heart_img)
 
     def _create_star_effect(self, center_x, center_y):
-        if not self.star_base_images:
+        if not self.star_atlas:
             return
 
-        base_image = random.choice(self.star_base_images)
-        angle = random.randint(0, 360)
-        rotated_image = base_image.rotate(angle, expand=True)
-        star_photoimage = ImageTk.PhotoImage(rotated_image)
-        self.star_images.append(star_photoimage)
-
-        star_id = self.canvas.create_image(center_x, center_y, image=star_photoimage)
-        fade_start = time.time()
-
-        def fade():
-            if time.time() - fade_start >= 1:
-                self.canvas.delete(star_id)
-            else:
-                self.master.after(30, fade)
-
-        fade()
+        sprite_key = self.star_atlas.key_for(random.randrange(len(self.star_base_images)), random.randint(0, 360))
+        if self.surface is not None:
+            star_handle = self.surface.add(self.star_atlas.image(sprite_key), center_x, center_y)
+        else:
+            star_photoimage = self.star_atlas.acquire(sprite_key)
+            star_id = self.canvas.create_image(center_x, center_y, image=star_photoimage)
+        fade_start = time.monotonic()
+
+        def fade(now):
+            if now - fade_start >= 1:
+                if self.surface is not None:
+                    self.surface.remove(star_handle)
+                else:
+                    self.canvas.delete(star_id)
+                    self.star_atlas.release(sprite_key)
+                return False
+            return True
+
+        self.scheduler.register(fade)
 
     def clear_hearts(self):
-        pass
+        self.particles.clear()
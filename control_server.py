@@ -0,0 +1,421 @@
+"""Local control API for `main.py --control-socket`: status bars and editor plugins talk to the running window.
+
+An asyncio server on its own thread accepts any number of clients on a Unix
+domain socket (next to the database by default, readable by this user
+only). Each line a client sends is one JSON request, and each gets one JSON
+line back with the same "id":
+
+    {"id": 1, "cmd": "status"}
+    {"id": 1, "ok": true, "result": {"clocked_in": true, "timers": [...]}}
+
+Commands: status, clock_in and clock_out (optional "project", plus "notes"
+for clock_out), totals, weekly (optional "weeks", default 12, and
+"project"), stats (the session_stats metrics, from the window's cache),
+subscribe and unsubscribe. Failures come back as
+{"ok": false, "error": "..."}. Subscribers are also sent
+{"event": "status", "result": ...} whenever the running timers change:
+from a client, the window, or (checked every few seconds while anyone is
+subscribed) the headless CLI.
+
+Requests run on the app's DatabaseExecutor, like the window's own queries.
+Clock-ins and clock-outs write the same rows the CLI does, and the window
+is told to adopt them through TkDispatcher.post, since Tk must only be
+touched from its own thread; the Tk thread isn't woken otherwise. Read results are cached for CACHE_SECONDS and dropped
+as soon as the timers or sessions change, and identical requests arriving
+while one is being read share that read, so a widget polling status every
+100 ms costs the database one query a second at most.
+
+    printf '{"id": 1, "cmd": "status"}\\n' | nc -U study_sessions.sock
+"""
+import asyncio
+import errno
+import json
+import os
+import socket
+import stat
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+import session_store
+from tk_dispatch import TkDispatcher
+
+
+def default_socket_path(db_path):
+    return os.path.splitext(db_path)[0] + ".sock"
+
+
+class RequestError(Exception):
+    """A request that can't be carried out; its message is sent back to the client."""
+
+
+# --- Database operations (run on the DatabaseExecutor thread) ---
+def _read_totals(conn):
+    return session_store.load_total_seconds(conn), session_store.get_project_totals(conn)
+
+
+def _read_weekly(conn, range_start, project):
+    if project is None:
+        return session_store.get_weekly_hours_summary(conn, range_start)
+    project_id = session_store.find_project(conn, project)
+    if project_id is None:
+        return None
+    return session_store.get_project_weekly_hours(conn, project_id, range_start)
+
+
+def _clock_in(conn, project, now):
+    project_id = session_store.get_or_create_project(conn, project) if project else None
+    return session_store.open_session(conn, now, project_id)
+
+
+def _clock_out(conn, project, notes, now):
+    project_id = session_store.find_project(conn, project) if project else None
+    if project and project_id is None:
+        return None
+    return session_store.close_open_session(conn, now, notes, project_id=project_id)
+
+
+class ControlServer:
+    """Serves the control API on `path` until `stop()`; the thread starts right away.
+
+    `on_change` is called on the Tk thread (posted through a TkDispatcher on
+    `master`) after a client clocks in or out, or when the watch notices the
+    CLI did.
+    """
+
+    CACHE_SECONDS = 1.0
+    WATCH_INTERVAL = 2.0  # Seconds between checks for out-of-process changes while anyone is subscribed
+    MAX_LINE = 64 * 1024
+    MAX_BUFFERED = 256 * 1024  # A subscriber this far behind is disconnected
+    DEFAULT_WEEKS = 12
+
+    def __init__(self, db, path, master=None, on_change=None, stats_cache=None):
+        self.db = db
+        self.path = path
+        self.master = master
+        self.on_change = on_change
+        self.stats_cache = stats_cache
+        self.requests = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+        self._cache = {}     # key -> (expiry, result)
+        self._inflight = {}  # key -> task reading it
+        self._generation = 0  # Bumped on every invalidation so reads that started earlier aren't cached
+        self._clients = set()
+        self._subscribers = set()
+        self._published_rows = None  # Open timers as last sent to subscribers
+        self._tasks = set()
+        self._watch_task = None
+        self._dispatcher = None
+        self._loop = None
+        self._stopping = None
+        self._ready = threading.Event()
+        self._start_error = None
+
+        self._remove_stale_socket()
+        if master is not None:
+            self._dispatcher = TkDispatcher(master)
+            self._dispatcher.accept_posts()
+        self._thread = threading.Thread(target=self._run, name="control-server", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._start_error is not None:
+            if self._dispatcher is not None:
+                self._dispatcher.close()
+            raise self._start_error
+
+    def _remove_stale_socket(self):
+        """Deletes a socket left behind by a crashed run; refuses to touch a live one or any other file."""
+        try:
+            mode = os.stat(self.path).st_mode
+        except FileNotFoundError:
+            return
+        if not stat.S_ISSOCK(mode):
+            raise FileExistsError(errno.EEXIST, "Not a socket", self.path)
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            try:
+                probe.connect(self.path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                os.unlink(self.path)
+                return
+        raise OSError(errno.EADDRINUSE, "Another tracker is already listening", self.path)
+
+    # --- Called from the Tk thread ---
+    def notify_changed(self, future=None):
+        """The window changed the timers or sessions; `future` is the write, if it hasn't committed yet."""
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._spawn, self._after_app_change(future))
+
+    def stats(self):
+        return {"clients": len(self._clients), "subscribers": len(self._subscribers), "requests": self.requests,
+                "cache_hits": self.cache_hits, "cache_misses": self.cache_misses}
+
+    def stop(self, timeout=2.0):
+        """Disconnects every client, removes the socket and ends the thread."""
+        if self._thread.is_alive():
+            self._loop.call_soon_threadsafe(self._stopping.set)
+            self._thread.join(timeout)
+        if self._dispatcher is not None:
+            self._dispatcher.close()
+
+    # --- Server thread ---
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._loop.run_until_complete(self._serve())
+        finally:
+            self._loop.close()
+
+    async def _serve(self):
+        self._stopping = asyncio.Event()
+        try:
+            listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                listener.bind(self.path)
+                os.chmod(self.path, 0o600)
+                server = await asyncio.start_unix_server(self._handle_client, sock=listener, limit=self.MAX_LINE)
+            except BaseException:
+                listener.close()
+                raise
+        except (OSError, NotImplementedError) as e:
+            self._start_error = e if isinstance(e, OSError) else OSError(f"Unix sockets are not supported here: {e}")
+            self._ready.set()
+            return
+        self._ready.set()
+
+        await self._stopping.wait()
+        server.close()
+        for writer in list(self._clients):
+            writer.close()
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await server.wait_closed()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+    def _spawn(self, coroutine):
+        task = asyncio.ensure_future(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _handle_client(self, reader, writer):
+        self._tasks.add(asyncio.current_task())
+        self._clients.add(writer)
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:  # Longer than MAX_LINE
+                    self._send(writer, {"id": None, "ok": False, "error": "Request too long"})
+                    break
+                if not line:
+                    break
+                if line.strip():
+                    self._send(writer, await self._respond(line, writer))
+                    await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._tasks.discard(asyncio.current_task())
+            self._clients.discard(writer)
+            self._subscribers.discard(writer)
+            writer.close()
+
+    async def _respond(self, line, writer):
+        self.requests += 1
+        try:
+            request = json.loads(line)
+        except ValueError:
+            return {"id": None, "ok": False, "error": "Invalid JSON"}
+        if not isinstance(request, dict):
+            return {"id": None, "ok": False, "error": "A request must be a JSON object"}
+        handler = self.COMMANDS.get(request.get("cmd"))
+        if handler is None:
+            return {"id": request.get("id"), "ok": False, "error": f"Unknown command {request.get('cmd')!r}"}
+        try:
+            result = await handler(self, request, writer)
+        except RequestError as e:
+            return {"id": request.get("id"), "ok": False, "error": str(e)}
+        except Exception as e:
+            print(f"Control server error handling {request.get('cmd')!r}: {e}")
+            return {"id": request.get("id"), "ok": False, "error": f"{type(e).__name__}: {e}"}
+        return {"id": request.get("id"), "ok": True, "result": result}
+
+    def _send(self, writer, message):
+        writer.write(json.dumps(message, separators=(",", ":")).encode() + b"\n")
+
+    # --- Cached reads ---
+    async def _cached(self, key, fn, *args):
+        entry = self._cache.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self.cache_hits += 1
+            return entry[1]
+        task = self._inflight.get(key)
+        if task is None:
+            self.cache_misses += 1
+            task = self._inflight[key] = self._spawn(self._load(key, fn, args))
+        # Shielded, so a client disconnecting doesn't cancel a read others are waiting on
+        return await asyncio.shield(task)
+
+    async def _load(self, key, fn, args):
+        generation = self._generation
+        try:
+            result = await asyncio.wrap_future(self.db.read(fn, *args))
+        finally:
+            if self._inflight.get(key) is asyncio.current_task():
+                del self._inflight[key]
+        if generation == self._generation:
+            self._cache[key] = (time.monotonic() + self.CACHE_SECONDS, result)
+        return result
+
+    def _invalidate(self):
+        self._generation += 1
+        self._cache.clear()
+        self._inflight.clear()
+
+    # --- Status notifications ---
+    async def _after_app_change(self, future):
+        self._invalidate()
+        if future is not None:
+            try:
+                await asyncio.wrap_future(future)
+            except Exception:
+                pass  # The window reports its own failed writes
+            self._invalidate()
+        await self._publish_status()
+
+    async def _publish_status(self, from_watch=False):
+        if not self._subscribers:
+            return
+        rows = await self._cached("status", session_store.get_open_timers)
+        if rows == self._published_rows:
+            return
+        self._published_rows = rows
+        if from_watch:
+            self._post_change()  # Probably the CLI; show it in the window too
+        data = json.dumps({"event": "status", "result": self._format_status(rows)}, separators=(",", ":")).encode() + b"\n"
+        for writer in list(self._subscribers):
+            if writer.transport.get_write_buffer_size() > self.MAX_BUFFERED:
+                print("Control server: dropping a subscriber that stopped reading")
+                self._subscribers.discard(writer)
+                writer.close()
+            else:
+                writer.write(data)
+
+    async def _watch(self):
+        while self._subscribers:
+            await asyncio.sleep(self.WATCH_INTERVAL)
+            try:
+                await self._publish_status(from_watch=True)
+            except Exception as e:
+                print(f"Control server watch error: {e}")
+        self._watch_task = None
+
+    def _client_changed_timers(self):
+        self._invalidate()
+        if self.stats_cache is not None:
+            self.stats_cache.mark_stale()
+        self._post_change()
+        self._spawn(self._publish_status())
+
+    def _post_change(self):
+        if self._dispatcher is not None and self.on_change is not None:
+            self._dispatcher.post(self.on_change)
+
+    # --- Commands ---
+    @staticmethod
+    def _format_status(rows):
+        now = time.time()
+        timers = [{"project": name, "clock_in": datetime.fromtimestamp(clock_in).isoformat(),
+                   "elapsed_seconds": max(int(now - clock_in), 0)}
+                  for _, name, clock_in, _ in rows]
+        return {"clocked_in": bool(timers), "timers": timers}
+
+    @staticmethod
+    def _project(request):
+        project = request.get("project")
+        if project is not None and (not isinstance(project, str) or not project.strip()):
+            raise RequestError("project must be a non-empty string")
+        return project.strip() if project else None
+
+    async def status(self, request, writer):
+        return self._format_status(await self._cached("status", session_store.get_open_timers))
+
+    async def clock_in(self, request, writer):
+        project = self._project(request)
+        opened = await asyncio.wrap_future(self.db.write(_clock_in, project, datetime.now()))
+        if not opened:
+            raise RequestError("Already clocked in")
+        self._client_changed_timers()
+        return await self.status(request, writer)
+
+    async def clock_out(self, request, writer):
+        project = self._project(request)
+        notes = request.get("notes", "")
+        if not isinstance(notes, str):
+            raise RequestError("notes must be a string")
+        recorded = await asyncio.wrap_future(self.db.write(_clock_out, project, notes, datetime.now()))
+        if recorded is None:
+            raise RequestError("Not clocked in")
+        self._client_changed_timers()
+        result = await self.status(request, writer)
+        result["recorded_seconds"] = recorded[1]
+        return result
+
+    async def totals(self, request, writer):
+        total_seconds, projects = await self._cached("totals", _read_totals)
+        return {"total_seconds": total_seconds,
+                "projects": [{"project": name, "sessions": session_count, "seconds": seconds}
+                             for _, name, session_count, seconds in projects]}
+
+    async def weekly(self, request, writer):
+        weeks = request.get("weeks", self.DEFAULT_WEEKS)
+        if not isinstance(weeks, int) or isinstance(weeks, bool) or not 1 <= weeks <= 520:
+            raise RequestError("weeks must be a whole number from 1 to 520")
+        project = self._project(request)
+        this_monday = date.today() - timedelta(days=date.today().weekday())
+        range_start = this_monday - timedelta(weeks=weeks - 1)
+        summary = await self._cached(("weekly", range_start, project), _read_weekly, range_start, project)
+        if summary is None:
+            raise RequestError(f"No project called {project!r}")
+        return {"weeks": [{"week": week_key, "start": session_store.week_range_from_iso(week_key)[0].isoformat(),
+                           "hours": round(summary[week_key], 4)} for week_key in sorted(summary)]}
+
+    async def session_stats(self, request, writer):
+        if self.stats_cache is None:
+            raise RequestError("Statistics are not available")
+        result = await self._cached("stats", self.stats_cache.get)
+        # The per-day arrays are for plotting; clients get the scalars and distributions
+        return {key: value for key, value in result.items()
+                if key not in ("daily_seconds", "first_day") and not key.startswith("rolling_")} | {
+            "percentiles": {f"p{p}": seconds for p, seconds in result["percentiles"].items()},
+            "first_day": result["first_day"].isoformat()}
+
+    async def subscribe(self, request, writer):
+        rows = await self._cached("status", session_store.get_open_timers)
+        if not self._subscribers:
+            self._published_rows = rows  # Nothing was tracked while nobody was listening
+        self._subscribers.add(writer)
+        if self._watch_task is None:
+            self._watch_task = self._spawn(self._watch())
+        return self._format_status(rows)
+
+    async def unsubscribe(self, request, writer):
+        self._subscribers.discard(writer)
+        return {}
+
+    COMMANDS = {
+        "status": status,
+        "clock_in": clock_in,
+        "clock_out": clock_out,
+        "totals": totals,
+        "weekly": weekly,
+        "stats": session_stats,
+        "subscribe": subscribe,
+        "unsubscribe": unsubscribe,
+    }
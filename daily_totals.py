@@ -0,0 +1,88 @@
+from datetime import date, timedelta
+import numpy as np
+
+import session_store
+
+_EPOCH_DAY = date(1970, 1, 1)
+
+
+def _day_number(day):
+    return (day - _EPOCH_DAY).days
+
+
+class DailyTotals:
+    """Seconds worked per local calendar day, with prefix sums for O(1) range totals.
+
+    Sessions count towards the day they were clocked in on, in the UTC offset
+    they were recorded with (the same bucketing as the weekly summary).
+    `seconds[i]` covers day `first_day + i` and `prefix[i]` is the sum of
+    `seconds[:i]`, so any inclusive range total is one subtraction.
+    Build it with `load(conn)` on the database thread, then use and patch it
+    from the Tk thread.
+    """
+    GROWTH_DAYS = 366  # Spare days allocated when a session lands past either end
+
+    def __init__(self, first_day_number=None, seconds=None):
+        self.first_day_number = first_day_number
+        self.seconds = np.zeros(0, dtype=np.int64) if seconds is None else np.asarray(seconds, dtype=np.int64)
+        self.prefix = np.concatenate(([0], np.cumsum(self.seconds)))
+
+    @classmethod
+    def load(cls, conn):
+        """Reads the per-day totals of the live sessions from the rollup_daily table (one row per active day)."""
+        rows = session_store.get_daily_seconds(conn)
+        if not rows:
+            return cls()
+        buckets, totals = zip(*rows)
+        days = np.array(buckets, dtype="datetime64[D]").astype(np.int64)
+        totals = np.array(totals, dtype=np.int64)
+        seconds = np.zeros(days[-1] - days[0] + 1, dtype=np.int64)
+        seconds[days - days[0]] = totals
+        return cls(int(days[0]), seconds)
+
+    @property
+    def first_day(self):
+        return None if self.first_day_number is None else _EPOCH_DAY + timedelta(days=self.first_day_number)
+
+    def _index_range(self, start, end):
+        """Clamps the inclusive date range to array indices [lo, hi)."""
+        if self.first_day_number is None:
+            return 0, 0
+        lo = min(max(_day_number(start) - self.first_day_number, 0), len(self.seconds))
+        hi = min(max(_day_number(end) - self.first_day_number + 1, 0), len(self.seconds))
+        return lo, max(lo, hi)
+
+    def total_seconds(self, start, end):
+        """Seconds worked from `start` to `end` (dates, inclusive), in O(1)."""
+        lo, hi = self._index_range(start, end)
+        return int(self.prefix[hi] - self.prefix[lo])
+
+    def day_seconds(self, start, end):
+        """Per-day seconds for the inclusive range, zero-filled outside the recorded span."""
+        result = np.zeros(max(_day_number(end) - _day_number(start) + 1, 0), dtype=np.int64)
+        lo, hi = self._index_range(start, end)
+        if hi > lo:
+            offset = self.first_day_number + lo - _day_number(start)
+            result[offset:offset + hi - lo] = self.seconds[lo:hi]
+        return result
+
+    def add_session(self, clock_in_epoch, clock_in_offset, duration_seconds):
+        """Patches in one newly recorded session instead of rebuilding."""
+        day = (clock_in_epoch + clock_in_offset) // 86400
+        if self.first_day_number is None:
+            self.first_day_number = day
+        if day < self.first_day_number:
+            grow = self.first_day_number - day + self.GROWTH_DAYS
+            self.seconds = np.concatenate((np.zeros(grow, dtype=np.int64), self.seconds))
+            self.prefix = np.concatenate((np.zeros(grow, dtype=np.int64), self.prefix))
+            self.first_day_number -= grow
+        index = day - self.first_day_number
+        if index >= len(self.seconds):
+            grow = index - len(self.seconds) + 1 + self.GROWTH_DAYS
+            self.seconds = np.concatenate((self.seconds, np.zeros(grow, dtype=np.int64)))
+            self.prefix = np.concatenate((self.prefix, np.full(grow, self.prefix[-1], dtype=np.int64)))
+        self.seconds[index] += duration_seconds
+        self.prefix[index + 1:] += duration_seconds
+
+    def clear(self):
+        self.__init__()
@@ -0,0 +1,215 @@
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from tk_dispatch import TkDispatcher
+
+
+class DatabaseExecutor:
+    """Runs every database operation on one dedicated worker thread.
+
+    The worker owns the sqlite3 connection (WAL journal, NORMAL synchronous,
+    enlarged page cache) and pulls operations off a queue. An operation is a
+    callable `fn(conn, *args)`; `submit` returns a `concurrent.futures.Future`
+    for its result. Writes arriving within `commit_delay` seconds of each other
+    share one transaction. Each write runs inside its own savepoint, so one
+    failure doesn't undo its neighbours, and write futures resolve only after
+    the commit.
+
+    `exclusive` runs an operation outside any transaction (committing the
+    pending writes first), for work such as ATTACH that SQLite refuses
+    inside one. Use `then(future, callback)` to get `callback(future)` back
+    on the Tk thread once `attach(master)` has been called.
+    """
+
+    PRAGMAS = (
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        "PRAGMA cache_size=-8000",  # ~8 MB
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA busy_timeout=5000",
+    )
+    POLL_INTERVAL_MS = 10
+
+    def __init__(self, db_path, commit_delay=0.005, max_batch=256):
+        self.db_path = db_path
+        self.commit_delay = commit_delay
+        self.max_batch = max_batch
+        self.commits = 0
+        self.writes = 0
+
+        self._ops = queue.Queue()
+        self._dispatcher = None
+        self._closed = False
+        self._ready = threading.Event()
+        self._open_error = None
+
+        self._thread = threading.Thread(target=self._run, name="db-worker", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._open_error is not None:
+            raise self._open_error
+
+    # --- Submitting work ---
+    def submit(self, fn, *args, write=False):
+        future = Future()
+        if self._closed:
+            future.set_exception(sqlite3.ProgrammingError("Database executor is closed"))
+            return future
+        self._ops.put((fn, args, write, future))
+        return future
+
+    def read(self, fn, *args):
+        return self.submit(fn, *args)
+
+    def write(self, fn, *args):
+        return self.submit(fn, *args, write=True)
+
+    def exclusive(self, fn, *args):
+        """Runs `fn(conn, *args)` outside a transaction; it must manage its own."""
+        return self.submit(fn, *args, write="exclusive")
+
+    def call(self, fn, *args, write=False, timeout=None):
+        """Blocking convenience for scripts and shutdown paths."""
+        return self.submit(fn, *args, write=write).result(timeout)
+
+    # --- Tk marshalling ---
+    def attach(self, master):
+        """Routes `then` callbacks onto `master`'s event loop."""
+        self._dispatcher = TkDispatcher(master, self.POLL_INTERVAL_MS)
+
+    def then(self, future, callback):
+        """Calls `callback(future)` on the Tk thread once `future` is done."""
+        return self._dispatcher.then(future, callback)
+
+    def pending_count(self):
+        """`then` callbacks still waiting for their result."""
+        return self._dispatcher.pending_count() if self._dispatcher else 0
+
+    # --- Shutdown ---
+    def close(self, timeout=5.0):
+        """Flushes queued work, commits and closes the connection."""
+        if self._closed:
+            return
+        self._closed = True
+        self._ops.put(None)
+        self._thread.join(timeout)
+        if self._dispatcher is not None:
+            self._dispatcher.close()
+
+    # --- Worker thread ---
+    def _run(self):
+        try:
+            conn = sqlite3.connect(self.db_path, isolation_level=None)
+            for pragma in self.PRAGMAS:
+                conn.execute(pragma)
+        except sqlite3.Error as e:
+            self._open_error = e
+            self._ready.set()
+            return
+        self._ready.set()
+
+        pending_writes = []  # (future, result) awaiting the next commit
+        deadline = None  # When the open write batch commits; None if a read or exclusive job left the transaction open
+        stopping = False
+
+        while True:
+            if conn.in_transaction:
+                remaining = deadline - time.monotonic() if deadline is not None else 0
+                try:
+                    op = self._ops.get(timeout=remaining) if remaining > 0 else self._ops.get_nowait()
+                except queue.Empty:
+                    op = False
+            else:
+                op = self._ops.get()
+
+            if op is None:
+                stopping = True
+            elif op:
+                fn, args, write, future = op
+                if not future.set_running_or_notify_cancel():
+                    continue
+                if write == "exclusive":
+                    if conn.in_transaction:
+                        self._commit(conn, pending_writes)
+                        pending_writes = []
+                    self._run_job(conn, fn, args, future)
+                elif write:
+                    if not conn.in_transaction:
+                        try:
+                            conn.execute("BEGIN")
+                        except sqlite3.Error as e:
+                            future.set_exception(e)  # e.g. SQLITE_BUSY; the worker carries on with the next op
+                            continue
+                        deadline = time.monotonic() + self.commit_delay
+                    self._run_write(conn, fn, args, future, pending_writes)
+                else:
+                    self._run_job(conn, fn, args, future)
+
+            # Commit once the queue goes quiet, the window closes or the batch is full
+            if conn.in_transaction and (stopping or op is False or len(pending_writes) >= self.max_batch
+                                        or deadline is None or time.monotonic() >= deadline):
+                self._commit(conn, pending_writes)
+                pending_writes = []
+            elif pending_writes and not conn.in_transaction:
+                # SQLite rolled the whole batch back on an error (e.g. disk I/O); those writes are gone
+                self._fail(pending_writes, sqlite3.OperationalError("The transaction was rolled back"))
+                pending_writes = []
+            if not conn.in_transaction:
+                deadline = None
+            if stopping:
+                break
+
+        conn.close()
+
+    @staticmethod
+    def _run_job(conn, fn, args, future):
+        try:
+            future.set_result(fn(conn, *args))
+        except Exception as e:
+            future.set_exception(e)
+
+    def _run_write(self, conn, fn, args, future, pending_writes):
+        try:
+            conn.execute("SAVEPOINT db_op")
+        except sqlite3.Error as e:
+            future.set_exception(e)
+            return
+        try:
+            result = fn(conn, *args)
+        except Exception as e:
+            try:
+                conn.execute("ROLLBACK TO db_op")
+                conn.execute("RELEASE db_op")
+            except sqlite3.Error:
+                pass  # The error already ended the transaction; the loop fails the rest of the batch
+            future.set_exception(e)
+            return
+        try:
+            conn.execute("RELEASE db_op")
+        except sqlite3.Error as e:
+            future.set_exception(e)
+            return
+        self.writes += 1
+        pending_writes.append((future, result))
+
+    def _commit(self, conn, pending_writes):
+        try:
+            if conn.in_transaction:
+                conn.execute("COMMIT")
+                self.commits += 1
+        except sqlite3.Error as e:
+            try:
+                conn.execute("ROLLBACK")
+            except sqlite3.Error:
+                pass
+            self._fail(pending_writes, e)
+            return
+        for future, result in pending_writes:
+            future.set_result(result)
+
+    @staticmethod
+    def _fail(pending_writes, error):
+        for future, _ in pending_writes:
+            future.set_exception(error)
@@ -0,0 +1,179 @@
+import itertools
+
+import numpy as np
+from PIL import Image, ImageTk
+
+
+class EffectSurface:
+    """Draws effect sprites into one RGBA frame buffer shown as a single canvas image.
+
+    This is the "composite" effects backend; the default "canvas" backend
+    gives every heart, clover and star its own canvas item. Adding, moving or
+    removing a sprite marks the tiles under its old and new position dirty,
+    and one idle callback per batch repaints only those tiles (cached base,
+    then every sprite overlapping them, in the order they were added) and
+    copies the dirty region into the displayed PhotoImage with a single Tk
+    `copy`, so Tk redraws one region instead of every item.
+
+    The buffer is a premultiplied-alpha float32 array, so drawing a sprite is
+    two in-place NumPy operations on its slice (dst * (1 - alpha) + src).
+    PIL's `alpha_composite` gives the same result, but its per-call overhead
+    dominated with a few hundred sprites on screen. Each PIL image is
+    converted once (the hearts and StarAtlas rotations are a fixed set), and
+    only repainted tiles are converted back to the straight-alpha bytes Tk
+    displays.
+
+    The base is transparent rather than a copy of the background picture: the
+    surface sits above the GIF and the text, which must show through. The
+    item is `disabled` so clicks still reach whatever is underneath.
+    """
+
+    TILE = 32  # Dirty-tracking granularity in pixels
+
+    def __init__(self, canvas, width, height, x=0, y=0):
+        self.canvas = canvas
+        self.x, self.y = x, y
+        self.width, self.height = width, height
+        self.base = np.zeros((height, width, 4), dtype=np.float32)  # Premultiplied, 0-255
+        self.frame = self.base.copy()
+        self.display = np.zeros((height, width, 4), dtype=np.uint8)  # `frame` as straight-alpha RGBA
+        self.photo = ImageTk.PhotoImage(Image.new("RGBA", (width, height), (0, 0, 0, 0)))
+        self._staging = ImageTk.PhotoImage("RGBA", (width, height))  # Dirty region is pasted here, then copied across
+        self.item_id = canvas.create_image(x, y, image=self.photo, anchor="nw", state="disabled")
+        self._sprites = {}  # handle -> [prepared image, left, top] in surface pixels; dict order is paint order
+        self._prepared = {}  # id(PIL image) -> (PIL image, premultiplied pixels, 1 - alpha per channel)
+        self._handles = itertools.count(1)
+        self._dirty_tiles = set()
+        self._render_id = None
+        self._raise_pending = False
+        self.renders = 0
+        self.pixels_pushed = 0
+
+    # --- Sprites ---
+    def add(self, image, x, y):
+        """Shows `image` centred on canvas point (x, y), above every other sprite. Returns a handle."""
+        handle = next(self._handles)
+        prepared = self._prepare(image)
+        sprite = [prepared, *self._top_left(prepared, x, y)]
+        self._sprites[handle] = sprite
+        self._raise_pending = True
+        self._mark(sprite)
+        return handle
+
+    def move(self, handle, x, y):
+        sprite = self._sprites.get(handle)
+        if sprite is None:
+            return
+        left, top = self._top_left(sprite[0], x, y)
+        if left == sprite[1] and top == sprite[2]:
+            return
+        self._mark(sprite)
+        sprite[1], sprite[2] = left, top
+        self._mark(sprite)
+
+    def remove(self, handle):
+        sprite = self._sprites.pop(handle, None)
+        if sprite is not None:
+            self._mark(sprite)
+
+    def clear(self):
+        for sprite in self._sprites.values():
+            self._mark(sprite)
+        self._sprites.clear()
+
+    def sprite_count(self):
+        return len(self._sprites)
+
+    def _top_left(self, prepared, x, y):
+        # Same placement as a canvas image item with the default "center" anchor
+        height, width = prepared[1].shape[:2]
+        return int(x) - self.x - width // 2, int(y) - self.y - height // 2
+
+    def _prepare(self, image):
+        prepared = self._prepared.get(id(image))
+        if prepared is None:
+            pixels = np.asarray(image.convert("RGBA"), dtype=np.float32)
+            alpha = pixels[:, :, 3:] / 255.0
+            pixels[:, :, :3] *= alpha
+            # Holding `image` in the entry also stops its id from being reused
+            prepared = self._prepared[id(image)] = (image, pixels, np.repeat(1.0 - alpha, 4, axis=2))
+        return prepared
+
+    def _mark(self, sprite):
+        prepared, left, top = sprite
+        height, width = prepared[1].shape[:2]
+        first_x, first_y = max(left, 0) // self.TILE, max(top, 0) // self.TILE
+        last_x = (min(left + width, self.width) - 1) // self.TILE
+        last_y = (min(top + height, self.height) - 1) // self.TILE
+        for tile_y in range(first_y, last_y + 1):
+            for tile_x in range(first_x, last_x + 1):
+                self._dirty_tiles.add((tile_x, tile_y))
+        if self._render_id is None:
+            self._render_id = self.canvas.after_idle(self.render)
+
+    # --- Rendering ---
+    def _dirty_rects(self):
+        """Dirty tiles merged into horizontal runs, as (left, top, right, bottom) pixel boxes."""
+        rects = []
+        for tile_x, tile_y in sorted(self._dirty_tiles, key=lambda tile: (tile[1], tile[0])):
+            left, top = tile_x * self.TILE, tile_y * self.TILE
+            right, bottom = min(left + self.TILE, self.width), min(top + self.TILE, self.height)
+            if rects and rects[-1][1] == top and rects[-1][2] == left:
+                rects[-1] = (rects[-1][0], top, right, bottom)
+            else:
+                rects.append((left, top, right, bottom))
+        return rects
+
+    def render(self):
+        """Repaints the dirty tiles and pushes them to Tk now."""
+        if self._render_id is not None:
+            self.canvas.after_cancel(self._render_id)
+            self._render_id = None
+        if not self._dirty_tiles:
+            return
+        rects = self._dirty_rects()
+        self._dirty_tiles.clear()
+
+        sprites = [(pixels, transparency, left, top) for (_, pixels, transparency), left, top in self._sprites.values()]
+        boxes = np.array([(left, top, left + pixels.shape[1], top + pixels.shape[0]) for pixels, _, left, top in sprites],
+                         dtype=np.int64).reshape(-1, 4)
+        frame = self.frame
+        for x1, y1, x2, y2 in rects:
+            frame[y1:y2, x1:x2] = self.base[y1:y2, x1:x2]
+            overlapping = np.flatnonzero((boxes[:, 0] < x2) & (boxes[:, 2] > x1) & (boxes[:, 1] < y2) & (boxes[:, 3] > y1))
+            for index in overlapping.tolist():
+                pixels, transparency, left, top = sprites[index]
+                sprite_x1, sprite_y1, sprite_x2, sprite_y2 = boxes[index].tolist()
+                clip_x1, clip_y1 = max(x1, sprite_x1), max(y1, sprite_y1)
+                clip_x2, clip_y2 = min(x2, sprite_x2), min(y2, sprite_y2)
+                source = (slice(clip_y1 - top, clip_y2 - top), slice(clip_x1 - left, clip_x2 - left))
+                target = frame[clip_y1:clip_y2, clip_x1:clip_x2]
+                target *= transparency[source]
+                target += pixels[source]
+            # Back to straight alpha for Tk
+            region = frame[y1:y2, x1:x2]
+            alpha = region[:, :, 3:]
+            self.display[y1:y2, x1:x2, 3:] = alpha
+            self.display[y1:y2, x1:x2, :3] = np.minimum(region[:, :, :3] * (255.0 / np.maximum(alpha, 1.0)), 255.0)
+
+        # One Tk update covering every dirty rect
+        left, top = min(r[0] for r in rects), min(r[1] for r in rects)
+        right, bottom = max(r[2] for r in rects), max(r[3] for r in rects)
+        self._staging.paste(Image.fromarray(self.display[top:bottom, left:right], "RGBA"))
+        self.canvas.tk.call(str(self.photo), "copy", str(self._staging), "-from", 0, 0, right - left, bottom - top,
+                            "-to", left, top, "-compositingrule", "set")
+        if self._raise_pending:
+            self.canvas.tag_raise(self.item_id)
+            self._raise_pending = False
+        self.renders += 1
+        self.pixels_pushed += (right - left) * (bottom - top)
+
+    def stats(self):
+        return {"renders": self.renders, "pixels_pushed": self.pixels_pushed, "sprites": len(self._sprites)}
+
+    def close(self):
+        if self._render_id is not None:
+            self.canvas.after_cancel(self._render_id)
+            self._render_id = None
+        self._sprites.clear()
+        self._prepared.clear()
@@ -0,0 +1,87 @@
+import itertools
+import time
+
+import callback_monitor
+
+class FrameScheduler:
+    """One shared animation clock for every animator in the app.
+
+    Animations register a callback instead of running their own `after()`
+    chain. Each tick calls every active callback in one batch with the current
+    `time.monotonic()` value; a callback returns True to stay registered and
+    False when it has finished. Ticks are scheduled against absolute deadlines
+    so timer jitter doesn't accumulate into drift, and the clock goes idle when
+    nothing is registered.
+    """
+
+    def __init__(self, master, fps=50):
+        self.master = master
+        self.fps = fps
+        self.frame_interval = 1.0 / fps
+        self.tick_count = 0
+        self.last_tick_time = None
+        self.late_ticks = 0
+        self._tasks = {}
+        self._handles = itertools.count(1)
+        self._after_id = None
+        self._next_deadline = None
+
+    def register(self, callback):
+        """Adds `callback(now)` to the batch and returns a handle for `unregister`."""
+        handle = next(self._handles)
+        self._tasks[handle] = callback_monitor.wrap("frame task", callback)
+        if self._after_id is None:
+            self._next_deadline = time.monotonic()
+            self._schedule_next()
+        return handle
+
+    def unregister(self, handle):
+        self._tasks.pop(handle, None)
+
+    def is_registered(self, handle):
+        return handle in self._tasks
+
+    def active_count(self):
+        return len(self._tasks)
+
+    def set_fps(self, fps):
+        self.fps = fps
+        self.frame_interval = 1.0 / fps
+
+    def stop(self):
+        """Drops every task and cancels the pending tick."""
+        self._tasks.clear()
+        if self._after_id is not None:
+            self.master.after_cancel(self._after_id)
+            self._after_id = None
+
+    def _schedule_next(self):
+        now = time.monotonic()
+        self._next_deadline += self.frame_interval
+        if self._next_deadline < now:
+            # We fell more than a whole frame behind (e.g. a blocking call); resync
+            # rather than firing a burst of catch-up ticks.
+            self.late_ticks += 1
+            self._next_deadline = now + self.frame_interval
+        delay_ms = max(1, int(round((self._next_deadline - now) * 1000)))
+        self._after_id = self.master.after(delay_ms, self._tick)
+
+    def _tick(self):
+        self._after_id = None
+        now = time.monotonic()
+        self.last_tick_time = now
+        self.tick_count += 1
+
+        for handle, callback in list(self._tasks.items()):
+            if handle not in self._tasks:
+                continue  # Unregistered by an earlier callback in this batch
+            try:
+                keep = callback(now)
+            except Exception as e:
+                print(f"Animation callback error: {e}")
+                keep = False
+            if not keep:
+                self._tasks.pop(handle, None)
+
+        if self._tasks:
+            self._schedule_next()
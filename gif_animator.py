@@ -1,9 +1,19 @@
 # gif_animator.py (Corrected)
-import tkinter as tk
 from PIL import Image, ImageTk
+import queue
+import threading
+import time
+from sprite_cache import decode_frames
+from frame_scheduler import FrameScheduler
+from startup_profiler import record_phase
 
 class GIFAnimator:
-    def __init__(self, master, canvas, item_id, gif_path, width, height):
+    # How many decoded frames the background worker may get ahead of the Tk thread
+    PREFETCH_FRAMES = 4
+    # How often (ms) the Tk thread drains the prefetch window while streaming
+    DRAIN_INTERVAL_MS = 15
+
+    def __init__(self, master, canvas, item_id, gif_path, width, height, streaming=True, sprite_cache=None, scheduler=None):
         self.master = master
         self.canvas = canvas
         self.item_id = item_id
@@ -11,20 +21,40 @@ class GIFAnimator:
         self.width = width
         self.height = height
         self.frames = []
+        self.frame_durations = []  # Per-frame delay in ms, as stored in the GIF
         self.frame_index = 0
-        self.animation_id = None
+        self.animation_id = None  # FrameScheduler handle while playing
+        self.scheduler = scheduler or FrameScheduler(master)
+        self._next_frame_due = 0.0
         self.is_playing = False
         self.original_gif_duration = 100
+        self.streaming = streaming
+        self.sprite_cache = sprite_cache
+
+        # Streaming state: decoded PIL frames travel through a bounded queue
+        # (the prefetch window); only PhotoImage creation happens on the Tk thread.
+        self.total_frames = None
+        self.decode_finished = False
+        self._frame_queue = None
+        self._decode_thread = None
+        self._drain_id = None
+        self._stop_decoding = threading.Event()
+        self._decode_started = None
+
+        if self.streaming:
+            self._start_streaming()
+            return
 
         try:
             original_gif = Image.open(gif_path)
             if 'duration' in original_gif.info:
                 self.original_gif_duration = original_gif.info['duration']
 
-            for i in range(original_gif.n_frames):
-                original_gif.seek(i)
-                frame = original_gif.convert('RGBA').resize((width, height), Image.Resampling.LANCZOS)
+            for frame, duration in self._iter_resized_frames():
                 self.frames.append(ImageTk.PhotoImage(frame))
+                self.frame_durations.append(duration)
+            self.total_frames = len(self.frames)
+            self.decode_finished = True
             self.is_loadable_flag = True
         except FileNotFoundError:
             print(f"GIF file not found: {gif_path}")
@@ -42,29 +72,154 @@ class GIFAnimator:
             # try to reference this item_id.
             self.canvas.itemconfig(self.item_id, state="hidden")
 
+    # --- Streaming decode ---
+    def _start_streaming(self):
+        """Opens the GIF header synchronously, then decodes frames on a worker thread."""
+        try:
+            original_gif = Image.open(self.gif_path)
+            if 'duration' in original_gif.info:
+                self.original_gif_duration = original_gif.info['duration']
+            self.total_frames = original_gif.n_frames
+            self.is_loadable_flag = True
+        except FileNotFoundError:
+            print(f"GIF file not found: {self.gif_path}")
+            self.is_loadable_flag = False
+        except Exception as e:
+            print(f"Error loading GIF: {e}")
+            self.is_loadable_flag = False
+
+        if not self.is_loadable_flag:
+            self.decode_finished = True
+            self.canvas.itemconfig(self.item_id, state="hidden")
+            return
+
+        self._frame_queue = queue.Queue(maxsize=self.PREFETCH_FRAMES)
+        original_gif.close()
+        self._decode_started = time.perf_counter()
+        self._decode_thread = threading.Thread(target=self._decode_worker, name="gif-decoder", daemon=True)
+        self._decode_thread.start()
+        self._drain_id = self.master.after(self.DRAIN_INTERVAL_MS, self._drain_decoded_frames)
+
+    def _iter_resized_frames(self, stop_event=None):
+        """Yields (RGBA frame, duration_ms), served from the sprite cache when one is available."""
+        size = (self.width, self.height)
+        if self.sprite_cache is not None:
+            return self.sprite_cache.iter_frames(self.gif_path, size, Image.Resampling.LANCZOS, stop_event)
+        return decode_frames(self.gif_path, size, Image.Resampling.LANCZOS, stop_event)
+
+    def _decode_worker(self):
+        """Runs off the Tk thread: decode and resize (or read from cache) each frame into the prefetch window."""
+        try:
+            for frame, duration in self._iter_resized_frames(self._stop_decoding):
+                if not self._put_frame((frame, duration)):
+                    return
+        except Exception as e:
+            self._put_frame(e)
+            return
+        record_phase("GIF decoding (worker thread)", self._decode_started, time.perf_counter())
+        self._put_frame(None)  # End-of-stream marker
+
+    def _put_frame(self, item):
+        # Block while the window is full, but wake up regularly so close() can stop us
+        while not self._stop_decoding.is_set():
+            try:
+                self._frame_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _drain_decoded_frames(self):
+        """Turns every frame waiting in the prefetch window into a PhotoImage (Tk thread only)."""
+        self._drain_id = None
+        while True:
+            try:
+                item = self._frame_queue.get_nowait()
+            except queue.Empty:
+                break
+
+            if item is None:
+                self.decode_finished = True
+                self.total_frames = len(self.frames)
+                return
+            if isinstance(item, Exception):
+                print(f"Error decoding GIF frame {len(self.frames)}: {item}")
+                self.decode_finished = True
+                self.total_frames = len(self.frames)
+                if not self.frames:
+                    self.is_loadable_flag = False
+                    self.canvas.itemconfig(self.item_id, state="hidden")
+                return
+
+            frame, duration = item
+            self.frames.append(ImageTk.PhotoImage(frame))
+            self.frame_durations.append(duration)
+            if len(self.frames) == 1:
+                record_phase("GIF first frame on screen", self._decode_started, time.perf_counter())
+                self.canvas.itemconfig(self.item_id, image=self.frames[0])
+                if self.is_playing and self.animation_id is None:
+                    self._register_animation()
+
+        self._drain_id = self.master.after(self.DRAIN_INTERVAL_MS, self._drain_decoded_frames)
+
+    def has_first_frame(self):
+        return bool(self.frames)
+
+    def close(self):
+        """Stops the decode worker and any pending drain callback."""
+        self._stop_decoding.set()
+        if self._drain_id:
+            self.master.after_cancel(self._drain_id)
+            self._drain_id = None
+
     def is_loadable(self):
         return self.is_loadable_flag
 
     def start_animation(self):
         if self.is_loadable() and not self.is_playing:
             self.is_playing = True
-            self._animate_gif()
+            # While streaming, playback starts as soon as the first frame has been drained
+            if self.frames:
+                self._register_animation()
 
     def stop_animation(self):
         if self.animation_id:
-            self.master.after_cancel(self.animation_id)
+            self.scheduler.unregister(self.animation_id)
             self.animation_id = None
         self.is_playing = False # Ensure this is always set
         self.frame_index = 0
-        if self.is_loadable():
+        if self.is_loadable() and self.frames:
             self.canvas.itemconfig(self.item_id, image=self.frames[0])
 
-    def _animate_gif(self):
+    def _register_animation(self):
+        self._next_frame_due = 0.0
+        self.animation_id = self.scheduler.register(self._animate_gif)
+
+    def _frame_duration(self, index):
+        duration = self.frame_durations[index] if index < len(self.frame_durations) else 0
+        # Zero/absent delays fall back to the GIF-wide duration, like browsers do
+        return (duration or self.original_gif_duration) / 1000.0
+
+    def _animate_gif(self, now):
         if not self.is_playing:
-            return
+            self.animation_id = None
+            return False
+        if now < self._next_frame_due:
+            return True
 
         frame = self.frames[self.frame_index]
         self.canvas.itemconfig(self.item_id, image=frame)
 
-        self.frame_index = (self.frame_index + 1) % len(self.frames)
-        self.animation_id = self.master.after(self.original_gif_duration, self._animate_gif)
\ No newline at end of file
+        # Advance the due time by this frame's own delay to stay in phase; resync after a stall
+        duration = self._frame_duration(self.frame_index)
+        if not self._next_frame_due or now - self._next_frame_due > duration:
+            self._next_frame_due = now + duration
+        else:
+            self._next_frame_due += duration
+
+        # While frames are still streaming in, hold on the newest frame instead of looping early
+        next_index = self.frame_index + 1
+        if next_index >= len(self.frames):
+            next_index = 0 if self.decode_finished else self.frame_index
+        self.frame_index = next_index
+        return True
@@ -0,0 +1,129 @@
+from datetime import date, timedelta
+
+
+class HeatmapView:
+    """Contribution-graph style grid of daily activity on a canvas.
+
+    One rectangle per day (columns are weeks, oldest on the left; rows run
+    Monday to Sunday) is created once and only recoloured when its level
+    changes. Dragging across cells selects a date range and reports it to
+    `on_select(start, end)`; a click without dragging selects one day.
+    """
+    # Minutes thresholds for colour levels 1..4; level 0 is "no activity"
+    LEVEL_MINUTES = (1, 60, 120, 240)
+    COLORS = ("#FFE4EC", "#F9A8C8", "#F06BA0", "#C2185B", "#80084A")
+    SELECTED_OUTLINE = "#277445"
+
+    def __init__(self, canvas, x, y, weeks=26, cell=9, gap=2, on_select=None):
+        self.canvas = canvas
+        self.x = x
+        self.y = y
+        self.weeks = weeks
+        self.pitch = cell + gap
+        self.on_select = on_select
+        self.first_day = None
+        self.today = None
+        self.is_shown = False
+        self._levels = [None] * (weeks * 7)
+        self._outlines = [""] * (weeks * 7)
+        self._drag_start = None
+        self.selection = None  # (first index, last index) into the grid
+
+        self.cell_items = []
+        for column in range(weeks):
+            for row in range(7):
+                left, top = x + column * self.pitch, y + row * self.pitch
+                self.cell_items.append(canvas.create_rectangle(left, top, left + cell, top + cell, fill=self.COLORS[0],
+                                                               outline="", width=1, state="hidden", tags="heatmap_cell"))
+        canvas.tag_bind("heatmap_cell", "<ButtonPress-1>", self._on_press)
+        canvas.tag_bind("heatmap_cell", "<B1-Motion>", self._on_drag)
+
+    @property
+    def width(self):
+        return self.weeks * self.pitch
+
+    @property
+    def height(self):
+        return 7 * self.pitch
+
+    def _index_day(self, index):
+        column, row = divmod(index, 7)
+        return self.first_day + timedelta(weeks=column, days=row)
+
+    def _level(self, seconds):
+        minutes = seconds / 60
+        level = 0
+        for threshold in self.LEVEL_MINUTES:
+            if minutes >= threshold:
+                level += 1
+        return level
+
+    def update(self, daily_totals, today=None):
+        """Recolours the grid so its last column is the current week."""
+        self.today = today or date.today()
+        self.first_day = self.today - timedelta(days=self.today.weekday(), weeks=self.weeks - 1)
+        seconds = daily_totals.day_seconds(self.first_day, self.first_day + timedelta(days=self.weeks * 7 - 1))
+        future_start = (self.today - self.first_day).days + 1
+        for index, item_id in enumerate(self.cell_items):
+            level = self._level(seconds[index]) if index < future_start else None
+            if level != self._levels[index]:
+                self._levels[index] = level
+                if level is None:
+                    self.canvas.itemconfig(item_id, state="hidden")
+                else:
+                    self.canvas.itemconfig(item_id, fill=self.COLORS[level], state="normal" if self.is_shown else "hidden")
+
+    # --- Range selection ---
+    def _cell_at(self, event):
+        column = min(max(int((event.x - self.x) // self.pitch), 0), self.weeks - 1)
+        row = min(max(int((event.y - self.y) // self.pitch), 0), 6)
+        return min(column * 7 + row, (self.today - self.first_day).days)
+
+    def _on_press(self, event):
+        if self.first_day is None:
+            return
+        self._drag_start = self._cell_at(event)
+        self._select(self._drag_start, self._drag_start)
+
+    def _on_drag(self, event):
+        if self._drag_start is not None:
+            self._select(self._drag_start, self._cell_at(event))
+
+    def _select(self, a, b):
+        first, last = min(a, b), max(a, b)
+        if self.selection == (first, last):
+            return
+        self.selection = (first, last)
+        self._apply_outlines()
+        if self.on_select:
+            self.on_select(self._index_day(first), self._index_day(last))
+
+    def selected_days(self):
+        """The selected (start, end) dates, or None."""
+        if self.selection is None:
+            return None
+        return self._index_day(self.selection[0]), self._index_day(self.selection[1])
+
+    def clear_selection(self):
+        self.selection = None
+        self._drag_start = None
+        self._apply_outlines()
+
+    def _apply_outlines(self):
+        first, last = self.selection or (-1, -2)
+        for index, item_id in enumerate(self.cell_items):
+            outline = self.SELECTED_OUTLINE if first <= index <= last else ""
+            if outline != self._outlines[index]:
+                self._outlines[index] = outline
+                self.canvas.itemconfig(item_id, outline=outline)
+
+    def show(self):
+        self.is_shown = True
+        for index, item_id in enumerate(self.cell_items):
+            if self._levels[index] is not None:
+                self.canvas.itemconfig(item_id, state="normal")
+
+    def hide(self):
+        self.is_shown = False
+        for item_id in self.cell_items:
+            self.canvas.itemconfig(item_id, state="hidden")
@@ -1,11 +1,90 @@
-import tkinter as tk
-from app_module import TimeTrackerApp
+import argparse
+import sys
+import time
 
-if __name__ == "__main__":
-    root = tk.Tk()
-    app = TimeTrackerApp(root)
 
-    # Ensure all animations are stopped when the window is closed
-    root.protocol("WM_DELETE_WINDOW", lambda: [app.stop_all_animations(), root.destroy()])
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Kawaii Time Tracker",
+        epilog="Headless commands (no window): clock-in, clock-out, status, projects, stats, total, weekly, monthly, yearly, import, export, merge, archive, rollups. See `main.py status --help`.")
+    parser.add_argument("--profile-startup", nargs="?", const="-", metavar="PATH",
+                        help="Time every startup phase and print the breakdown (or write it to PATH)")
+    parser.add_argument("--eager-startup", action="store_true",
+                        help="Load every asset before showing the window instead of streaming them in")
+    parser.add_argument("--cprofile", metavar="PATH",
+                        help="With --profile-startup, also dump cProfile stats for startup to PATH")
+    parser.add_argument("--effects", choices=("canvas", "composite"), default="canvas",
+                        help="Draw hearts and stars as separate canvas items (default) or composited into one image")
+    parser.add_argument("--instrument", nargs="?", const="callback_stats.json", metavar="PATH",
+                        help="Time every Tk callback; F12 shows the live stats, Shift+F12 and exit write them to PATH")
+    parser.add_argument("--control-socket", nargs="?", const="", metavar="PATH",
+                        help="Serve status, totals and clock-in/out as JSON on a Unix socket (default: next to the database)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    # Headless commands are routed before anything imports tkinter or PIL
+    if argv and (argv[0] == "--db" or not argv[0].startswith("-")):
+        import cli
+        return cli.main(argv)
+
+    args = parse_args(argv)
+    profiler = None
+    if args.profile_startup:
+        import startup_profiler
+        profiler = startup_profiler.enable(cprofile_path=args.cprofile)
+
+    monitor = None
+    if args.instrument:
+        # Before anything registers a timer or binding, so all of them are measured
+        import callback_monitor
+        monitor = callback_monitor.enable(args.instrument)
+
+    # Imports are timed individually so slow machines / PyInstaller builds show where the time goes
+    from startup_profiler import startup_phase
+    with startup_phase("import tkinter"):
+        import tkinter as tk
+    with startup_phase("import PIL"):
+        import PIL.Image, PIL.ImageTk
+    with startup_phase("import tkextrafont"):
+        import tkextrafont
+    with startup_phase("import sqlite3"):
+        import sqlite3
+    with startup_phase("import app modules"):
+        from app_module import TimeTrackerApp
+
+    with startup_phase("tk.Tk()"):
+        root = tk.Tk()
+    with startup_phase("TimeTrackerApp.__init__"):
+        app = TimeTrackerApp(root, progressive_startup=not args.eager_startup, effects_backend=args.effects)
 
-    root.mainloop()
\ No newline at end of file
+    # Stop animations, flush pending database writes and close the window
+    root.protocol("WM_DELETE_WINDOW", app.on_close)
+    if monitor:
+        app.enable_instrumentation(monitor)
+    if args.control_socket is not None:
+        app.start_control_server(args.control_socket or None)
+
+    if profiler:
+        startup_deadline = time.perf_counter() + 10
+
+        def finish_profile():
+            # Wait for background asset loading and GIF decoding so the report covers them too
+            loading = not app.gif_animator.decode_finished or (app.asset_dispatcher and app.asset_dispatcher.pending_count())
+            if loading and time.perf_counter() < startup_deadline:
+                root.after(20, finish_profile)
+                return
+            startup_profiler.disable()
+            profiler.write_report(args.profile_startup)
+
+        root.after_idle(finish_profile)
+
+    root.mainloop()
+    if monitor:
+        monitor.dump()
+        callback_monitor.disable()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
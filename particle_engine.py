@@ -0,0 +1,156 @@
+import time
+import numpy as np
+
+class ParticleEngine:
+    """Batched physics for the hearts and clovers.
+
+    Particle state lives in NumPy arrays (position, velocity, spawn time,
+    floor) so every tick integrates gravity and floor bounces for all
+    particles in one vectorized step. Canvas items are pooled per slot and
+    reused, and only particles whose on-screen pixel position actually moved
+    get a `coords()` call. Particles that have come to rest on the floor are
+    retired from the simulation early; they stay visible until their lifetime
+    ends but cost nothing per tick, and their slots are the first to be
+    recycled when the cap is reached.
+
+    With a `surface` (an EffectSurface) the particles are sprites on that one
+    composited image instead of canvas items, and `spawn` takes PIL images.
+    """
+
+    STEP_TIME = 0.02  # Physics constants are tuned per 20 ms step
+    MAX_STEPS = 5  # After a stall (window drag, suspend) the simulation resumes instead of catching up
+
+    def __init__(self, canvas, scheduler, max_particles=200, gravity=0.4, lifetime=20.0,
+                 bounce=-0.6, floor_friction=0.8, rest_speed=0.5, surface=None):
+        self.canvas = canvas
+        self.surface = surface
+        self.scheduler = scheduler
+        self.max_particles = max_particles
+        self.gravity = gravity
+        self.lifetime = lifetime
+        self.bounce = bounce
+        self.floor_friction = floor_friction
+        self.rest_speed = rest_speed
+
+        self.pos = np.zeros((max_particles, 2), dtype=np.float64)
+        self.vel = np.zeros((max_particles, 2), dtype=np.float64)
+        self.floor = np.zeros(max_particles, dtype=np.float64)
+        self.born = np.zeros(max_particles, dtype=np.float64)
+        self.alive = np.zeros(max_particles, dtype=bool)    # Slot is in use (visible)
+        self.moving = np.zeros(max_particles, dtype=bool)   # Slot is still being integrated
+        self.drawn = np.zeros((max_particles, 2), dtype=np.int64)  # Last pixel position sent to Tk
+
+        self.item_ids = [None] * max_particles  # Pooled canvas items (or surface sprite handles), created on first use
+        self.slot_images = [None] * max_particles
+        self.task_id = None
+        self.last_step = None
+        self.coords_calls = 0
+        self.coords_skipped = 0
+
+    # --- Spawning ---
+    def spawn(self, x, y, velocity_x, velocity_y, image):
+        slot = self._claim_slot()
+        now = time.monotonic()
+        self.pos[slot] = (x, y)
+        self.vel[slot] = (velocity_x, velocity_y)
+        self.floor[slot] = self.canvas.winfo_height() - 10
+        self.born[slot] = now
+        self.alive[slot] = True
+        self.moving[slot] = True
+        self.drawn[slot] = (int(round(x)), int(round(y)))
+
+        item_id = self.item_ids[slot]
+        if self.surface is not None:
+            if item_id is not None:
+                self.surface.remove(item_id)  # Recycled while still on screen
+            self.item_ids[slot] = self.surface.add(image, x, y)
+        elif item_id is None:
+            self.item_ids[slot] = self.canvas.create_image(x, y, image=image)
+        else:
+            options = {"state": "normal"}
+            if self.slot_images[slot] is not image:
+                options["image"] = image
+            self.canvas.itemconfig(item_id, **options)
+            self.canvas.coords(item_id, x, y)
+            self.canvas.tag_raise(item_id)
+        self.slot_images[slot] = image
+
+        if self.task_id is None:
+            self.last_step = now
+            self.task_id = self.scheduler.register(self.step)
+        return slot
+
+    def _claim_slot(self):
+        free = np.flatnonzero(~self.alive)
+        if free.size:
+            return int(free[0])
+        # At the cap: recycle a resting particle first, otherwise the oldest one
+        resting = np.flatnonzero(self.alive & ~self.moving)
+        candidates = resting if resting.size else np.arange(self.max_particles)
+        return int(candidates[np.argmin(self.born[candidates])])
+
+    # --- Simulation ---
+    def step(self, now):
+        steps = min((now - self.last_step) / self.STEP_TIME, self.MAX_STEPS)
+        self.last_step = now
+
+        expired = self.alive & (now - self.born >= self.lifetime)
+        if expired.any():
+            self._retire(np.flatnonzero(expired))
+
+        active = np.flatnonzero(self.moving)
+        if active.size:
+            vel = self.vel[active]
+            pos = self.pos[active]
+            floor = self.floor[active]
+
+            vel[:, 1] += self.gravity * steps
+            pos += vel * steps
+
+            hit_floor = pos[:, 1] >= floor
+            pos[hit_floor, 1] = floor[hit_floor]
+            vel[hit_floor, 1] *= self.bounce
+            vel[hit_floor, 0] *= self.floor_friction
+
+            self.vel[active] = vel
+            self.pos[active] = pos
+
+            # Early retirement: on the floor and barely moving
+            at_rest = hit_floor & (np.abs(vel[:, 0]) < self.rest_speed) & (np.abs(vel[:, 1]) < self.rest_speed + self.gravity * steps)
+            self.moving[active[at_rest]] = False
+
+            pixels = np.rint(pos).astype(np.int64)
+            changed = np.any(pixels != self.drawn[active], axis=1)
+            self.coords_skipped += int(active.size - np.count_nonzero(changed))
+            move = self.surface.move if self.surface is not None else self.canvas.coords
+            for slot, (px, py) in zip(active[changed], pixels[changed]):
+                move(self.item_ids[slot], int(px), int(py))
+            self.coords_calls += int(np.count_nonzero(changed))
+            self.drawn[active[changed]] = pixels[changed]
+
+        if not self.alive.any():
+            self.task_id = None
+            return False
+        return True
+
+    def _retire(self, slots):
+        for slot in slots:
+            if self.surface is not None:
+                self.surface.remove(self.item_ids[slot])
+                self.item_ids[slot] = None
+            else:
+                self.canvas.itemconfig(self.item_ids[slot], state="hidden")
+        self.alive[slots] = False
+        self.moving[slots] = False
+
+    def active_count(self):
+        return int(np.count_nonzero(self.alive))
+
+    def clear(self):
+        """Hides every live particle; pooled canvas items are kept for reuse."""
+        live = np.flatnonzero(self.alive)
+        if live.size:
+            self._retire(live)
+        if self.task_id is not None:
+            self.scheduler.unregister(self.task_id)
+            self.task_id = None
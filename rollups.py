@@ -0,0 +1,140 @@
+"""Materialized totals over the session partitions.
+
+Each rollup table holds one row per partition and bucket (a day, ISO week,
+month, year or the single all-time bucket) with the number of sessions and
+seconds worked. Triggers on every partition table (see session_partitions)
+keep them current, so totals and summaries read a handful of rows instead
+of scanning every session, and only for the partitions they need. Buckets
+use the local time the session was clocked in at (clock_in +
+clock_in_offset), like the weekly summary always has. A week spanning New
+Year has a row in both years' partitions; readers add them up.
+
+Bulk inserts (import, merge) suspend a partition's triggers and apply
+set-based updates instead of paying a trigger per row. `verify` compares
+every rollup against a fresh aggregation, and `rebuild` recomputes them:
+
+    python main.py rollups verify
+    python main.py rollups rebuild
+"""
+from contextlib import contextmanager
+
+# Rollup table -> SQL expression for a session's bucket, with {t} standing for
+# the row alias ("NEW", "OLD" or a table name)
+BUCKETS = {
+    "rollup_total": "'all'",
+    "rollup_yearly": "strftime('%Y', {t}.clock_in + {t}.clock_in_offset, 'unixepoch')",
+    "rollup_monthly": "strftime('%Y-%m', {t}.clock_in + {t}.clock_in_offset, 'unixepoch')",
+    "rollup_weekly": "date({t}.clock_in + {t}.clock_in_offset, 'unixepoch', 'weekday 0', '-6 days')",
+    "rollup_daily": "date({t}.clock_in + {t}.clock_in_offset, 'unixepoch')",
+}
+
+ROLLUP_COLUMNS = """
+    partition_id INTEGER NOT NULL,
+    bucket TEXT NOT NULL,
+    session_count INTEGER NOT NULL,
+    seconds INTEGER NOT NULL,
+    PRIMARY KEY (bucket, partition_id)
+"""
+
+
+def _trigger_names(sessions_table):
+    return tuple(f"rollups_{sessions_table}_after_{event}" for event in ("insert", "delete", "update"))
+
+
+def _add_row_sql(table, partition_id, alias):
+    return (f"INSERT INTO {table} (partition_id, bucket, session_count, seconds) "
+            f"VALUES ({partition_id}, {BUCKETS[table].format(t=alias)}, 1, {alias}.duration_seconds) "
+            "ON CONFLICT (bucket, partition_id) DO UPDATE SET session_count = session_count + 1, "
+            "seconds = seconds + excluded.seconds;")
+
+
+def _remove_row_sql(table, partition_id, alias):
+    match = f"partition_id = {partition_id} AND bucket = {BUCKETS[table].format(t=alias)}"
+    return (f"UPDATE {table} SET session_count = session_count - 1, seconds = seconds - {alias}.duration_seconds "
+            f"WHERE {match}; "
+            f"DELETE FROM {table} WHERE {match} AND session_count <= 0;")
+
+
+def create_tables(conn):
+    for table in BUCKETS:
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({ROLLUP_COLUMNS}) WITHOUT ROWID")
+
+
+def create_triggers(conn, partition_id, sessions_table):
+    """Keeps the partition's rollup rows current as rows of its table change."""
+    add_new = " ".join(_add_row_sql(table, partition_id, "NEW") for table in BUCKETS)
+    remove_old = " ".join(_remove_row_sql(table, partition_id, "OLD") for table in BUCKETS)
+    after_insert, after_delete, after_update = _trigger_names(sessions_table)
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS {after_insert} AFTER INSERT ON {sessions_table} BEGIN {add_new} END")
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS {after_delete} AFTER DELETE ON {sessions_table} BEGIN {remove_old} END")
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS {after_update} "
+                 f"AFTER UPDATE OF clock_in, clock_in_offset, duration_seconds ON {sessions_table} "
+                 f"BEGIN {remove_old} {add_new} END")
+
+
+def drop_triggers(conn, sessions_table):
+    for trigger in _trigger_names(sessions_table):
+        conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+
+
+@contextmanager
+def suspended(conn, partition_id, sessions_table):
+    """Drops a partition's triggers for a bulk change; the caller updates the rollups itself.
+
+    Use inside a transaction so the triggers reappear atomically with the change.
+    """
+    drop_triggers(conn, sessions_table)
+    try:
+        yield
+    finally:
+        create_triggers(conn, partition_id, sessions_table)
+
+
+def add_sessions(conn, partition_id, source, where="", params=()):
+    """Adds the rows of `source` matching `where` (e.g. "WHERE id > ?") to the partition's rollups, set-based.
+
+    `source` is the partition's table, or a staging table holding rows bound for it.
+    """
+    for table, bucket in BUCKETS.items():
+        conn.execute(f"""
+            INSERT INTO {table} (partition_id, bucket, session_count, seconds)
+            SELECT ?, {bucket.format(t="sessions")} AS b, COUNT(*), SUM(duration_seconds) FROM {source} AS sessions {where} GROUP BY b
+            ON CONFLICT (bucket, partition_id) DO UPDATE SET session_count = session_count + excluded.session_count,
+                                                             seconds = seconds + excluded.seconds
+        """, (partition_id, *params))
+
+
+def clear(conn, partition_ids=None):
+    """Deletes the rollup rows of the given partitions (of every partition by default)."""
+    for table in BUCKETS:
+        if partition_ids is None:
+            conn.execute(f"DELETE FROM {table}")
+        else:
+            conn.executemany(f"DELETE FROM {table} WHERE partition_id = ?", [(i,) for i in partition_ids])
+
+
+def rebuild(conn, partitions):
+    """Recomputes every rollup from `partitions` ({partition id: sessions table}). Run inside a transaction."""
+    clear(conn)
+    for partition_id, sessions_table in partitions.items():
+        add_sessions(conn, partition_id, sessions_table)
+
+
+def verify(conn, partitions):
+    """Returns [(table, partition id, bucket, stored (count, seconds), actual (count, seconds))] for every drifted bucket.
+
+    `partitions` is {partition id: sessions table}; rollup rows of any other partition count as drifted.
+    """
+    problems = []
+    for table, bucket in BUCKETS.items():
+        actual = {}
+        for partition_id, sessions_table in partitions.items():
+            actual.update({(partition_id, row[0]): tuple(row[1:]) for row in conn.execute(
+                f"SELECT {bucket.format(t='sessions')} AS b, COUNT(*), SUM(duration_seconds) "
+                f"FROM {sessions_table} AS sessions GROUP BY b")})
+        stored = {tuple(row[:2]): tuple(row[2:]) for row in conn.execute(
+            f"SELECT partition_id, bucket, session_count, seconds FROM {table}")}
+        for key in sorted(actual.keys() | stored.keys()):
+            if actual.get(key) != stored.get(key):
+                problems.append((table, *key, stored.get(key), actual.get(key)))
+    return problems
@@ -0,0 +1,326 @@
+"""Schema versioning for study_sessions.db.
+
+The schema version lives in SQLite's `user_version` pragma. Version 0 is the
+original layout (ISO TEXT timestamps plus `duration_minutes`); version 2
+stores integer epoch seconds with the UTC offset that was in effect, and the
+exact `duration_seconds`; version 3 adds the single-row `open_session` table
+so the GUI and the headless CLI share the clocked-in state; version 4 indexes
+sessions on (clock_in, clock_out) for duplicate detection and records bulk
+import progress in `import_progress`; version 5 adds the trigger-maintained
+rollup tables (see rollups.py); version 6 adds named `projects`, tags each
+session with an optional `project_id`, and replaces `open_session` with
+`open_timers` (one running timer per project, NULL for no project); version 7
+gives every session a stable `uuid` and the database its own identity, and
+records per-source high-water marks for `session_merge`; version 8 splits
+sessions into per-year partition tables behind a `sessions` view (see
+session_partitions.py) and keys the rollups by partition.
+
+The v1 -> v2 conversion streams the old table in id order, `chunk_size` rows
+at a time, committing each chunk into `sessions_v2`. An interrupted run
+resumes from the highest id already copied, and the tables are only swapped
+once every row has been converted. The v7 -> v8 split copies each year
+with one INSERT ... SELECT over the clock_in index, in a single transaction.
+Rows whose timestamps can't be parsed
+are not given an invented date: they are moved as they were into
+`sessions_v1_rejects`, with the reason, for fixing by hand.
+
+Run directly to migrate a database file:
+
+    python schema_migrations.py path/to/study_sessions.db
+"""
+import sqlite3
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import rollups
+import session_partitions
+
+SCHEMA_VERSION = 8
+
+SESSIONS_V2_COLUMNS = """
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    clock_in INTEGER NOT NULL,
+    clock_in_offset INTEGER NOT NULL,
+    clock_out INTEGER NOT NULL,
+    clock_out_offset INTEGER NOT NULL,
+    duration_seconds INTEGER NOT NULL,
+    notes TEXT
+"""
+
+OPEN_SESSION_COLUMNS = """
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    clock_in INTEGER NOT NULL,
+    clock_in_offset INTEGER NOT NULL
+"""
+
+PROJECTS_COLUMNS = """
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE COLLATE NOCASE
+"""
+
+OPEN_TIMERS_COLUMNS = """
+    id INTEGER PRIMARY KEY,
+    project_id INTEGER REFERENCES projects (id),
+    clock_in INTEGER NOT NULL,
+    clock_in_offset INTEGER NOT NULL
+"""
+
+DATABASE_IDENTITY_COLUMNS = """
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    uuid TEXT NOT NULL
+"""
+
+MERGE_SOURCES_COLUMNS = """
+    source_uuid TEXT PRIMARY KEY,
+    last_session_id INTEGER NOT NULL,
+    path TEXT,
+    merged_at INTEGER NOT NULL
+"""
+
+# A random (version 4) UUID, evaluated per row
+NEW_UUID_SQL = ("lower(hex(randomblob(4)) || '-' || hex(randomblob(2)) || '-4' || substr(hex(randomblob(2)), 2) || '-' "
+                "|| substr('89ab', 1 + abs(random()) % 4, 1) || substr(hex(randomblob(2)), 2) || '-' || hex(randomblob(6)))")
+
+SESSIONS_V1_REJECTS_COLUMNS = """
+    id INTEGER PRIMARY KEY,
+    clock_in TEXT,
+    clock_out TEXT,
+    duration_minutes INTEGER,
+    notes TEXT,
+    error TEXT NOT NULL
+"""
+
+IMPORT_PROGRESS_COLUMNS = """
+    source TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    records_done INTEGER NOT NULL,
+    finished INTEGER NOT NULL DEFAULT 0
+"""
+
+
+def get_schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def _table_exists(conn, name):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).fetchone() is not None
+
+
+@contextmanager
+def transaction(conn):
+    conn.execute("BEGIN")
+    try:
+        yield
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def _create_sessions_indexes(conn):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_clock_in ON sessions (clock_in)")
+
+
+def migrate(conn, chunk_size=5000, progress=None):
+    """Brings the database up to SCHEMA_VERSION.
+
+    Manages its own transactions, so it must not be called inside one.
+    `progress(copied_rows, total_rows)` is called after every committed chunk
+    of a v1 -> v2 conversion.
+    """
+    version = get_schema_version(conn)
+    if version >= SCHEMA_VERSION:
+        return version
+
+    if version < 2:
+        if _table_exists(conn, "sessions"):
+            _migrate_v1_to_v2(conn, chunk_size, progress)
+        else:
+            with transaction(conn):
+                conn.execute(f"CREATE TABLE sessions ({SESSIONS_V2_COLUMNS})")
+                _create_sessions_indexes(conn)
+                conn.execute("PRAGMA user_version = 2")
+        version = 2
+
+    if version < 3:
+        with transaction(conn):
+            conn.execute(f"CREATE TABLE IF NOT EXISTS open_session ({OPEN_SESSION_COLUMNS})")
+            conn.execute("PRAGMA user_version = 3")
+        version = 3
+
+    if version < 4:
+        with transaction(conn):
+            # The composite index also serves clock_in range scans, so it replaces the old one
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_clock_in_out ON sessions (clock_in, clock_out)")
+            conn.execute("DROP INDEX IF EXISTS idx_sessions_clock_in")
+            conn.execute(f"CREATE TABLE IF NOT EXISTS import_progress ({IMPORT_PROGRESS_COLUMNS})")
+            conn.execute("PRAGMA user_version = 4")
+        version = 4
+
+    if version < 5:
+        with transaction(conn):
+            # Version 5 added the rollups to the single sessions table; the v8 step builds them per partition
+            conn.execute("PRAGMA user_version = 5")
+        version = 5
+
+    if version < 6:
+        with transaction(conn):
+            conn.execute(f"CREATE TABLE IF NOT EXISTS projects ({PROJECTS_COLUMNS})")
+            conn.execute("ALTER TABLE sessions ADD COLUMN project_id INTEGER REFERENCES projects (id)")
+            # Covers per-project totals and clock_in range scans without touching the table
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_project "
+                         "ON sessions (project_id, clock_in, clock_in_offset, duration_seconds)")
+            conn.execute(f"CREATE TABLE IF NOT EXISTS open_timers ({OPEN_TIMERS_COLUMNS})")
+            # At most one running timer per project; NULL (no project) counts as one project
+            conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_open_timers_project ON open_timers (IFNULL(project_id, 0))")
+            conn.execute("INSERT INTO open_timers (project_id, clock_in, clock_in_offset) "
+                         "SELECT NULL, clock_in, clock_in_offset FROM open_session")
+            conn.execute("DROP TABLE open_session")
+            conn.execute("PRAGMA user_version = 6")
+        version = 6
+
+    if version < 7:
+        with transaction(conn):
+            conn.execute("ALTER TABLE sessions ADD COLUMN uuid TEXT")
+            conn.execute(f"UPDATE sessions SET uuid = {NEW_UUID_SQL}")
+            conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_sessions_uuid ON sessions (uuid)")
+            conn.execute(f"CREATE TABLE IF NOT EXISTS database_identity ({DATABASE_IDENTITY_COLUMNS})")
+            conn.execute(f"INSERT OR IGNORE INTO database_identity (id, uuid) VALUES (1, {NEW_UUID_SQL})")
+            conn.execute(f"CREATE TABLE IF NOT EXISTS merge_sources ({MERGE_SOURCES_COLUMNS})")
+            conn.execute("PRAGMA user_version = 7")
+        version = 7
+
+    if version < 8:
+        with transaction(conn):
+            _partition_sessions(conn)
+            conn.execute("PRAGMA user_version = 8")
+        version = 8
+
+    return version
+
+
+# --- v1 -> v2 ---
+def iso_to_epoch(iso_text):
+    """Converts an ISO timestamp to (epoch seconds, UTC offset seconds).
+
+    Naive values were written with datetime.now(), so they are interpreted in
+    the machine's local time zone as it was at that instant (DST-aware).
+    """
+    dt = datetime.fromisoformat(iso_text)
+    if dt.tzinfo is None:
+        dt = dt.astimezone()
+    return int(dt.timestamp()), int(dt.utcoffset().total_seconds())
+
+
+def _convert_v1_row(row):
+    """The v2 row for a v1 row. Raises ValueError or TypeError for unparseable timestamps."""
+    row_id, clock_in_iso, clock_out_iso, duration_minutes, notes = row
+    clock_in, clock_in_offset = iso_to_epoch(clock_in_iso)
+    clock_out, clock_out_offset = iso_to_epoch(clock_out_iso)
+    # From the epochs, so a session spanning a DST change isn't an hour off
+    return row_id, clock_in, clock_in_offset, clock_out, clock_out_offset, max(clock_out - clock_in, 0), notes
+
+
+def _migrate_v1_to_v2(conn, chunk_size, progress):
+    conn.execute(f"CREATE TABLE IF NOT EXISTS sessions_v2 ({SESSIONS_V2_COLUMNS})")
+    conn.execute(f"CREATE TABLE IF NOT EXISTS sessions_v1_rejects ({SESSIONS_V1_REJECTS_COLUMNS})")
+    total_rows = conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+    last_id, copied = conn.execute("""
+        SELECT COALESCE(MAX(last_id), 0), SUM(row_count) FROM (
+            SELECT MAX(id) AS last_id, COUNT(*) AS row_count FROM sessions_v2
+            UNION ALL SELECT MAX(id), COUNT(*) FROM sessions_v1_rejects)
+    """).fetchone()
+
+    while True:
+        rows = conn.execute(
+            "SELECT id, clock_in, clock_out, duration_minutes, notes FROM sessions WHERE id > ? ORDER BY id LIMIT ?",
+            (last_id, chunk_size)).fetchall()
+        if not rows:
+            break
+        converted, rejected = [], []
+        for row in rows:
+            try:
+                converted.append(_convert_v1_row(row))
+            except (TypeError, ValueError) as e:
+                rejected.append((*row, str(e)))
+        with transaction(conn):
+            conn.executemany(
+                "INSERT INTO sessions_v2 (id, clock_in, clock_in_offset, clock_out, clock_out_offset, duration_seconds, notes) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                converted)
+            conn.executemany(
+                "INSERT INTO sessions_v1_rejects (id, clock_in, clock_out, duration_minutes, notes, error) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rejected)
+        last_id = rows[-1][0]
+        copied += len(rows)
+        if progress:
+            progress(copied, total_rows)
+
+    # Swap tables atomically, carrying the AUTOINCREMENT high-water mark across
+    with transaction(conn):
+        old_seq = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'sessions'").fetchone()
+        conn.execute("DROP TABLE sessions")
+        conn.execute("ALTER TABLE sessions_v2 RENAME TO sessions")
+        if old_seq is not None:
+            updated = conn.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'sessions'", (old_seq[0],)).rowcount
+            if not updated:
+                conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('sessions', ?)", (old_seq[0],))
+        _create_sessions_indexes(conn)
+        conn.execute("PRAGMA user_version = 2")
+    rejects = conn.execute("SELECT COUNT(*) FROM sessions_v1_rejects").fetchone()[0]
+    if rejects:
+        print(f"Warning: {rejects} session(s) had unreadable timestamps and were left out; "
+              "they are kept unchanged in the sessions_v1_rejects table")
+
+
+# --- v7 -> v8 ---
+def _partition_sessions(conn):
+    # The old table's rollup triggers and tables go first, since the rollups change shape
+    for trigger in ("rollups_after_insert", "rollups_after_delete", "rollups_after_update"):
+        conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    for table in rollups.BUCKETS:
+        conn.execute(f"DROP TABLE IF EXISTS {table}")
+    old_seq = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'sessions'").fetchone()
+    conn.execute("ALTER TABLE sessions RENAME TO sessions_v7")  # Frees the name for the view
+    session_partitions.create_tables(conn)
+    rollups.create_tables(conn)
+    conn.execute("INSERT INTO session_id_sequence (id, last_id) "
+                 "VALUES (1, MAX(?, (SELECT COALESCE(MAX(id), 0) FROM sessions_v7)))", (old_seq[0] if old_seq else 0,))
+
+    local_year = session_partitions.LOCAL_YEAR.format(t="sessions_v7")
+    years = sorted(year for (year,) in conn.execute(f"SELECT DISTINCT {local_year} FROM sessions_v7"))
+    for year in years:
+        partition_id = session_partitions.create_partition(conn, year)
+        table = session_partitions.table_name(partition_id)
+        # The clock_in bounds (widened by a day for UTC offsets) let each year use idx_sessions_clock_in_out
+        start = int(datetime(year, 1, 1, tzinfo=timezone.utc).timestamp()) - 86400
+        end = int(datetime(year + 1, 1, 1, tzinfo=timezone.utc).timestamp()) + 86400
+        with rollups.suspended(conn, partition_id, table):
+            conn.execute(f"INSERT INTO {table} ({session_partitions.VIEW_COLUMNS}) "
+                         f"SELECT {session_partitions.VIEW_COLUMNS} FROM sessions_v7 "
+                         f"WHERE clock_in >= ? AND clock_in < ? AND {local_year} = ? ORDER BY id", (start, end, year))
+            rollups.add_sessions(conn, partition_id, table)
+    conn.execute("DROP TABLE sessions_v7")
+    session_partitions.refresh_views(conn)
+
+
+def main(argv):
+    if len(argv) != 2:
+        print("Usage: python schema_migrations.py path/to/study_sessions.db")
+        return 2
+    conn = sqlite3.connect(argv[1], isolation_level=None)
+    try:
+        before = get_schema_version(conn)
+        after = migrate(conn, progress=lambda done, total: print(f"Migrated {done}/{total} sessions"))
+        print(f"Schema version {before} -> {after}")
+    except sqlite3.Error as e:
+        print(f"Migration failed (safe to re-run to resume): {e}")
+        return 1
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
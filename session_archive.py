@@ -0,0 +1,83 @@
+"""Archiving whole years of sessions out of the live totals.
+
+Sessions are stored in year partitions (see session_partitions), so
+archiving a year only marks its partitions archived and takes them out of
+the `sessions` view: the same time whatever the year holds, and no row is
+copied or deleted. Archived years keep their rollups, so the summaries and
+totals include them with `include_archived=True` (`--archived` on the
+command line), still reading only the partitions a range overlaps.
+Restoring flips the partitions back; dropping deletes their tables for good.
+
+A reset from the window archives every live partition the same way, so it
+can be undone with `archive restore`.
+
+    python main.py archive move 2023 2024
+    python main.py yearly --archived
+    python main.py archive restore 2023
+"""
+import schema_migrations
+import session_partitions
+
+
+def _partitions_by_year(conn, archived):
+    by_year = {}
+    for partition_id, year, is_archived in session_partitions.list_partitions(conn):
+        if is_archived == archived:
+            by_year.setdefault(year, []).append(partition_id)
+    return by_year
+
+
+def live_years(conn):
+    """The years that have live partitions, oldest first."""
+    return sorted(_partitions_by_year(conn, archived=False))
+
+
+def partition_totals(conn):
+    """Returns [(year, sessions, seconds)] for every archived year."""
+    return [(year, *session_partitions.partition_totals(conn, ids))
+            for year, ids in sorted(_partitions_by_year(conn, archived=True).items())]
+
+
+def archive_years(conn, years):
+    """Takes each year's live partitions out of the live totals. Returns {year: sessions archived}.
+
+    Runs its own transaction, so it must not be called inside one.
+    """
+    moved = {}
+    with schema_migrations.transaction(conn):
+        live = _partitions_by_year(conn, archived=False)
+        for year in years:
+            ids = live.get(year, [])
+            moved[year] = session_partitions.partition_totals(conn, ids)[0]
+            session_partitions.set_archived(conn, ids, True)
+    return moved
+
+
+def restore_years(conn, years):
+    """Puts archived years back into the live totals. Returns {year: sessions restored}.
+
+    A restored partition sits next to any live partition the year gained
+    since; the `sessions` view and the summaries add them up. Runs its own
+    transaction, so it must not be called inside one.
+    """
+    restored = {}
+    with schema_migrations.transaction(conn):
+        archived = _partitions_by_year(conn, archived=True)
+        for year in years:
+            if year not in archived:
+                raise ValueError(f"Nothing archived for {year}")
+            restored[year] = session_partitions.partition_totals(conn, archived[year])[0]
+            session_partitions.set_archived(conn, archived[year], False)
+    return restored
+
+
+def drop_years(conn, years):
+    """Deletes archived years for good. Returns the years that had archived partitions."""
+    dropped = []
+    with schema_migrations.transaction(conn):
+        archived = _partitions_by_year(conn, archived=True)
+        for year in years:
+            if year in archived:
+                session_partitions.drop_partitions(conn, archived[year])
+                dropped.append(year)
+    return dropped
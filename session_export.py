@@ -0,0 +1,185 @@
+"""Streaming export of the sessions table.
+
+Sessions are read in `fetchmany` chunks (see session_store.iter_session_chunks)
+and written as they arrive, so memory use stays flat however large the
+database is. Formats:
+
+- csv / jsonl: one session per row/line with ISO 8601 timestamps carrying
+  their recorded UTC offset; both can be read back by session_import.
+- kses: a compact little-endian columnar file. After a `<4sHH` header
+  (b"KSES", format version, column count) come blocks of up to `chunk_size`
+  sessions: a `<I` row count, then each column as a packed array (id,
+  clock_in and clock_out as int64; the offsets and duration_seconds as
+  int32), then the notes as uint32 byte lengths followed by the UTF-8 bytes.
+  A zero row count ends the file. `iter_columnar` reads it back.
+
+    python main.py export sessions.csv --from 2024-01-01
+"""
+import csv
+import json
+import os
+import struct
+import sys
+from array import array
+from datetime import datetime, timedelta, timezone
+
+import session_store
+
+FORMATS = ("csv", "jsonl", "kses")
+FIELDS = ("id", "clock_in", "clock_out", "duration_seconds", "notes")
+
+_COLUMNAR_MAGIC = b"KSES"
+_COLUMNAR_VERSION = 1
+_COLUMNAR_HEADER = struct.Struct("<4sHH")
+_BLOCK_HEADER = struct.Struct("<I")
+# (row index, array typecode) for each fixed-width column, in file order
+_COLUMNAR_COLUMNS = ((0, "q"), (1, "q"), (2, "i"), (3, "q"), (4, "i"), (5, "i"))
+
+
+def detect_format(path):
+    extension = os.path.splitext(path)[1].lower().lstrip(".")
+    if extension in FORMATS:
+        return extension
+    if extension in ("ndjson", "json"):
+        return "jsonl"
+    raise ValueError(f"Can't tell the export format of {path}; pass one of {', '.join(FORMATS)}")
+
+
+class _IsoFormatter:
+    """Formats (epoch, offset) pairs as ISO strings, reusing one tzinfo per offset."""
+
+    def __init__(self):
+        self._zones = {}
+
+    def __call__(self, epoch, offset):
+        zone = self._zones.get(offset)
+        if zone is None:
+            zone = self._zones[offset] = timezone(timedelta(seconds=offset))
+        return datetime.fromtimestamp(epoch, zone).isoformat()
+
+
+def _text_records(chunks):
+    to_iso = _IsoFormatter()
+    for rows in chunks:
+        yield [(row_id, to_iso(clock_in, clock_in_offset), to_iso(clock_out, clock_out_offset), duration, notes or "")
+               for row_id, clock_in, clock_in_offset, clock_out, clock_out_offset, duration, notes in rows]
+
+
+def _write_csv(f, chunks, progress):
+    writer = csv.writer(f)
+    writer.writerow(FIELDS)
+    written = 0
+    for records in _text_records(chunks):
+        writer.writerows(records)
+        written += len(records)
+        if progress:
+            progress(written)
+    return written
+
+
+def _write_jsonl(f, chunks, progress):
+    written = 0
+    for records in _text_records(chunks):
+        # Only notes need JSON escaping; the other fields are numbers and ISO strings
+        f.write("".join(f'{{"id": {row_id}, "clock_in": "{clock_in}", "clock_out": "{clock_out}", '
+                        f'"duration_seconds": {duration}, "notes": {json.dumps(notes, ensure_ascii=False)}}}\n'
+                        for row_id, clock_in, clock_out, duration, notes in records))
+        written += len(records)
+        if progress:
+            progress(written)
+    return written
+
+
+def _packed(typecode, values):
+    column = array(typecode, values)
+    if sys.byteorder == "big":
+        column.byteswap()
+    return column.tobytes()
+
+
+def _write_columnar(f, chunks, progress):
+    f.write(_COLUMNAR_HEADER.pack(_COLUMNAR_MAGIC, _COLUMNAR_VERSION, len(_COLUMNAR_COLUMNS) + 1))
+    written = 0
+    for rows in chunks:
+        f.write(_BLOCK_HEADER.pack(len(rows)))
+        for index, typecode in _COLUMNAR_COLUMNS:
+            f.write(_packed(typecode, [row[index] for row in rows]))
+        notes = [(row[6] or "").encode("utf-8") for row in rows]
+        f.write(_packed("I", map(len, notes)))
+        f.write(b"".join(notes))
+        written += len(rows)
+        if progress:
+            progress(written)
+    f.write(_BLOCK_HEADER.pack(0))
+    return written
+
+
+def export_sessions(conn, out, fmt, start=None, end=None, chunk_size=10000, progress=None):
+    """Writes sessions with start <= clock_in < end to the open file `out`.
+
+    `out` must be opened in binary mode for "kses" and in text mode (with
+    newline="") otherwise. `progress(rows_written)` is called after each
+    chunk. Returns the number of sessions written.
+    """
+    chunks = session_store.iter_session_chunks(conn, start, end, chunk_size)
+    if fmt == "csv":
+        return _write_csv(out, chunks, progress)
+    if fmt == "jsonl":
+        return _write_jsonl(out, chunks, progress)
+    if fmt == "kses":
+        return _write_columnar(out, chunks, progress)
+    raise ValueError(f"Unknown export format {fmt!r}; expected one of {', '.join(FORMATS)}")
+
+
+def export_to_path(conn, path, fmt=None, start=None, end=None, chunk_size=10000, progress=None):
+    """Exports to `path` via a temporary file, so a failed export never leaves a truncated file behind."""
+    fmt = fmt or detect_format(path)
+    partial_path = path + ".part"
+    try:
+        if fmt == "kses":
+            with open(partial_path, "wb") as f:
+                written = export_sessions(conn, f, fmt, start, end, chunk_size, progress)
+        else:
+            with open(partial_path, "w", newline="", encoding="utf-8") as f:
+                written = export_sessions(conn, f, fmt, start, end, chunk_size, progress)
+        os.replace(partial_path, path)
+    except BaseException:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+    return written
+
+
+def _read_column(f, typecode, count):
+    column = array(typecode)
+    column.frombytes(_read_exact(f, column.itemsize * count))
+    if sys.byteorder == "big":
+        column.byteswap()
+    return column
+
+
+def _read_exact(f, size):
+    data = f.read(size)
+    if len(data) != size:
+        raise ValueError("Truncated columnar export")
+    return data
+
+
+def iter_columnar(path):
+    """Yields full session rows (as exported) from a "kses" file, one block at a time."""
+    with open(path, "rb") as f:
+        magic, version, column_count = _COLUMNAR_HEADER.unpack(_read_exact(f, _COLUMNAR_HEADER.size))
+        if magic != _COLUMNAR_MAGIC or version != _COLUMNAR_VERSION:
+            raise ValueError(f"{path} is not a version {_COLUMNAR_VERSION} columnar session export")
+        while True:
+            (count,) = _BLOCK_HEADER.unpack(_read_exact(f, _BLOCK_HEADER.size))
+            if not count:
+                return
+            columns = [_read_column(f, typecode, count) for _, typecode in _COLUMNAR_COLUMNS]
+            lengths = _read_column(f, "I", count)
+            blob = _read_exact(f, sum(lengths))
+            notes, position = [], 0
+            for length in lengths:
+                notes.append(blob[position:position + length].decode("utf-8"))
+                position += length
+            yield from zip(*columns, notes)
@@ -0,0 +1,223 @@
+"""Bulk import of sessions from CSV and JSON Lines files.
+
+Both formats carry `clock_in`, `clock_out` and an optional `notes` field (a
+CSV header row names the columns). Timestamps may be ISO 8601 strings (naive
+ones are local time) or epoch seconds.
+
+Records are parsed lazily and written with `executemany`, `batch_size`
+records per transaction. Each transaction also advances the file's row in
+`import_progress`, so an interrupted import resumes after the last committed
+batch. Sessions already in the database (same clock_in and clock_out),
+archived ones included, are skipped via each partition's (clock_in,
+clock_out) index, so re-importing a file, or two overlapping exports, never
+creates duplicates.
+
+    python main.py import history.csv
+
+"""
+import csv
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+from itertools import islice
+
+import schema_migrations
+import session_partitions
+import session_store
+
+FORMATS = ("csv", "jsonl")
+
+# Each batch is staged in a temp table (deduplicated there), then copied over
+# set-based, skipping sessions already stored
+_CREATE_BATCH_TABLE = """
+    CREATE TEMP TABLE IF NOT EXISTS import_batch (
+        clock_in INTEGER, clock_in_offset INTEGER, clock_out INTEGER, clock_out_offset INTEGER,
+        duration_seconds INTEGER, notes TEXT, UNIQUE (clock_in, clock_out))
+"""
+_STAGE_SESSION = "INSERT OR IGNORE INTO import_batch VALUES (?, ?, ?, ?, ?, ?)"
+_NEW_SESSIONS = f"""
+    SELECT {schema_migrations.NEW_UUID_SQL}, b.*, NULL FROM import_batch AS b
+    WHERE NOT EXISTS (SELECT 1 FROM all_sessions AS s WHERE s.clock_in = b.clock_in AND s.clock_out = b.clock_out)
+"""
+
+
+def detect_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        return "csv"
+    if extension in (".jsonl", ".ndjson", ".json"):
+        return "jsonl"
+    raise ValueError(f"Can't tell the format of {path}; pass csv or jsonl explicitly")
+
+
+def iter_records(path, fmt):
+    """Yields (record number, dict) for every record in the file, reading it lazily."""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        if fmt == "csv":
+            for number, row in enumerate(csv.DictReader(f), 1):
+                yield number, row
+        else:
+            number = 0
+            for line in f:
+                if not line.strip():
+                    continue
+                number += 1
+                try:
+                    yield number, json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield number, e
+
+
+class _TimestampParser:
+    """Converts timestamps like `session_store.to_epoch`, but much faster in bulk.
+
+    The local UTC offset is looked up once per day and cached. Days that
+    contain an offset change (DST) fall back to one lookup per 15-minute slot,
+    since time zones change offset on 15-minute boundaries.
+    """
+    _NAIVE_EPOCH = datetime(1970, 1, 1)
+    _DAY_SECONDS = 86400
+    _SLOT_SECONDS = 900
+
+    def __init__(self):
+        self._naive_shifts = {}
+        self._epoch_offsets = {}
+
+    def parse(self, value):
+        if isinstance(value, str):
+            value = value.strip()
+            if ":" in value or "-" in value[1:] or "T" in value:
+                return self._parse_iso(value)
+            value = float(value)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            epoch = int(value)
+            offset = self._epoch_offsets.get(epoch // self._DAY_SECONDS)
+            if offset is None or offset is False:
+                offset = self._lookup(self._epoch_offsets, epoch, self._epoch_offset)
+            return epoch, offset
+        raise ValueError(f"unsupported timestamp {value!r}")
+
+    def _parse_iso(self, text):
+        dt = datetime.fromisoformat(text)
+        if dt.tzinfo is not None:
+            return int(dt.timestamp()), int(dt.utcoffset().total_seconds())
+        delta = dt - self._NAIVE_EPOCH
+        naive_seconds = delta.days * self._DAY_SECONDS + delta.seconds
+        shift = self._naive_shifts.get(delta.days)
+        if not shift:
+            shift = self._lookup(self._naive_shifts, naive_seconds, self._naive_shift)
+        return naive_seconds + shift[0], shift[1]
+
+    def _lookup(self, cache, seconds, lookup):
+        day = seconds // self._DAY_SECONDS
+        value = cache.get(day)
+        if value is None:
+            first, last = lookup(day * self._DAY_SECONDS), lookup((day + 1) * self._DAY_SECONDS - 1)
+            value = cache[day] = first if first == last else False
+        if value is False:
+            # The offset changes during this day
+            slot = ("slot", seconds // self._SLOT_SECONDS)
+            value = cache.get(slot)
+            if value is None:
+                value = cache[slot] = lookup(slot[1] * self._SLOT_SECONDS)
+        return value
+
+    @staticmethod
+    def _epoch_offset(epoch):
+        return session_store.to_epoch(epoch)[1]
+
+    def _naive_shift(self, naive_seconds):
+        # (epoch - naive seconds, reported offset); inside a DST gap the two differ
+        epoch, offset = session_store.to_epoch(self._NAIVE_EPOCH + timedelta(seconds=naive_seconds))
+        return epoch - naive_seconds, offset
+
+
+def normalize_record(record, parser=None):
+    """Returns the insert parameters for one record, or raises ValueError."""
+    if not isinstance(record, dict):
+        raise ValueError(str(record) if isinstance(record, Exception) else "record is not an object")
+    parser = parser or _TimestampParser()
+    try:
+        clock_in, clock_in_offset = parser.parse(record["clock_in"])
+        clock_out, clock_out_offset = parser.parse(record["clock_out"])
+    except KeyError as e:
+        raise ValueError(f"missing {e.args[0]}") from None
+    except (TypeError, OverflowError, OSError) as e:
+        raise ValueError(str(e)) from None
+    if clock_out < clock_in:
+        raise ValueError("clock_out is before clock_in")
+    notes = record.get("notes") or ""
+    return clock_in, clock_in_offset, clock_out, clock_out_offset, clock_out - clock_in, str(notes)
+
+
+def file_fingerprint(path):
+    """Identifies a file's contents cheaply: size, mtime and a hash of its first 64 KB."""
+    stat = os.stat(path)
+    with open(path, "rb") as f:
+        head = hashlib.sha1(f.read(65536)).hexdigest()
+    return f"{stat.st_size}:{stat.st_mtime_ns}:{head}"
+
+
+def _load_progress(conn, source, fingerprint):
+    row = conn.execute("SELECT fingerprint, records_done, finished FROM import_progress WHERE source = ?",
+                       (source,)).fetchone()
+    if row is None or row[0] != fingerprint:
+        return 0, False
+    return row[1], bool(row[2])
+
+
+def _save_progress(conn, source, fingerprint, records_done, finished):
+    conn.execute("INSERT OR REPLACE INTO import_progress (source, fingerprint, records_done, finished) VALUES (?, ?, ?, ?)",
+                 (source, fingerprint, records_done, int(finished)))
+
+
+def import_sessions(conn, path, fmt=None, batch_size=50000, progress=None, max_errors=20):
+    """Imports every valid session in `path` and returns a dict of counts.
+
+    Manages its own transactions, so it must not be called inside one.
+    `progress(counts)` is called after every committed batch. The first
+    `max_errors` invalid records are listed in counts["errors"] as
+    (record number, reason).
+    """
+    fmt = fmt or detect_format(path)
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown import format {fmt!r}; expected one of {', '.join(FORMATS)}")
+    source = os.path.abspath(path)
+    fingerprint = file_fingerprint(path)
+    records_done, finished = _load_progress(conn, source, fingerprint)
+    counts = {"read": records_done, "resumed_at": records_done, "inserted": 0, "duplicates": 0,
+              "invalid": 0, "errors": [], "already_imported": finished}
+    if finished:
+        return counts
+
+    conn.execute(_CREATE_BATCH_TABLE)
+    parser = _TimestampParser()
+    records = islice(iter_records(path, fmt), records_done, None)
+    while True:
+        batch = list(islice(records, batch_size))
+        rows = []
+        for number, record in batch:
+            try:
+                rows.append(normalize_record(record, parser))
+            except ValueError as e:
+                counts["invalid"] += 1
+                if len(counts["errors"]) < max_errors:
+                    counts["errors"].append((number, str(e)))
+        records_done += len(batch)
+
+        with schema_migrations.transaction(conn):
+            inserted = 0
+            if rows:
+                conn.executemany(_STAGE_SESSION, rows)
+                # Updates the rollups once per batch and year rather than once per row through the triggers
+                inserted = session_partitions.insert_sessions(conn, _NEW_SESSIONS)
+                conn.execute("DELETE FROM import_batch")
+            _save_progress(conn, source, fingerprint, records_done, finished=len(batch) < batch_size)
+        counts["read"] = records_done
+        counts["inserted"] += inserted
+        counts["duplicates"] += len(rows) - inserted
+        if progress:
+            progress(counts)
+        if len(batch) < batch_size:
+            return counts
@@ -0,0 +1,132 @@
+"""Incremental merge of another tracker database (e.g. a laptop's) into this one.
+
+Each database has its own identity (database_identity) and every session a
+stable uuid, so a session keeps its identity however many machines it
+passes through. For every source this database has merged from,
+`merge_sources` remembers the highest source session id already pulled in.
+Source ids only ever grow (session_id_sequence), so the next merge reads
+just the rows above that mark.
+
+The source file is ATTACHed and its new live sessions are copied set-based
+(session_partitions.insert_sessions), skipping uuids already stored here,
+archived ones included, so a repeat sync costs time proportional to the
+number of new sessions, not to either database's size. Projects are
+matched by name. Running timers, resets and deletions are not merged.
+
+The source is only read, so a backup or a read-only mount can be merged
+from. It must already be on the current schema: open it with this version
+of the tracker once (any command, e.g. `main.py --db PATH status`) so its
+sessions get their permanent uuids on that machine. A database set up by
+copying another one shares its identity; `--reset-identity` gives this
+database a new one, after which the two merge like any other pair.
+
+    python main.py merge /mnt/laptop/study_sessions.db
+    python main.py merge --reset-identity /mnt/laptop/study_sessions.db
+"""
+import os
+import sqlite3
+import time
+from contextlib import closing
+
+import schema_migrations
+import session_partitions
+
+_SOURCE = "merge_source"  # Schema name the source file is attached as
+
+_COPY_PROJECTS = f"""
+    INSERT INTO main.projects (name)
+    SELECT name FROM {_SOURCE}.projects WHERE true
+    ON CONFLICT (name) DO NOTHING
+"""
+_NEW_SESSIONS = f"""
+    SELECT s.uuid, s.clock_in, s.clock_in_offset, s.clock_out, s.clock_out_offset, s.duration_seconds, s.notes, p.id
+    FROM {_SOURCE}.sessions AS s
+    LEFT JOIN {_SOURCE}.projects AS sp ON sp.id = s.project_id
+    LEFT JOIN main.projects AS p ON p.name = sp.name
+    WHERE s.id > ? AND s.id <= ? AND s.uuid IS NOT NULL
+      AND NOT EXISTS (SELECT 1 FROM main.all_sessions AS m WHERE m.uuid = s.uuid)
+    ORDER BY s.id
+"""
+
+
+def database_uuid(conn, schema="main"):
+    return conn.execute(f"SELECT uuid FROM {schema}.database_identity WHERE id = 1").fetchone()[0]
+
+
+def assign_missing_uuids(conn):
+    """Gives sessions written without a uuid (e.g. by raw SQL) one; a lookup on each partition's uuid index."""
+    return sum(conn.execute(f"UPDATE {table} SET uuid = {schema_migrations.NEW_UUID_SQL} WHERE uuid IS NULL").rowcount
+               for table in session_partitions.partition_tables(conn).values())
+
+
+def reset_identity(conn):
+    """Gives this database a new identity, e.g. after it was set up as a copy of another machine's file."""
+    conn.execute(f"UPDATE database_identity SET uuid = {schema_migrations.NEW_UUID_SQL} WHERE id = 1")
+    return database_uuid(conn)
+
+
+def _check_source(path):
+    """Makes sure the source file is a tracker database on the current schema, without writing to it."""
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"No database file at {path}")
+    with closing(sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=5.0)) as source:
+        version = source.execute("PRAGMA user_version").fetchone()[0]
+    if version != schema_migrations.SCHEMA_VERSION:
+        raise ValueError(f"{path} is on schema v{version}, this tracker uses v{schema_migrations.SCHEMA_VERSION}. "
+                         f"Open it with this version once (e.g. `main.py --db {path} status`), then merge again")
+
+
+def _main_path(conn):
+    return next((row[2] for row in conn.execute("PRAGMA database_list") if row[1] == "main"), "")
+
+
+def merge_database(conn, path, full=False, new_identity=False):
+    """Copies the sessions added to the database at `path` since the last merge from it.
+
+    `full=True` ignores the high-water mark and rescans every source session
+    (still skipping known uuids), e.g. after the source was restored from a
+    backup. `new_identity=True` first gives this database a new identity
+    (see `reset_identity`). Must not be called inside a transaction. Returns
+    a dict with source, since (the previous mark), through (the new mark),
+    scanned, inserted, duplicates and without_uuid (source rows written
+    without a uuid, which can't be deduplicated and are skipped).
+    """
+    path = os.path.abspath(path)
+    main_path = _main_path(conn)
+    if main_path and os.path.exists(main_path) and os.path.samefile(main_path, path):
+        raise ValueError(f"{path} is this database and can't be merged into itself")
+    _check_source(path)
+    with schema_migrations.transaction(conn):
+        if new_identity:
+            reset_identity(conn)
+        assign_missing_uuids(conn)
+
+    conn.execute(f"ATTACH DATABASE ? AS {_SOURCE}", (path,))
+    try:
+        with schema_migrations.transaction(conn):
+            source_uuid = database_uuid(conn, _SOURCE)
+            if source_uuid == database_uuid(conn):
+                raise ValueError(f"{path} is a copy of this database (they share an identity). "
+                                 "Run the merge with --reset-identity to give this database its own")
+            row = conn.execute("SELECT last_session_id FROM merge_sources WHERE source_uuid = ?", (source_uuid,)).fetchone()
+            since = 0 if row is None or full else row[0]
+            through = session_partitions.max_session_id(conn, _SOURCE)
+            scanned, without_uuid = conn.execute(f"SELECT COUNT(*), COUNT(*) - COUNT(uuid) FROM {_SOURCE}.sessions "
+                                                 "WHERE id > ? AND id <= ?", (since, through)).fetchone()
+
+            inserted = 0
+            if scanned:
+                conn.execute(_COPY_PROJECTS)
+                # Like the importer: set-based rollup updates instead of a trigger per row
+                inserted = session_partitions.insert_sessions(conn, _NEW_SESSIONS, (since, through))
+
+            conn.execute("""
+                INSERT INTO merge_sources (source_uuid, last_session_id, path, merged_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT (source_uuid) DO UPDATE SET last_session_id = MAX(last_session_id, excluded.last_session_id),
+                                                        path = excluded.path, merged_at = excluded.merged_at
+            """, (source_uuid, through, path, int(time.time())))
+    finally:
+        conn.execute(f"DETACH DATABASE {_SOURCE}")
+
+    return {"source": source_uuid, "since": since, "through": through, "scanned": scanned,
+            "inserted": inserted, "duplicates": scanned - without_uuid - inserted, "without_uuid": without_uuid}
@@ -0,0 +1,227 @@
+"""Year partitions of the sessions table.
+
+Sessions are stored one table per year (local clock-in time, like the
+rollups), named `sessions_p<id>` and listed in the `session_partitions`
+catalog. The `sessions` view is the UNION ALL of the live partitions, so
+reads keep querying `sessions` and SQLite pushes their WHERE terms down
+into each partition's indexes; `all_sessions` spans the archived ones too.
+The rollup tables hold one set of rows per partition, so totals and
+summaries read only the partitions that overlap the requested range.
+
+Archiving, restoring and resetting flip a partition's `archived` flag and
+recreate the two views. That takes the same time however many sessions the
+partition holds, and nothing is deleted: an archived partition keeps its
+table and rollups until `drop_partitions` drops them.
+
+Writes go straight to the partition tables: `insert_session` for one row,
+`insert_sessions` for a set-based copy. Session ids come from
+`session_id_sequence` (a trigger on each partition keeps it past every id
+written), so they stay unique and increasing across partitions, which the
+merge high-water marks and the stats cache rely on.
+"""
+from datetime import datetime, timezone
+
+import rollups
+
+PARTITIONS_COLUMNS = """
+    id INTEGER PRIMARY KEY,
+    year INTEGER NOT NULL,
+    archived INTEGER NOT NULL DEFAULT 0
+"""
+
+SESSION_ID_SEQUENCE_COLUMNS = """
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    last_id INTEGER NOT NULL
+"""
+
+PARTITION_COLUMNS = """
+    id INTEGER PRIMARY KEY,
+    clock_in INTEGER NOT NULL,
+    clock_in_offset INTEGER NOT NULL,
+    clock_out INTEGER NOT NULL,
+    clock_out_offset INTEGER NOT NULL,
+    duration_seconds INTEGER NOT NULL,
+    notes TEXT,
+    project_id INTEGER REFERENCES projects (id),
+    uuid TEXT
+"""
+
+# Columns a new session is written with (the id is assigned here), and the full row the views expose
+SESSION_COLUMNS = "uuid, clock_in, clock_in_offset, clock_out, clock_out_offset, duration_seconds, notes, project_id"
+VIEW_COLUMNS = "id, clock_in, clock_in_offset, clock_out, clock_out_offset, duration_seconds, notes, project_id, uuid"
+
+# A session's partition year, with {t} standing for the row alias
+LOCAL_YEAR = "CAST(strftime('%Y', {t}.clock_in + {t}.clock_in_offset, 'unixepoch') AS INTEGER)"
+
+# insert_sessions stages rows here to number them and split them by year
+_CREATE_STAGING_TABLE = f"""
+    CREATE TEMP TABLE IF NOT EXISTS session_staging (
+        seq INTEGER PRIMARY KEY, uuid TEXT, clock_in INTEGER, clock_in_offset INTEGER, clock_out INTEGER,
+        clock_out_offset INTEGER, duration_seconds INTEGER, notes TEXT, project_id INTEGER,
+        year INTEGER AS ({LOCAL_YEAR.replace("{t}.", "")}))
+"""
+
+
+def create_tables(conn):
+    conn.execute(f"CREATE TABLE IF NOT EXISTS session_partitions ({PARTITIONS_COLUMNS})")
+    conn.execute(f"CREATE TABLE IF NOT EXISTS session_id_sequence ({SESSION_ID_SEQUENCE_COLUMNS})")
+
+
+def table_name(partition_id):
+    return f"sessions_p{partition_id}"
+
+
+def local_year(clock_in, clock_in_offset):
+    """The partition year of a session, computed like LOCAL_YEAR."""
+    return datetime.fromtimestamp(clock_in + clock_in_offset, timezone.utc).year
+
+
+# --- Catalog ---
+def list_partitions(conn):
+    """Returns [(partition id, year, archived)] for every partition, oldest year first."""
+    return [(partition_id, year, bool(archived)) for partition_id, year, archived in conn.execute(
+        "SELECT id, year, archived FROM session_partitions ORDER BY year, id")]
+
+
+def partition_ids(conn, first_year=None, last_year=None, include_archived=False, schema="main"):
+    """The ids of the live partitions (archived ones too with `include_archived`) for years first_year..last_year."""
+    conditions, params = ([] if include_archived else ["NOT archived"]), []
+    if first_year is not None:
+        conditions.append("year >= ?")
+        params.append(first_year)
+    if last_year is not None:
+        conditions.append("year <= ?")
+        params.append(last_year)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return [partition_id for (partition_id,) in conn.execute(
+        f"SELECT id FROM {schema}.session_partitions {where} ORDER BY year, id", params)]
+
+
+def partition_tables(conn):
+    """Returns {partition id: table name} for every partition, archived ones included."""
+    return {partition_id: table_name(partition_id) for partition_id, _, _ in list_partitions(conn)}
+
+
+def partition_filter(conn, first_year=None, last_year=None, include_archived=False):
+    """A condition on `partition_id` (and its params) that selects the matching partitions' rollup rows."""
+    ids = partition_ids(conn, first_year, last_year, include_archived)
+    return f"partition_id IN ({', '.join('?' * len(ids))})", ids
+
+
+def sessions_source(conn, first_year=None, last_year=None, include_archived=False):
+    """A FROM-clause subquery over just the matching partitions, for scans that know their years."""
+    return f"({_union_sql(partition_ids(conn, first_year, last_year, include_archived))})"
+
+
+def _union_sql(ids):
+    if not ids:
+        return "SELECT " + ", ".join(f"NULL AS {column}" for column in VIEW_COLUMNS.split(", ")) + " WHERE 0"
+    return " UNION ALL ".join(f"SELECT {VIEW_COLUMNS} FROM {table_name(partition_id)}" for partition_id in ids)
+
+
+def refresh_views(conn):
+    """Recreates `sessions` (the live partitions) and `all_sessions` (every partition) from the catalog."""
+    partitions = list_partitions(conn)
+    for view, ids in (("sessions", [partition_id for partition_id, _, archived in partitions if not archived]),
+                      ("all_sessions", [partition_id for partition_id, _, _ in partitions])):
+        conn.execute(f"DROP VIEW IF EXISTS {view}")
+        conn.execute(f"CREATE VIEW {view} AS {_union_sql(ids)}")
+
+
+def create_partition(conn, year):
+    """Adds an empty live partition for `year` and returns its id."""
+    partition_id = conn.execute("INSERT INTO session_partitions (year) VALUES (?)", (year,)).lastrowid
+    table = table_name(partition_id)
+    conn.execute(f"CREATE TABLE {table} ({PARTITION_COLUMNS})")
+    conn.execute(f"CREATE INDEX idx_{table}_clock_in_out ON {table} (clock_in, clock_out)")
+    # Covers per-project totals and clock_in range scans without touching the table
+    conn.execute(f"CREATE INDEX idx_{table}_project ON {table} (project_id, clock_in, clock_in_offset, duration_seconds)")
+    conn.execute(f"CREATE UNIQUE INDEX idx_{table}_uuid ON {table} (uuid)")
+    # Keeps the sequence past every id written, so a single insert can take the next id inline
+    conn.execute(f"CREATE TRIGGER {table}_sequence AFTER INSERT ON {table} "
+                 "WHEN NEW.id > (SELECT last_id FROM session_id_sequence WHERE id = 1) "
+                 "BEGIN UPDATE session_id_sequence SET last_id = NEW.id WHERE id = 1; END")
+    rollups.create_triggers(conn, partition_id, table)
+    refresh_views(conn)
+    return partition_id
+
+
+def live_partition(conn, year):
+    """The live partition new sessions of `year` go to, created if there is none."""
+    row = conn.execute("SELECT MAX(id) FROM session_partitions WHERE year = ? AND NOT archived", (year,)).fetchone()
+    return row[0] if row[0] is not None else create_partition(conn, year)
+
+
+def set_archived(conn, ids, archived):
+    """Takes partitions out of the live view (or puts them back). Constant time per partition."""
+    conn.executemany("UPDATE session_partitions SET archived = ? WHERE id = ?", [(int(archived), i) for i in ids])
+    refresh_views(conn)
+
+
+def drop_partitions(conn, ids):
+    """Deletes partitions for good: their tables, rollup rows and catalog rows."""
+    for partition_id in ids:
+        conn.execute(f"DROP TABLE IF EXISTS {table_name(partition_id)}")
+        conn.execute("DELETE FROM session_partitions WHERE id = ?", (partition_id,))
+    rollups.clear(conn, ids)
+    refresh_views(conn)
+
+
+def partition_totals(conn, ids):
+    """Returns (sessions, seconds) across the given partitions, from rollup_total."""
+    row = conn.execute("SELECT COALESCE(SUM(session_count), 0), COALESCE(SUM(seconds), 0) FROM rollup_total "
+                       f"WHERE partition_id IN ({', '.join('?' * len(ids))})", ids).fetchone()
+    return row[0], row[1]
+
+
+# --- Writes ---
+def allocate_ids(conn, count):
+    """Reserves `count` consecutive session ids and returns the first. Run inside a transaction."""
+    conn.execute("UPDATE session_id_sequence SET last_id = last_id + ? WHERE id = 1", (count,))
+    return conn.execute("SELECT last_id FROM session_id_sequence WHERE id = 1").fetchone()[0] - count + 1
+
+
+def max_session_id(conn, schema="main"):
+    """The highest id among live sessions; one primary-key lookup per partition."""
+    ids = partition_ids(conn, schema=schema)
+    if not ids:
+        return 0
+    maxima = " UNION ALL ".join(f"SELECT MAX(id) AS last_id FROM {schema}.{table_name(i)}" for i in ids)
+    return conn.execute(f"SELECT COALESCE(MAX(last_id), 0) FROM ({maxima})").fetchone()[0]
+
+
+def insert_session(conn, uuid, clock_in, clock_in_offset, clock_out, clock_out_offset, duration_seconds, notes, project_id):
+    """Writes one session to its year's live partition and returns its id."""
+    table = table_name(live_partition(conn, local_year(clock_in, clock_in_offset)))
+    return conn.execute(
+        f"INSERT INTO {table} (id, {SESSION_COLUMNS}) "
+        "VALUES ((SELECT last_id + 1 FROM session_id_sequence WHERE id = 1), ?, ?, ?, ?, ?, ?, ?, ?)",
+        (uuid, clock_in, clock_in_offset, clock_out, clock_out_offset, duration_seconds, notes, project_id)).lastrowid
+
+
+def insert_sessions(conn, select_sql, params=()):
+    """Writes the rows of `select_sql` (SESSION_COLUMNS, in order) to their years' live partitions.
+
+    Set-based: the rows are staged once and numbered, then copied with one
+    INSERT per year, and each partition's rollups get one grouped update
+    instead of a trigger per row. Ids follow the order of `select_sql`.
+    Returns the number of sessions written. Run inside a transaction.
+    """
+    conn.execute(_CREATE_STAGING_TABLE)
+    try:
+        conn.execute(f"INSERT INTO temp.session_staging ({SESSION_COLUMNS}) {select_sql}", params)
+        count, first_seq = conn.execute("SELECT COUNT(*), MIN(seq) FROM temp.session_staging").fetchone()
+        if not count:
+            return 0
+        id_offset = allocate_ids(conn, count) - first_seq
+        for (year,) in conn.execute("SELECT DISTINCT year FROM temp.session_staging ORDER BY year").fetchall():
+            partition_id = live_partition(conn, year)
+            table = table_name(partition_id)
+            with rollups.suspended(conn, partition_id, table):
+                conn.execute(f"INSERT INTO {table} (id, {SESSION_COLUMNS}) "
+                             f"SELECT seq + ?, {SESSION_COLUMNS} FROM temp.session_staging WHERE year = ? ORDER BY seq",
+                             (id_offset, year))
+                rollups.add_sessions(conn, partition_id, "temp.session_staging", "WHERE year = ?", (year,))
+        return count
+    finally:
+        conn.execute("DELETE FROM temp.session_staging")
@@ -0,0 +1,204 @@
+"""Productivity statistics over every live session, computed with NumPy.
+
+`load_columns` reads the two values per session the metrics need (local
+clock-in time and duration) in one pass over the primary key, in fetchmany
+chunks copied into a preallocated array; with a million sessions the
+sqlite3 row objects are most of the cost, so nothing else is selected. `compute` then
+derives everything with vectorized operations: session length mean, median
+and percentiles, clock-in hour and weekday distributions, per-day totals,
+current and longest streaks, and rolling 7/30-day averages. Days, hours and
+weekdays use the UTC offset each session was recorded with, like the rollups.
+
+`StatsCache` keeps the arrays and the last result between calls; the window
+holds one next to its DatabaseExecutor and serves it over the control
+socket. Until a write marks it stale the cached result is returned without
+touching the database. After `mark_stale()` (a recorded session, or
+anything the CLI may have done) it compares a cheap fingerprint of the live
+sessions (highest id, plus their rollup_total count and seconds; one lookup
+per partition) and
+only loads the rows past the last id seen; `invalidate()` (a reset) drops
+the arrays so the next call reloads everything. A one-off `main.py stats`
+just calls `load_columns` and `compute`.
+
+    python main.py stats
+"""
+from datetime import date, timedelta
+import numpy as np
+
+import session_partitions
+import session_store
+
+PERCENTILES = (10, 25, 50, 75, 90, 95, 99)
+ROLLING_WINDOWS = (7, 30)
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+_EPOCH_DAY = date(1970, 1, 1)
+
+
+class SessionColumns:
+    """Parallel int64 arrays, in id order: local clock-in time (epoch + UTC offset) and duration in seconds."""
+
+    def __init__(self, local_clock_in=None, durations=None):
+        self.local_clock_in = np.zeros(0, dtype=np.int64) if local_clock_in is None else local_clock_in
+        self.durations = np.zeros(0, dtype=np.int64) if durations is None else durations
+
+    def __len__(self):
+        return len(self.durations)
+
+    def extend(self, other):
+        return SessionColumns(np.concatenate((self.local_clock_in, other.local_clock_in)),
+                              np.concatenate((self.durations, other.durations)))
+
+
+def load_columns(conn, after_id=0, through_id=None, count=None, chunk_size=50000):
+    """Reads the sessions with `after_id` < id <= `through_id` into a SessionColumns.
+
+    `count` (e.g. from rollup_total) sizes the buffer up front; without it
+    the rows are counted first. Either way the rows are streamed once.
+    """
+    if through_id is None:
+        through_id = session_partitions.max_session_id(conn)
+    if count is None:
+        count = conn.execute("SELECT COUNT(*) FROM sessions WHERE id > ? AND id <= ?", (after_id, through_id)).fetchone()[0]
+    table = np.empty((count, 2), dtype=np.int64)
+    filled = 0
+    cursor = conn.execute("SELECT clock_in + clock_in_offset, duration_seconds FROM sessions "
+                          "WHERE id > ? AND id <= ? ORDER BY id", (after_id, through_id))
+    try:
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            if filled + len(rows) > len(table):
+                # More rows than `count` said (it came from a stale rollup)
+                table = np.concatenate((table, np.empty((filled + len(rows) - len(table), 2), dtype=np.int64)))
+            table[filled:filled + len(rows)] = rows
+            filled += len(rows)
+    finally:
+        cursor.close()
+    return SessionColumns(np.ascontiguousarray(table[:filled, 0]), np.ascontiguousarray(table[:filled, 1]))
+
+
+def _runs(active):
+    """(start index, length) of every run of True in a boolean array."""
+    edges = np.diff(np.concatenate(([0], active.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    return starts, np.flatnonzero(edges == -1) - starts
+
+
+def compute(columns, today=None):
+    """All metrics for `columns` as a dict. Durations are in seconds, averages in seconds per day."""
+    today = today or date.today()
+    durations = columns.durations
+    stats = {
+        "session_count": len(columns),
+        "total_seconds": int(durations.sum()),
+        "mean_seconds": float(durations.mean()) if len(columns) else 0.0,
+        "median_seconds": float(np.median(durations)) if len(columns) else 0.0,
+        "percentiles": {p: float(value) for p, value in
+                        zip(PERCENTILES, np.percentile(durations, PERCENTILES) if len(columns) else [0.0] * len(PERCENTILES))},
+    }
+
+    local = columns.local_clock_in
+    days = local // 86400
+    hours = (local % 86400) // 3600
+    weekdays = (days + 3) % 7  # 1970-01-01 was a Thursday; Monday is 0
+    stats["by_hour"] = {"sessions": np.bincount(hours, minlength=24).tolist(),
+                        "seconds": np.bincount(hours, weights=durations, minlength=24).astype(np.int64).tolist()}
+    stats["by_weekday"] = {"sessions": np.bincount(weekdays, minlength=7).tolist(),
+                           "seconds": np.bincount(weekdays, weights=durations, minlength=7).astype(np.int64).tolist()}
+
+    # Per-day totals from the first session's day through today
+    today_number = (today - _EPOCH_DAY).days
+    first_day = int(days.min()) if len(columns) else today_number
+    first_day = min(first_day, today_number)
+    last_day = max(int(days.max()) if len(columns) else today_number, today_number)
+    daily = np.bincount(days - first_day, weights=durations, minlength=last_day - first_day + 1).astype(np.int64)
+    stats["first_day"] = _EPOCH_DAY + timedelta(days=first_day)
+    stats["daily_seconds"] = daily  # daily[i] is for first_day + i
+
+    starts, lengths = _runs(daily > 0)
+    stats["longest_streak_days"] = int(lengths.max()) if len(lengths) else 0
+    # The current streak still counts if today hasn't been worked yet
+    today_index = today_number - first_day
+    current = 0
+    for day in (today_index, today_index - 1):
+        containing = np.flatnonzero((starts <= day) & (day < starts + lengths))
+        if containing.size:
+            current = int(day - starts[containing[0]] + 1)
+            break
+    stats["current_streak_days"] = current
+    stats["active_days"] = int(np.count_nonzero(daily))
+
+    prefix = np.concatenate(([0], np.cumsum(daily)))
+    for window in ROLLING_WINDOWS:
+        # rolling[i] is the mean over the `window` days ending on day i (shorter at the start)
+        lower = np.maximum(np.arange(1, len(daily) + 1) - window, 0)
+        rolling = (prefix[1:] - prefix[lower]) / window
+        stats[f"rolling_{window}d"] = rolling
+        stats[f"average_{window}d_seconds"] = float(rolling[today_index])
+    return stats
+
+
+class StatsCache:
+    """Session columns and their metrics, reloaded only as far as the sessions table changed.
+
+    Call `get(conn)` from the thread that owns the connection (e.g. through
+    DatabaseExecutor.read); the cache itself is not locked. `mark_stale` and
+    `invalidate` only set attributes, so any thread may call them.
+    """
+
+    def __init__(self, chunk_size=50000):
+        self.chunk_size = chunk_size
+        self.columns = SessionColumns()
+        self._fingerprint = None
+        self._result = None  # (date computed for, stats)
+        self._stale = True
+        self.full_loads = 0
+        self.incremental_loads = 0
+
+    @staticmethod
+    def fingerprint(conn):
+        return (session_partitions.max_session_id(conn), *session_store.load_totals(conn))
+
+    def mark_stale(self):
+        """Sessions may have been added or removed; the next `get` checks the fingerprint."""
+        self._stale = True
+
+    def invalidate(self):
+        self.columns = SessionColumns()
+        self._fingerprint = self._result = None
+        self._stale = True
+
+    def get(self, conn, today=None):
+        today = today or date.today()
+        if not self._stale and self._result is not None and self._result[0] == today:
+            return self._result[1]
+        self._stale = False  # Before reading, so a write landing meanwhile marks it again
+        # A savepoint (a transaction of its own when none is open) keeps the fingerprint and the rows from one snapshot
+        conn.execute("SAVEPOINT session_stats")
+        try:
+            fingerprint = self.fingerprint(conn)
+            if fingerprint != self._fingerprint:
+                self._refresh(conn, fingerprint)
+                self._result = None
+        finally:
+            conn.execute("RELEASE session_stats")
+        if self._result is None or self._result[0] != today:
+            self._result = (today, compute(self.columns, today))
+        return self._result[1]
+
+    def _refresh(self, conn, fingerprint):
+        max_id, count, seconds = fingerprint
+        if self._fingerprint is not None:
+            old_max_id, old_count, old_seconds = self._fingerprint
+            if max_id >= old_max_id and count >= old_count:
+                # Only appended? Then the new rows account for exactly the change in count and seconds
+                added = load_columns(conn, old_max_id, max_id, count - old_count, self.chunk_size)
+                if len(added) == count - old_count and int(added.durations.sum()) == seconds - old_seconds:
+                    self.columns = self.columns.extend(added)
+                    self._fingerprint = fingerprint
+                    self.incremental_loads += 1
+                    return
+        self.columns = load_columns(conn, 0, max_id, count, self.chunk_size)
+        self._fingerprint = fingerprint
+        self.full_loads += 1
@@ -0,0 +1,345 @@
+"""Session storage operations.
+
+Every function takes an open sqlite3 connection as its first argument so the
+same logic can run on the database worker thread or from a plain script.
+Sessions live in year partitions (see session_partitions); totals and
+summaries read the rollups of the live partitions overlapping their range,
+or of the archived ones too with `include_archived=True`.
+"""
+import uuid
+from datetime import date, datetime, timedelta, timezone
+import rollups
+import schema_migrations
+import session_partitions
+
+
+def init_schema(conn):
+    """Creates or migrates the schema. Runs its own transactions; call it outside one."""
+    return schema_migrations.migrate(conn)
+
+
+def to_epoch(value):
+    """Normalizes a timestamp to (epoch seconds, UTC offset seconds).
+
+    Accepts datetimes (naive ones are local time), dates (local midnight),
+    ISO strings and numeric epoch seconds.
+    """
+    if isinstance(value, str):
+        return schema_migrations.iso_to_epoch(value)
+    if isinstance(value, (int, float)):
+        value = datetime.fromtimestamp(value)
+    elif not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+    if value.tzinfo is None:
+        value = value.astimezone()
+    return int(value.timestamp()), int(value.utcoffset().total_seconds())
+
+
+def to_local_date(value):
+    """The calendar date of a timestamp in the UTC offset `to_epoch` resolves for it."""
+    epoch, offset = to_epoch(value)
+    return datetime.fromtimestamp(epoch + offset, timezone.utc).date()
+
+
+def load_totals(conn, include_archived=False):
+    """Returns (session count, seconds) over the live partitions, from rollup_total."""
+    return session_partitions.partition_totals(conn, session_partitions.partition_ids(conn, include_archived=include_archived))
+
+
+def load_total_seconds(conn, include_archived=False):
+    return load_totals(conn, include_archived)[1]
+
+
+def _insert_session(conn, clock_in_epoch, clock_in_offset, clock_out_epoch, clock_out_offset, notes, project_id=None):
+    duration_seconds = max(clock_out_epoch - clock_in_epoch, 0)
+    return session_partitions.insert_session(conn, str(uuid.uuid4()), clock_in_epoch, clock_in_offset,
+                                             clock_out_epoch, clock_out_offset, duration_seconds, notes, project_id)
+
+
+def record_session(conn, clock_in, clock_out, notes="", project_id=None):
+    return _insert_session(conn, *to_epoch(clock_in), *to_epoch(clock_out), notes, project_id)
+
+
+def clear_all_sessions(conn):
+    """Empties the live totals by archiving every live partition, and stops the running timers.
+
+    Nothing is deleted and no session row is touched, so it takes the same
+    time however many sessions there are; `archive restore` brings them back.
+    """
+    session_partitions.set_archived(conn, session_partitions.partition_ids(conn), True)
+    conn.execute("DELETE FROM open_timers")
+
+
+# --- Projects ---
+# Sessions and timers carry an optional project id; NULL means "no project".
+def get_projects(conn):
+    """Returns [(project id, name)] in name order."""
+    return conn.execute("SELECT id, name FROM projects ORDER BY name").fetchall()
+
+
+def find_project(conn, name):
+    """Returns the id of the project called `name` (case-insensitive), or None."""
+    row = conn.execute("SELECT id FROM projects WHERE name = ?", (name,)).fetchone()
+    return row[0] if row else None
+
+
+def get_or_create_project(conn, name):
+    name = name.strip()
+    if not name:
+        raise ValueError("Project names can't be empty")
+    conn.execute("INSERT INTO projects (name) VALUES (?) ON CONFLICT (name) DO NOTHING", (name,))
+    return find_project(conn, name)
+
+
+def get_project_totals(conn):
+    """Returns [(project id, name, session count, seconds)] for every project with sessions, largest first.
+
+    Aggregates each partition's project index alone, so the session rows themselves are never read.
+    """
+    return conn.execute("""
+        SELECT totals.project_id, projects.name, totals.session_count, totals.seconds
+        FROM (SELECT project_id, COUNT(*) AS session_count, SUM(duration_seconds) AS seconds
+              FROM sessions GROUP BY project_id) AS totals
+        LEFT JOIN projects ON projects.id = totals.project_id
+        ORDER BY totals.seconds DESC
+    """).fetchall()
+
+
+def get_project_weekly_hours(conn, project_id, start=None, end=None, include_archived=False):
+    """Like get_weekly_hours_summary, for one project's sessions (a range scan of each overlapping partition's project index)."""
+    where, params = _range_clause(start, end)
+    where = f"{where} AND project_id IS ?" if where else "WHERE project_id IS ?"
+    source = session_partitions.sessions_source(conn, *_year_span(start, end), include_archived)
+    weekly_hours = {}
+    for week_start, total_seconds in conn.execute(
+            f"SELECT {rollups.BUCKETS['rollup_weekly'].format(t='sessions')} AS week, SUM(duration_seconds) "
+            f"FROM {source} AS sessions {where} GROUP BY week ORDER BY week", (*params, project_id)):
+        iso_year, iso_week, _ = date.fromisoformat(week_start).isocalendar()
+        week_key = f"{iso_year}-W{iso_week:02d}"
+        weekly_hours[week_key] = weekly_hours.get(week_key, 0.0) + total_seconds / 3600.0
+    return weekly_hours
+
+
+# --- Open timers ---
+# Running timers live in the database (not in the GUI) so the headless CLI
+# and the window see the same clocked-in state. Each project (and "no
+# project") has at most one.
+def get_open_timers(conn):
+    """Returns [(project id, project name, clock_in epoch, UTC offset)] for every running timer, oldest first."""
+    return conn.execute("""
+        SELECT open_timers.project_id, projects.name, open_timers.clock_in, open_timers.clock_in_offset
+        FROM open_timers LEFT JOIN projects ON projects.id = open_timers.project_id
+        ORDER BY open_timers.clock_in
+    """).fetchall()
+
+
+def get_open_session(conn, project_id=None):
+    """Returns the project's running timer as (clock_in epoch, UTC offset), or None when clocked out."""
+    return conn.execute("SELECT clock_in, clock_in_offset FROM open_timers WHERE IFNULL(project_id, 0) = IFNULL(?, 0)",
+                        (project_id,)).fetchone()
+
+
+def open_session(conn, clock_in, project_id=None):
+    """Starts the project's timer at `clock_in`. Returns False if it is already running."""
+    clock_in_epoch, clock_in_offset = to_epoch(clock_in)
+    cursor = conn.execute("INSERT OR IGNORE INTO open_timers (project_id, clock_in, clock_in_offset) VALUES (?, ?, ?)",
+                          (project_id, clock_in_epoch, clock_in_offset))
+    return cursor.rowcount == 1
+
+
+def close_open_session(conn, clock_out, notes="", clock_in=None, project_id=None):
+    """Records the project's running timer as a session ending at `clock_out` and stops it.
+
+    `clock_in` is used when no timer is stored (e.g. the row was lost to a
+    reset from another process). Returns (session id, duration seconds,
+    clock_in epoch, clock_in UTC offset), or None when there was nothing to
+    close.
+    """
+    stored = get_open_session(conn, project_id)
+    if stored is None:
+        if clock_in is None:
+            return None
+        stored = to_epoch(clock_in)
+    conn.execute("DELETE FROM open_timers WHERE IFNULL(project_id, 0) = IFNULL(?, 0)", (project_id,))
+    clock_out_epoch, clock_out_offset = to_epoch(clock_out)
+    session_id = _insert_session(conn, stored[0], stored[1], clock_out_epoch, clock_out_offset, notes, project_id)
+    return session_id, max(clock_out_epoch - stored[0], 0), stored[0], stored[1]
+
+
+def get_all_sessions_for_summary(conn):
+    return conn.execute("SELECT clock_in, clock_in_offset, duration_seconds FROM sessions ORDER BY clock_in ASC").fetchall()
+
+
+def iter_session_chunks(conn, start=None, end=None, chunk_size=10000):
+    """Yields lists of up to `chunk_size` full session rows in clock_in order.
+
+    Rows are pulled from the cursor with fetchmany, so memory use does not
+    grow with the table. `start`/`end` filter on clock_in like
+    get_weekly_hours_summary.
+    """
+    where, params = _range_clause(start, end)
+    source = session_partitions.sessions_source(conn, *_year_span(start, end))
+    cursor = conn.execute(
+        "SELECT id, clock_in, clock_in_offset, clock_out, clock_out_offset, duration_seconds, notes "
+        f"FROM {source} AS sessions {where} ORDER BY clock_in, clock_out", params)
+    try:
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            yield rows
+    finally:
+        cursor.close()
+
+
+def _range_clause(start, end):
+    conditions = []
+    params = []
+    if start is not None:
+        conditions.append("clock_in >= ?")
+        params.append(to_epoch(start)[0])
+    if end is not None:
+        conditions.append("clock_in < ?")
+        params.append(to_epoch(end)[0])
+    return (f"WHERE {' AND '.join(conditions)}" if conditions else ""), params
+
+
+def _year_span(start, end):
+    """The partition years that can hold sessions clocked in within [start, end).
+
+    Widened by a day each way, since a session's year is taken in its own UTC offset.
+    """
+    first_year = (to_local_date(start) - timedelta(days=1)).year if start is not None else None
+    last_year = (to_local_date(end) + timedelta(days=1)).year if end is not None else None
+    return first_year, last_year
+
+
+def _rollup_buckets(conn, table, start_bucket, end_bucket, first_year=None, last_year=None, include_archived=False):
+    """(bucket, seconds) rows in bucket order, from the partitions for years first_year..last_year.
+
+    A bucket has a row per partition holding it (e.g. a week spanning New
+    Year), so callers add them up; that beats a GROUP BY, since the rows
+    already arrive in bucket order.
+    """
+    partitions, params = session_partitions.partition_filter(conn, first_year, last_year, include_archived)
+    conditions = [partitions]
+    if start_bucket is not None:
+        conditions.append("bucket >= ?")
+        params.append(start_bucket)
+    if end_bucket is not None:
+        conditions.append("bucket < ?")
+        params.append(end_bucket)
+    return conn.execute(f"SELECT bucket, seconds FROM {table} WHERE {' AND '.join(conditions)} ORDER BY bucket", params)
+
+
+def _seconds_by_bucket(rows):
+    seconds_by_bucket = {}
+    for bucket, seconds in rows:
+        seconds_by_bucket[bucket] = seconds_by_bucket.get(bucket, 0) + seconds
+    return seconds_by_bucket
+
+
+def get_weekly_hours_summary(conn, start=None, end=None, include_archived=False):
+    """Returns {"YYYY-Www": hours} for the weeks overlapping [start, end).
+
+    Reads the rollup_weekly table, which holds one row per partition and ISO
+    week (bucketed in each session's own UTC offset), for the partitions
+    those weeks can fall in. `start`/`end` accept anything `to_epoch` does
+    and are optional.
+    """
+    start_bucket = end_bucket = first_year = last_year = None
+    if start is not None:
+        start_day = to_local_date(start)
+        start_monday = start_day - timedelta(days=start_day.weekday())
+        start_bucket, first_year = start_monday.isoformat(), start_monday.year
+    if end is not None:
+        end_day = to_local_date(end)
+        # The last week's sessions can run up to six days past `end`
+        end_bucket, last_year = end_day.isoformat(), (end_day + timedelta(days=6)).year
+
+    weekly_hours = {}
+    for week_start, total_seconds in _seconds_by_bucket(_rollup_buckets(
+            conn, "rollup_weekly", start_bucket, end_bucket, first_year, last_year, include_archived)).items():
+        iso_year, iso_week, _ = date.fromisoformat(week_start).isocalendar()
+        weekly_hours[f"{iso_year}-W{iso_week:02d}"] = total_seconds / 3600.0
+    return weekly_hours
+
+
+def get_monthly_hours_summary(conn, start=None, end=None, include_archived=False):
+    """Returns {"YYYY-MM": hours} for the months overlapping [start, end), from rollup_monthly."""
+    start_bucket = end_bucket = first_year = last_year = None
+    if start is not None:
+        start_day = to_local_date(start)
+        start_bucket, first_year = start_day.strftime("%Y-%m"), start_day.year
+    if end is not None:
+        end_day = to_local_date(end)
+        end_bucket, last_year = end_day.strftime("%Y-%m") + ("-01" if end_day.day > 1 else ""), end_day.year
+    seconds_by_month = _seconds_by_bucket(_rollup_buckets(conn, "rollup_monthly", start_bucket, end_bucket,
+                                                          first_year, last_year, include_archived))
+    return {month: seconds / 3600.0 for month, seconds in seconds_by_month.items()}
+
+
+def get_yearly_hours_summary(conn, include_archived=False):
+    """Returns {"YYYY": hours} from rollup_yearly."""
+    seconds_by_year = _seconds_by_bucket(_rollup_buckets(conn, "rollup_yearly", None, None, include_archived=include_archived))
+    return {year: seconds / 3600.0 for year, seconds in seconds_by_year.items()}
+
+
+def get_daily_seconds(conn):
+    """Returns [("YYYY-MM-DD", seconds)] for every day with live sessions, oldest first, from rollup_daily."""
+    return list(_seconds_by_bucket(_rollup_buckets(conn, "rollup_daily", None, None)).items())
+
+
+def get_week_span(conn):
+    """Returns the Mondays (dates) of the oldest and newest weeks with sessions, or None."""
+    partitions, params = session_partitions.partition_filter(conn)
+    row = conn.execute(f"SELECT MIN(bucket), MAX(bucket) FROM rollup_weekly WHERE {partitions}", params).fetchone()
+    if row[0] is None:
+        return None
+    return date.fromisoformat(row[0]), date.fromisoformat(row[1])
+
+
+def get_weekly_hours_page(conn, newest_monday, first_row, row_count):
+    """Returns [("YYYY-Www", hours)] for rows first_row.. of a newest-first list of weeks.
+
+    Row 0 is the week starting `newest_monday`; weeks without sessions are
+    included with 0 hours, so row numbers map straight to dates and a page
+    reads at most `row_count` rollup rows.
+    """
+    page_newest = newest_monday - timedelta(weeks=first_row)
+    page_oldest = page_newest - timedelta(weeks=row_count - 1)
+    weekly_hours = get_weekly_hours_summary(conn, page_oldest, page_newest + timedelta(weeks=1))
+    rows = []
+    for row in range(row_count):
+        iso_year, iso_week, _ = (page_newest - timedelta(weeks=row)).isocalendar()
+        week_key = f"{iso_year}-W{iso_week:02d}"
+        rows.append((week_key, weekly_hours.get(week_key, 0.0)))
+    return rows
+
+
+def week_range_from_iso(iso_year_week):
+    """Returns the (Monday, Sunday) dates of a "YYYY-Www" key."""
+    year, week = map(int, iso_year_week.split('-W'))
+    start = date.fromisocalendar(year, week, 1)
+    return start, start + timedelta(days=6)
+
+
+def format_week_range(iso_year_week):
+    start, end = week_range_from_iso(iso_year_week)
+    return f"{start.month}/{start.day}/{start.strftime('%y')}-{end.month}/{end.day}/{end.strftime('%y')}"
+
+
+def hours_to_short_format(total_hours):
+    """Compact form of hours_to_h_m_format, e.g. "12h 5m"."""
+    hours, minutes = divmod(int(total_hours * 60), 60)
+    return f"{hours}h {minutes}m" if hours else f"{minutes}m"
+
+
+def hours_to_h_m_format(total_hours):
+    total_minutes = int(total_hours * 60)
+    hours = total_minutes // 60
+    minutes = total_minutes % 60
+    parts = []
+    if hours > 0: parts.append(f"{hours} hour{'s' if hours > 1 else ''}")
+    if minutes > 0 or (hours == 0 and minutes == 0): parts.append(f"{minutes} minute{'s' if minutes > 1 else ''}")
+    return " ".join(parts) if parts else "0 minutes"
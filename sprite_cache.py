@@ -0,0 +1,254 @@
+import hashlib
+import json
+import os
+import struct
+import sys
+import threading
+from PIL import Image
+
+# Entry file layout: magic, width, height, frame duration (ms), then raw RGBA bytes
+_ENTRY_MAGIC = b"KSPR"
+_ENTRY_HEADER = struct.Struct("<4sHHI")
+
+
+def default_cache_dir():
+    """Per-user cache directory for pre-resized sprites."""
+    override = os.environ.get("KAWAII_SPRITE_CACHE")
+    if override:
+        return override
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Caches")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "kawaii-time-tracker", "sprites")
+
+
+class SpriteCache:
+    """On-disk cache of ready-to-blit RGBA buffers.
+
+    Entries are keyed by the SHA-1 of the source file, the target size, the
+    resampling filter and the frame number, so an edited asset simply misses.
+    Source hashes are remembered per (path, mtime, size) so warm starts don't
+    re-read the assets, and entries belonging to a superseded hash are purged
+    as soon as the change is noticed. Total size is capped with LRU eviction
+    based on file access stamps.
+    """
+
+    INDEX_FILE = "index.json"
+
+    def __init__(self, cache_dir=None, max_bytes=64 * 1024 * 1024):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.enabled = True
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.RLock()
+        self._index = {}
+
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._index = self._read_index()
+        except OSError as e:
+            print(f"Sprite cache disabled: {e}")
+            self.enabled = False
+
+    # --- Public API ---
+    def load_resized(self, path, size, resample=Image.Resampling.LANCZOS):
+        """Returns `path` as an RGBA image resized to `size`, resampling only on a cache miss."""
+        if not self.enabled:
+            return Image.open(path).convert("RGBA").resize(size, resample)
+
+        source_hash = self._source_hash(path)
+        entry_path = self._entry_path(source_hash, size, resample, 0)
+        cached = self._read_entry(entry_path)
+        if cached is not None:
+            self.hits += 1
+            return cached[0]
+
+        self.misses += 1
+        image = Image.open(path).convert("RGBA").resize(size, resample)
+        self._write_entry(entry_path, image, 0)
+        self._evict_if_needed()
+        return image
+
+    def iter_frames(self, path, size, resample=Image.Resampling.LANCZOS, stop_event=None):
+        """Yields (RGBA frame, duration_ms) for every frame of an animated image.
+
+        On a warm cache every frame comes straight from disk; otherwise frames
+        are decoded, resized and stored as they are yielded.
+        """
+        if not self.enabled:
+            yield from decode_frames(path, size, resample, stop_event)
+            return
+
+        source_hash = self._source_hash(path)
+        manifest_path = self._entry_path(source_hash, size, resample, "frames", suffix=".json")
+        frame_count = self._read_manifest(manifest_path)
+
+        if frame_count is not None:
+            for i in range(frame_count):
+                if stop_event is not None and stop_event.is_set():
+                    return
+                cached = self._read_entry(self._entry_path(source_hash, size, resample, i))
+                if cached is None:
+                    break
+                self.hits += 1
+                yield cached
+            else:
+                return
+            # A frame went missing (e.g. evicted); fall back to decoding from that point
+            start = i
+        else:
+            start = 0
+
+        count = start
+        for i, (frame, duration) in enumerate(decode_frames(path, size, resample, stop_event)):
+            if i < start:
+                continue
+            self.misses += 1
+            self._write_entry(self._entry_path(source_hash, size, resample, i), frame, duration)
+            count = i + 1
+            yield frame, duration
+        if stop_event is None or not stop_event.is_set():
+            self._write_manifest(manifest_path, count)
+        self._evict_if_needed()
+
+    # --- Source hashing ---
+    def _source_hash(self, path):
+        abs_path = os.path.abspath(path)
+        st = os.stat(abs_path)
+        with self._lock:
+            known = self._index.get(abs_path)
+            if known and known["mtime_ns"] == st.st_mtime_ns and known["size"] == st.st_size:
+                return known["sha1"]
+
+        digest = hashlib.sha1()
+        with open(abs_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 16), b""):
+                digest.update(block)
+        source_hash = digest.hexdigest()
+
+        with self._lock:
+            if known and known["sha1"] != source_hash:
+                self._purge_source(known["sha1"])
+            self._index[abs_path] = {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "sha1": source_hash}
+            self._write_index()
+        return source_hash
+
+    def _purge_source(self, source_hash):
+        prefix = source_hash[:16] + "-"
+        for name in os.listdir(self.cache_dir):
+            if name.startswith(prefix):
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except OSError:
+                    pass
+
+    def _read_index(self):
+        try:
+            with open(os.path.join(self.cache_dir, self.INDEX_FILE), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_index(self):
+        tmp_path = os.path.join(self.cache_dir, self.INDEX_FILE + ".tmp")
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._index, f)
+            os.replace(tmp_path, os.path.join(self.cache_dir, self.INDEX_FILE))
+        except OSError as e:
+            print(f"Sprite cache index write error: {e}")
+
+    # --- Entries ---
+    def _entry_path(self, source_hash, size, resample, frame, suffix=".rgba"):
+        key = hashlib.sha1(f"{source_hash}:{size[0]}x{size[1]}:{int(resample)}:{frame}".encode()).hexdigest()
+        return os.path.join(self.cache_dir, f"{source_hash[:16]}-{key}{suffix}")
+
+    def _read_entry(self, entry_path):
+        try:
+            with open(entry_path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        if len(data) < _ENTRY_HEADER.size:
+            return None
+        magic, width, height, duration = _ENTRY_HEADER.unpack_from(data)
+        pixels = data[_ENTRY_HEADER.size:]
+        if magic != _ENTRY_MAGIC or len(pixels) != width * height * 4:
+            return None
+        self._touch(entry_path)
+        return Image.frombuffer("RGBA", (width, height), pixels, "raw", "RGBA", 0, 1), duration
+
+    def _write_entry(self, entry_path, image, duration):
+        header = _ENTRY_HEADER.pack(_ENTRY_MAGIC, image.width, image.height, int(duration or 0))
+        self._atomic_write(entry_path, header + image.tobytes())
+
+    def _read_manifest(self, manifest_path):
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                frame_count = json.load(f)["frames"]
+        except (OSError, ValueError, KeyError):
+            return None
+        self._touch(manifest_path)
+        return frame_count
+
+    def _write_manifest(self, manifest_path, frame_count):
+        self._atomic_write(manifest_path, json.dumps({"frames": frame_count}).encode())
+
+    def _atomic_write(self, entry_path, data):
+        tmp_path = f"{entry_path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, entry_path)
+        except OSError as e:
+            print(f"Sprite cache write error: {e}")
+
+    def _touch(self, entry_path):
+        # Access stamp drives LRU eviction
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+
+    def _evict_if_needed(self):
+        with self._lock:
+            entries = []
+            total = 0
+            for name in os.listdir(self.cache_dir):
+                if name == self.INDEX_FILE or name.endswith(".tmp"):
+                    continue
+                full_path = os.path.join(self.cache_dir, name)
+                try:
+                    st = os.stat(full_path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, full_path))
+                total += st.st_size
+
+            if total <= self.max_bytes:
+                return
+            entries.sort()
+            for _, entry_size, full_path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(full_path)
+                    total -= entry_size
+                except OSError:
+                    pass
+
+
+def decode_frames(path, size, resample, stop_event=None):
+    """Decodes and resizes every frame of an animated image, one at a time."""
+    with Image.open(path) as source:
+        default_duration = source.info.get("duration", 100)
+        for i in range(getattr(source, "n_frames", 1)):
+            if stop_event is not None and stop_event.is_set():
+                return
+            source.seek(i)
+            duration = source.info.get("duration", default_duration)
+            yield source.convert("RGBA").resize(size, resample), duration
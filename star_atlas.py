@@ -0,0 +1,66 @@
+from PIL import ImageTk
+
+class StarAtlas:
+    """Pre-rotated star sprites with bounded memory.
+
+    Rotations are quantized to `angle_steps` angles and rendered at most once
+    per base image, either lazily on first use or all at once via `prerender`.
+    PhotoImages for stars currently on screen live in a reference-counted pool:
+    `acquire` hands one out and `release` drops it when the last star using
+    that rotation is deleted, so long sessions don't accumulate images.
+    """
+
+    def __init__(self, base_images, angle_steps=24):
+        self.base_images = list(base_images)
+        self.angle_steps = angle_steps
+        self._rotations = {}  # (base index, angle step) -> rotated PIL image
+        self._photo_pool = {}  # (base index, angle step) -> [PhotoImage, refcount]
+
+    def __len__(self):
+        return len(self.base_images) * self.angle_steps
+
+    def key_for(self, base_index, angle):
+        """Snaps an angle in degrees to the nearest pre-rendered step."""
+        step = int(round(angle / 360.0 * self.angle_steps)) % self.angle_steps
+        return base_index, step
+
+    def prerender(self):
+        for base_index in range(len(self.base_images)):
+            for step in range(self.angle_steps):
+                self._rotation(base_index, step)
+
+    def _rotation(self, base_index, step):
+        key = (base_index, step)
+        rotated = self._rotations.get(key)
+        if rotated is None:
+            angle = step * 360.0 / self.angle_steps
+            rotated = self.base_images[base_index].rotate(angle, expand=True)
+            self._rotations[key] = rotated
+        return rotated
+
+    def image(self, key):
+        """The rotated PIL image for `key`, for drawing onto an EffectSurface."""
+        return self._rotation(*key)
+
+    def acquire(self, key):
+        """Returns the PhotoImage for `key`, creating it if no live star is using it."""
+        entry = self._photo_pool.get(key)
+        if entry is None:
+            entry = [ImageTk.PhotoImage(self._rotation(*key)), 0]
+            self._photo_pool[key] = entry
+        entry[1] += 1
+        return entry[0]
+
+    def release(self, key):
+        entry = self._photo_pool.get(key)
+        if entry is None:
+            return
+        entry[1] -= 1
+        if entry[1] <= 0:
+            del self._photo_pool[key]
+
+    def live_photo_count(self):
+        return len(self._photo_pool)
+
+    def clear(self):
+        self._photo_pool.clear()
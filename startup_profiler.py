@@ -0,0 +1,96 @@
+"""Phase-by-phase startup timing for `main.py --profile-startup`.
+
+Code marks its startup phases with `with startup_phase("name"):`. Unless a
+profiler has been enabled this is a no-op, so the markers cost nothing in
+normal runs. Work that finishes on another thread (e.g. GIF decoding) can be
+reported with `record_phase(name, start, end)` using `time.perf_counter()`
+timestamps.
+"""
+import cProfile
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+_active = None
+
+
+class StartupProfiler:
+    def __init__(self, cprofile_path=None):
+        self.origin = time.perf_counter()
+        self.phases = []  # (name, start offset s, duration s, depth)
+        self.cprofile_path = cprofile_path
+        self._cprofile = cProfile.Profile() if cprofile_path else None
+        self._lock = threading.Lock()
+        self._local = threading.local()  # Nesting depth, per thread
+
+    def start(self):
+        if self._cprofile:
+            self._cprofile.enable()
+
+    def stop(self):
+        if self._cprofile:
+            self._cprofile.disable()
+            self._cprofile.dump_stats(self.cprofile_path)
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        depth = getattr(self._local, "depth", 0)
+        self._local.depth = depth + 1
+        try:
+            yield
+        finally:
+            self._local.depth = depth
+            self.record(name, start, time.perf_counter(), depth)
+
+    def record(self, name, start, end, depth=0):
+        with self._lock:
+            self.phases.append((name, start - self.origin, end - start, depth))
+
+    def report(self):
+        total = time.perf_counter() - self.origin
+        lines = [f"Startup profile ({total * 1000:.1f} ms total)",
+                 f"{'start ms':>9} {'duration ms':>12}  phase"]
+        for name, offset, duration, depth in sorted(self.phases, key=lambda p: (p[1], p[3])):
+            lines.append(f"{offset * 1000:9.1f} {duration * 1000:12.1f}  {'  ' * depth}{name}")
+        top_level = [p for p in self.phases if p[3] == 0]
+        if top_level:
+            slowest = max(top_level, key=lambda p: p[2])
+            lines.append(f"Slowest top-level phase: {slowest[0]} ({slowest[2] * 1000:.1f} ms)")
+        if self.cprofile_path:
+            lines.append(f"cProfile stats written to {self.cprofile_path}")
+        return "\n".join(lines)
+
+    def write_report(self, path=None):
+        text = self.report()
+        if path in (None, "-"):
+            print(text)
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text + "\n")
+            print(f"Startup profile written to {path}", file=sys.stderr)
+
+
+def enable(cprofile_path=None):
+    global _active
+    _active = StartupProfiler(cprofile_path)
+    _active.start()
+    return _active
+
+
+def disable():
+    global _active
+    profiler, _active = _active, None
+    if profiler:
+        profiler.stop()
+    return profiler
+
+
+def startup_phase(name):
+    return _active.phase(name) if _active else nullcontext()
+
+
+def record_phase(name, start, end):
+    if _active:
+        _active.record(name, start, end)
@@ -0,0 +1,155 @@
+from collections import OrderedDict
+
+
+class VirtualSummaryList:
+    """A scrollable list on a canvas that only renders the rows in view.
+
+    A fixed pool of `visible_rows` text items is created once and re-pointed
+    at whichever rows are on screen, so scrolling costs at most one
+    itemconfig per changed row no matter how many rows exist. Rows arrive in
+    pages of PAGE_ROWS through `fetch_page(first_row, row_count, callback)`;
+    `callback(rows)` must be called on the Tk thread (with None on failure).
+    Only the MAX_CACHED_PAGES most recently used pages are kept, and fetches
+    are deferred until scrolling pauses.
+    """
+    PAGE_ROWS = 24
+    MAX_CACHED_PAGES = 6
+    PLACEHOLDER = "..."
+    # Page requests wait this long (ms) so a fast scroll only fetches where it stops
+    FETCH_DELAY_MS = 40
+
+    def __init__(self, canvas, x, y, row_height, visible_rows, font, fill, fetch_page, format_row,
+                 scrollbar_x=388, scrollbar_fill="#80084A"):
+        self.canvas = canvas
+        self.y = y
+        self.row_height = row_height
+        self.visible_rows = visible_rows
+        self.fetch_page = fetch_page
+        self.format_row = format_row
+
+        self.total_rows = 0
+        self.first_row = 0
+        self.is_shown = False
+        self.pages = OrderedDict()  # page index -> rows, least recently used first
+        self._requested = set()
+        self._fetch_id = None
+        self._generation = 0  # Bumped by reset() so late pages for old data are dropped
+
+        self.row_items = [canvas.create_text(x, y + i * row_height, text="", font=font, fill=fill, anchor="n", state="hidden")
+                          for i in range(visible_rows)]
+        self._row_texts = [""] * visible_rows
+        self.track_height = visible_rows * row_height
+        self.scrollbar_x = scrollbar_x
+        self.scrollbar_item = canvas.create_rectangle(scrollbar_x, y, scrollbar_x + 4, y, fill=scrollbar_fill,
+                                                      outline="", state="hidden")
+
+    # --- Data ---
+    def reset(self, total_rows):
+        """Drops every cached page and shows rows from the top of a list of `total_rows`."""
+        self._generation += 1
+        self.total_rows = total_rows
+        self.first_row = 0
+        self.pages.clear()
+        self._requested.clear()
+        self.cancel_fetch()
+        self.render()
+
+    def cancel_fetch(self):
+        if self._fetch_id is not None:
+            self.canvas.after_cancel(self._fetch_id)
+            self._fetch_id = None
+
+    def _page_rows(self, page):
+        rows = self.pages.get(page)
+        if rows is not None:
+            self.pages.move_to_end(page)
+        return rows
+
+    def _request_page(self, page):
+        first_row = page * self.PAGE_ROWS
+        if page in self.pages or page in self._requested or not 0 <= first_row < self.total_rows:
+            return
+        self._requested.add(page)
+        generation = self._generation
+        row_count = min(self.PAGE_ROWS, self.total_rows - first_row)
+        self.fetch_page(first_row, row_count, lambda rows: self._on_page_loaded(generation, page, rows))
+
+    def _on_page_loaded(self, generation, page, rows):
+        if generation != self._generation:
+            return
+        self._requested.discard(page)
+        if rows is None:
+            return
+        self.pages[page] = rows
+        while len(self.pages) > self.MAX_CACHED_PAGES:
+            self.pages.popitem(last=False)
+        self.render()
+
+    # --- Scrolling ---
+    def max_first_row(self):
+        return max(self.total_rows - self.visible_rows, 0)
+
+    def scroll(self, rows):
+        first_row = min(max(self.first_row + rows, 0), self.max_first_row())
+        if first_row != self.first_row:
+            self.first_row = first_row
+            self.render()
+
+    def scroll_pages(self, pages):
+        self.scroll(pages * (self.visible_rows - 1))
+
+    # --- Drawing ---
+    def render(self):
+        for slot, item_id in enumerate(self.row_items):
+            row = self.first_row + slot
+            text = ""
+            if row < self.total_rows:
+                page, index = divmod(row, self.PAGE_ROWS)
+                rows = self._page_rows(page)
+                if rows is None:
+                    text = self.PLACEHOLDER
+                else:
+                    text = self.format_row(rows[index])
+            if text != self._row_texts[slot]:
+                self._row_texts[slot] = text
+                self.canvas.itemconfig(item_id, text=text)
+
+        if self._fetch_id is None and any(page not in self.pages for page in self._wanted_pages()):
+            self._fetch_id = self.canvas.after(self.FETCH_DELAY_MS, self._fetch_wanted_pages)
+        self._update_scrollbar()
+
+    def _wanted_pages(self):
+        """The pages in view plus one screen beyond either edge, so scrolling rarely shows placeholders."""
+        first = max(self.first_row - self.visible_rows, 0) // self.PAGE_ROWS
+        last = min(self.first_row + 2 * self.visible_rows, self.total_rows) // self.PAGE_ROWS
+        return range(first, last + 1)
+
+    def _fetch_wanted_pages(self):
+        self._fetch_id = None
+        # Visible pages first
+        for page in sorted(self._wanted_pages(), key=lambda page: abs(page * self.PAGE_ROWS - self.first_row)):
+            self._request_page(page)
+
+    def _update_scrollbar(self):
+        if self.total_rows <= self.visible_rows:
+            self.canvas.itemconfig(self.scrollbar_item, state="hidden")
+            return
+        thumb_height = max(self.track_height * self.visible_rows / self.total_rows, 10)
+        thumb_top = self.y + (self.track_height - thumb_height) * self.first_row / self.max_first_row()
+        self.canvas.coords(self.scrollbar_item, self.scrollbar_x, thumb_top, self.scrollbar_x + 4, thumb_top + thumb_height)
+        self.canvas.itemconfig(self.scrollbar_item, state="normal" if self.is_shown else "hidden")
+
+    def set_font(self, font):
+        for item_id in self.row_items:
+            self.canvas.itemconfig(item_id, font=font)
+
+    def show(self):
+        self.is_shown = True
+        for item_id in self.row_items:
+            self.canvas.itemconfig(item_id, state="normal")
+        self._update_scrollbar()
+
+    def hide(self):
+        self.is_shown = False
+        for item_id in self.row_items + [self.scrollbar_item]:
+            self.canvas.itemconfig(item_id, state="hidden")
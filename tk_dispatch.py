@@ -0,0 +1,102 @@
+import os
+import queue
+import tkinter
+
+import callback_monitor
+
+
+class TkDispatcher:
+    """Delivers `concurrent.futures.Future` results onto the Tk event loop.
+
+    Worker threads must not touch Tk, so completed futures are queued and
+    drained from an `after()` poll on the Tk thread. The poll only runs while
+    results are outstanding.
+
+    After `accept_posts()`, any thread can also `post(callback)`. Those
+    callbacks aren't tied to a future the Tk thread knows about, so instead
+    of polling, a wake-up pipe is watched with Tk's file handler: the Tk
+    thread sleeps until something is posted (Unix only).
+    """
+
+    def __init__(self, master, poll_interval_ms=10):
+        self.master = master
+        self.poll_interval_ms = poll_interval_ms
+        self._completed = queue.Queue()
+        self._pending = 0
+        self._poll_id = None
+        self._posted = queue.Queue()
+        self._wake_read = self._wake_write = None
+
+    def then(self, future, callback):
+        """Calls `callback(future)` on the Tk thread once `future` is done."""
+        self._pending += 1
+        callback = callback_monitor.wrap("future", callback)
+        future.add_done_callback(lambda f: self._completed.put((callback, f)))
+        if self._poll_id is None:
+            self._poll_id = self.master.after(self.poll_interval_ms, self._deliver_completed)
+        return future
+
+    def pending_count(self):
+        return self._pending
+
+    def _deliver_completed(self):
+        self._poll_id = None
+        while True:
+            try:
+                callback, future = self._completed.get_nowait()
+            except queue.Empty:
+                break
+            self._pending -= 1
+            try:
+                callback(future)
+            except Exception as e:
+                print(f"Background task callback error: {e}")
+        if self._pending > 0:
+            self._poll_id = self.master.after(self.poll_interval_ms, self._deliver_completed)
+
+    # --- Posting from other threads ---
+    def accept_posts(self):
+        """Starts watching the wake-up pipe; call on the Tk thread before anything is posted."""
+        if self._wake_read is not None:
+            return
+        self._wake_read, self._wake_write = os.pipe()
+        os.set_blocking(self._wake_read, False)
+        os.set_blocking(self._wake_write, False)
+        self.master.tk.createfilehandler(self._wake_read, tkinter.READABLE, self._deliver_posted)
+
+    def post(self, callback):
+        """Calls `callback()` on the Tk thread soon. Safe from any thread; ignored once closed."""
+        wake_write = self._wake_write
+        if wake_write is None:
+            return
+        self._posted.put(callback_monitor.wrap("posted", callback))
+        try:
+            os.write(wake_write, b"\0")
+        except (BlockingIOError, OSError):
+            pass  # A wake-up is already pending, or the pipe was just closed
+
+    def _deliver_posted(self, fd, mask):
+        try:
+            os.read(fd, 4096)
+        except (BlockingIOError, OSError):
+            pass
+        while True:
+            try:
+                callback = self._posted.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                callback()
+            except Exception as e:
+                print(f"Posted callback error: {e}")
+
+    def close(self):
+        if self._poll_id is not None:
+            self.master.after_cancel(self._poll_id)
+            self._poll_id = None
+        if self._wake_read is not None:
+            self.master.tk.deletefilehandler(self._wake_read)
+            wake_read, wake_write = self._wake_read, self._wake_write
+            self._wake_read = self._wake_write = None
+            os.close(wake_read)
+            os.close(wake_write)